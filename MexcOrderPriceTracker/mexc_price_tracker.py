@@ -10,6 +10,7 @@ import os
 import time
 import threading
 import urllib.parse
+from src.mexc_http import MexcHttpClient
 
 ORDER_LIST_DIR = '/home/erik/PycharmProjects/GmailMexcAnalyzer/MexcOrderPriceTracker/order_lists'
 ORDER_LIST_NAME = 'CopyTraderNormie'
@@ -21,8 +22,9 @@ class MexcPriceTracker:
     def __init__(self):
         self.cache = {}
         self.rate_limit_delay = 0.25
-        self.max_retries = 3
         self.mexc_api_url = "https://api.mexc.com"
+        # Pooled connections, timeouts and 429/5xx retries for the k-line requests
+        self.http = MexcHttpClient.shared()
 
     def get_kline_data(self, symbol, interval, start_time, end_time):
         """
@@ -49,8 +51,10 @@ class MexcPriceTracker:
 
     def _get_kline_data_recursive(self, symbol, interval, start_time, end_time):
         """
-        Worker method that fetches k-line data with retries and interval adjustments.
-        This method does not interact with the cache directly.
+        Worker method that fetches k-line data, falling back to the next larger interval when
+        a request fails or returns no data for it. Failed requests are already retried by the
+        MexcHttpClient, so they are not repeated here at the same interval. This method does
+        not interact with the cache directly.
         """
         start_ts_ms = int(start_time.timestamp() * 1000)
         end_ts_ms = int(end_time.timestamp() * 1000)
@@ -58,32 +62,27 @@ class MexcPriceTracker:
         params = {'symbol': symbol, 'interval': interval, 'startTime': start_ts_ms, 'endTime': end_ts_ms}
         full_url = f"{base_url}?{urllib.parse.urlencode(params)}"
 
-        for attempt in range(self.max_retries):
-            try:
-                time.sleep(self.rate_limit_delay)
-                response = requests.get(base_url, params=params)
-                response.raise_for_status()
-                data = response.json()
-                if not data:
-                    # If no data, try the next larger interval. Stop if we're already at the largest.
-                    if interval == '1h': break
-                    next_interval = '5m' if interval == '1m' else '15m' if interval == '5m' else '1h'
-                    return self._get_kline_data_recursive(symbol, next_interval, start_time, end_time)
-
-                # On success, format the data and return it
-                formatted_klines = [[int(k[0]), k[1], k[2], k[3], k[4], k[5], int(k[0]) + 60000, k[6], 0, '0', '0', '0']
-                                    for k in data]
-                return formatted_klines, full_url
-
-            except requests.exceptions.RequestException:
-                # If the request fails, try the next larger interval. Stop if we're already at the largest.
-                if interval == '1h': break
-                time.sleep(1)
-                next_interval = '5m' if interval == '1m' else '15m' if interval == '5m' else '1h'
-                return self._get_kline_data_recursive(symbol, next_interval, start_time, end_time)
-
-        # This point is reached only after all retries and intervals have failed.
-        return None, full_url
+        try:
+            time.sleep(self.rate_limit_delay)
+            response = self.http.get(base_url, params=params)
+            response.raise_for_status()
+            data = response.json()
+        except requests.exceptions.RequestException:
+            # E.g. a range with too many candles; a larger interval may still be served
+            data = None
+
+        if not data:
+            # If the request failed or returned no data, try the next larger interval.
+            # Stop if we're already at the largest.
+            if interval == '1h':
+                return None, full_url
+            next_interval = '5m' if interval == '1m' else '15m' if interval == '5m' else '1h'
+            return self._get_kline_data_recursive(symbol, next_interval, start_time, end_time)
+
+        # On success, format the data and return it
+        formatted_klines = [[int(k[0]), k[1], k[2], k[3], k[4], k[5], int(k[0]) + 60000, k[6], 0, '0', '0', '0']
+                            for k in data]
+        return formatted_klines, full_url
 
     def determine_interval(self, duration_minutes):
         if duration_minutes <= 180:
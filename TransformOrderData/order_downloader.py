@@ -3,6 +3,7 @@ import json
 import os
 import time
 from typing import Callable
+from src.mexc_http import MexcHttpClient
 
 class OrderDownloader:
     """
@@ -28,6 +29,8 @@ class OrderDownloader:
         self.num_pages = num_pages
         self.log = logger
         self.output_file_path = None
+        # Keeps the connection to www.mexc.com open across the pages and retries 429/5xx
+        self.http = MexcHttpClient.shared()
 
     def run_download(self) -> str | None:
         """
@@ -43,7 +46,7 @@ class OrderDownloader:
             # Step 1: Fetch the first page to identify the trader and get the first batch of orders.
             self.log("Fetching initial page to identify trader...")
             first_page_url = f"{self.BASE_URL}?limit=20&page=1&uid={self.uid}"
-            response = requests.get(first_page_url, timeout=15)
+            response = self.http.get(first_page_url, timeout=15)
             response.raise_for_status()  # Raise an exception for bad status codes (4xx or 5xx)
             initial_data = response.json()
 
@@ -71,7 +74,7 @@ class OrderDownloader:
                 for page_num in range(2, self.num_pages + 1):
                     self.log(f"Fetching page {page_num} of {self.num_pages}...")
                     url = f"{self.BASE_URL}?limit=20&page={page_num}&uid={self.uid}"
-                    response = requests.get(url, timeout=15)
+                    response = self.http.get(url, timeout=15)
                     response.raise_for_status()
                     data = response.json()
 
@@ -0,0 +1,79 @@
+# backfill.py
+
+import os
+import time
+import argparse
+from datetime import datetime
+from pathlib import Path
+from dotenv import load_dotenv
+from main import DB_FILE, create_gmail_checker
+from src.database_manager import DatabaseManager
+from src.archive_backfill import ArchiveBackfill
+from src.gmail_backfill import GmailBackfill
+from src.template_inducer import TemplateInducer
+
+
+def parse_date(value: str) -> int:
+    """Converts a YYYY-MM-DD date (local time) to a Unix timestamp."""
+    try:
+        return int(datetime.strptime(value, '%Y-%m-%d').timestamp())
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+def run_gmail_backfill(db_manager: DatabaseManager, args: argparse.Namespace):
+    """Backfills from the Gmail API with parallel date windows."""
+    # Registers the templates learned from earlier LLM extractions on the regex fast path
+    TemplateInducer.shared()
+    # The clones of the checker share its rate limiter
+    checker = create_gmail_checker()
+
+    end = args.end or int(time.time())
+    backfill = GmailBackfill(db_manager, checker.clone, os.getenv('QUERY'), workers=args.workers,
+                             window_days=args.window_days, verbose=args.verbose)
+    backfill.run(args.start, end)
+    print(checker.rate_limiter.format_stats())
+
+
+def main():
+    """
+    Rebuilds the trade history in the database from historical MEXC emails.
+    """
+    parser = argparse.ArgumentParser(description="Backfills the trades database from historical MEXC emails.")
+    subparsers = parser.add_subparsers(dest='source', required=True)
+
+    archive_parser = subparsers.add_parser('archive', help="Import exported mail (mbox files or EML directories).")
+    archive_parser.add_argument('paths', nargs='+', help="mbox files, EML files or directories containing them.")
+    archive_parser.add_argument('--workers', type=int, default=None,
+                                help="Number of parser processes (default: number of CPUs).")
+    archive_parser.add_argument('--commit-every', type=int, default=5000,
+                                help="Number of emails per database transaction.")
+    archive_parser.add_argument('--verbose', action='store_true', help="Print the result of every email.")
+
+    gmail_parser = subparsers.add_parser('gmail', help="Fetch a date range from the Gmail API (QUERY in .env).")
+    gmail_parser.add_argument('--start', type=parse_date, required=True, help="First day to backfill (YYYY-MM-DD).")
+    gmail_parser.add_argument('--end', type=parse_date, default=None,
+                              help="Day to stop before (YYYY-MM-DD, default: now).")
+    gmail_parser.add_argument('--window-days', type=float, default=GmailBackfill.DEFAULT_WINDOW_DAYS,
+                              help="Size of the date windows that are fetched in parallel and checkpointed.")
+    gmail_parser.add_argument('--workers', type=int, default=GmailBackfill.DEFAULT_WORKERS,
+                              help="Number of windows fetched in parallel.")
+    gmail_parser.add_argument('--verbose', action='store_true', help="Print the result of every email.")
+    args = parser.parse_args()
+
+    env_path = Path('.') / '.env'
+    load_dotenv(dotenv_path=env_path)
+
+    db_manager = DatabaseManager(DB_FILE)
+    try:
+        if args.source == 'archive':
+            ArchiveBackfill(db_manager, workers=args.workers, commit_every=args.commit_every,
+                            verbose=args.verbose).run(args.paths)
+        elif args.source == 'gmail':
+            run_gmail_backfill(db_manager, args)
+    finally:
+        db_manager.close_connection()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+# benchmarks/bench_alert_scheduler.py
+"""
+Simulates a day of position monitoring on a virtual clock and compares:
+
+- polling:   a price cycle every --price-interval seconds that selects the due trades
+             (the daemon before the AlertScheduler).
+- scheduler: the AlertScheduler heap; the daemon wakes up exactly when a check is due.
+
+Trades open at random times with the alert schedules of a generated trader configuration.
+Reported are the wakeups, how many of them found nothing to do, and how late the checks
+ran after they became due. The heap operations are timed for real.
+
+Usage:
+    python benchmarks/bench_alert_scheduler.py [--trades 500] [--price-interval 10]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alert_scheduler import AlertScheduler  # noqa: E402
+from src.trader_config import TraderConfig  # noqa: E402
+
+DAY = 86400
+
+
+def make_trader_config(tmp: str) -> TraderConfig:
+    config_file = os.path.join(tmp, "trader_config.json")
+    with open(config_file, 'w') as f:
+        json.dump([{"trader": f"Trader{i}", "initial_wait_time": f"{5 + i}m", "reminder_intervals": ["30m", "2h"]}
+                   for i in range(40)], f)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return TraderConfig(config_file)
+
+
+def make_trades(count: int, rng: random.Random) -> list[dict]:
+    trades = [{'id': i, 'trader': f"Trader{rng.randrange(40)}", 'timestamp': rng.randrange(DAY), 'alerts_sent': 0}
+              for i in range(count)]
+    for trade in trades:
+        # Like the trade events of Analyze: the stored next alert time of a new trade is its open time
+        trade['next_alert_at'] = trade['timestamp']
+    return trades
+
+
+def check_times(trades: list[dict], trader_config: TraderConfig) -> list[int]:
+    """The due time of every scheduled alert; every check sends its alert in this simulation."""
+    times = []
+    for trade in trades:
+        alerts_sent = 0
+        while (due_at := trader_config.next_alert_at(trade['trader'], trade['timestamp'], alerts_sent)) is not None:
+            times.append(due_at)
+            alerts_sent += 1
+    return sorted(times)
+
+
+def simulate_polling(due_times: list[int], interval: int) -> tuple[int, int, list[int]]:
+    wakeups = idle = 0
+    delays = []
+    position = 0
+    for now in range(0, 2 * DAY, interval):
+        wakeups += 1
+        start = position
+        while position < len(due_times) and due_times[position] <= now:
+            delays.append(now - due_times[position])
+            position += 1
+        idle += position == start
+    return wakeups, idle, delays
+
+
+def simulate_scheduler(trades: list[dict], trader_config: TraderConfig, interval: int) -> tuple[int, int, list[int]]:
+    scheduler = AlertScheduler(trader_config, recheck_interval=interval)
+    alerts_sent = {}
+    # Trades arrive through the trade listener as their open emails are committed
+    for trade in sorted(trades, key=lambda t: t['timestamp']):
+        scheduler.trade_opened(trade)
+    wakeups = idle = 0
+    delays = []
+    trades_by_id = {trade['id']: trade for trade in trades}
+    while (now := scheduler.next_due_at()) is not None:
+        wakeups += 1
+        due = scheduler.pop_due(now)
+        idle += not due
+        for trade_id in due:
+            trade = trades_by_id[trade_id]
+            sent = alerts_sent.get(trade_id, 0)
+            delays.append(now - trader_config.next_alert_at(trade['trader'], trade['timestamp'], sent))
+            alerts_sent[trade_id] = sent + 1
+            scheduler.rearm(trade_id, trader_config.next_alert_at(trade['trader'], trade['timestamp'], sent + 1), now)
+    return wakeups, idle, delays
+
+
+def describe(name: str, wakeups: int, idle: int, delays: list[int]):
+    print(f"  {name:<9}: {wakeups:>6} wakeups, {idle:>6} idle, {len(delays)} checks, "
+          f"delay mean {statistics.mean(delays):5.1f}s / max {max(delays):3d}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=500, help="Trades opened during the day.")
+    parser.add_argument("--price-interval", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        trader_config = make_trader_config(tmp)
+    trades = make_trades(args.trades, rng)
+
+    print(f"{args.trades} trades over one day, 3 alerts each, price interval {args.price_interval}s")
+    describe("polling", *simulate_polling(check_times(trades, trader_config), args.price_interval))
+    describe("scheduler", *simulate_scheduler(trades, trader_config, args.price_interval))
+
+    # Cost of the heap itself with many open trades
+    scheduler = AlertScheduler(trader_config, recheck_interval=args.price_interval)
+    many = make_trades(100000, rng)
+    start = time.perf_counter()
+    for trade in many:
+        scheduler.trade_opened(trade)
+    popped = len(scheduler.pop_due(DAY * 2))
+    seconds = time.perf_counter() - start
+    print(f"  heap cost: {seconds / popped * 1e6:.2f}µs per trade scheduled and popped ({popped} trades)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+# benchmarks/bench_concurrent_access.py
+"""
+Simulates the monitor ingesting emails while a GUI user browses and closes trades on
+the same database file, once with the old rollback journal and once with WAL.
+
+The monitor applies open emails in batches of 50 with a simulated Gmail round trip
+between the batches, and commits every N emails. The "GUI" uses its own DatabaseManager
+(like a separate process) and alternates between loading all trades and manually
+closing one. Reported are the GUI latencies and the number of "database is locked" errors.
+
+Usage:
+    python benchmarks/bench_concurrent_access.py [--emails 5000] [--fetch-latency 0.02]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import Analyze  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+
+
+class RollbackJournalDatabaseManager(DatabaseManager):
+    """The connection settings before WAL: rollback journal and the default 5s busy timeout."""
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def make_email(index: int) -> dict:
+    return {"id": f"bench-{index}", "subject": Analyze.OPEN_SUBJECT, "sender": "info@notify.mexc.com",
+            "snippet": f"You have opened a PAIR{index} LONG position. Entry Price: 2.5; Trader: Trader{index % 40}",
+            "labels": [], "date": "Mon, 01 Jan 2024 12:00:00 +0000", "timestamp": 1704067200 + index}
+
+
+def monitor(db_manager: DatabaseManager, emails: int, commit_every: int, fetch_latency: float,
+            done: threading.Event):
+    with db_manager.unit_of_work(commit_every) as unit_of_work:
+        for index in range(emails):
+            if index % 50 == 0:
+                time.sleep(fetch_latency)
+            analyzer = Analyze(make_email(index), unit_of_work)
+            analyzer.parse()
+            analyzer.apply()
+    done.set()
+
+
+def gui(db_manager: DatabaseManager, done: threading.Event, latencies: dict, errors: list):
+    trade_id = 1
+    while not done.is_set():
+        start = time.perf_counter()
+        try:
+            db_manager.get_all_trades_details()
+            latencies['read'].append(time.perf_counter() - start)
+            start = time.perf_counter()
+            db_manager.get_connection().execute("UPDATE trades SET status = 'CLOSED' WHERE id = ?", (trade_id,))
+            db_manager.get_connection().commit()
+            latencies['write'].append(time.perf_counter() - start)
+        except sqlite3.OperationalError as e:
+            errors.append(str(e))
+            db_manager.get_connection().rollback()
+        trade_id += 1
+        time.sleep(0.01)
+
+
+def run(manager_class, emails: int, commit_every: int, fetch_latency: float) -> tuple[float, dict, list]:
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_file = os.path.join(tmp, "trades.db")
+        monitor_db = manager_class(db_file)
+        gui_db = manager_class(db_file)
+        done = threading.Event()
+        latencies = {'read': [], 'write': []}
+        errors = []
+        gui_thread = threading.Thread(target=gui, args=(gui_db, done, latencies, errors))
+        start = time.perf_counter()
+        gui_thread.start()
+        monitor(monitor_db, emails, commit_every, fetch_latency, done)
+        elapsed = time.perf_counter() - start
+        gui_thread.join()
+        monitor_db.close_connection()
+        gui_db.close_connection()
+    return elapsed, latencies, errors
+
+
+def describe(samples: list) -> str:
+    if not samples:
+        return "no samples"
+    return f"median {statistics.median(samples) * 1000:7.1f}ms, max {max(samples) * 1000:7.1f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=5000)
+    parser.add_argument("--fetch-latency", type=float, default=0.02,
+                        help="Simulated Gmail round trip per batch of 50 emails, in seconds.")
+    args = parser.parse_args()
+
+    print(f"Monitor applies {args.emails} emails while a GUI reads and writes")
+    scenarios = [
+        ("rollback journal, commit every 1000", RollbackJournalDatabaseManager, 1000),
+        ("WAL, commit every 1000", DatabaseManager, 1000),
+        ("WAL, commit every 50", DatabaseManager, 50),
+    ]
+    for name, manager_class, commit_every in scenarios:
+        elapsed, latencies, errors = run(manager_class, args.emails, commit_every, args.fetch_latency)
+        print(f"  {name}: monitor {args.emails / elapsed:6.0f} emails/s, {len(errors)} 'locked' error(s)")
+        print(f"     GUI load all trades: {describe(latencies['read'])}")
+        print(f"     GUI close a trade:   {describe(latencies['write'])}")
+
+
+if __name__ == "__main__":
+    main()
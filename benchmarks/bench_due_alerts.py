@@ -0,0 +1,92 @@
+# benchmarks/bench_due_alerts.py
+"""
+Measures how the monitor finds the open trades that are due for an alert check:
+
+- full scan: load every open trade and calculate its next alert time from the trader
+  configuration in Python (the monitor before next_alert_at was stored).
+- due index:  select only the trades whose stored next_alert_at has passed, through
+  the partial index of the schema migrations.
+
+Most trades are scheduled in the future, like in a monitor with long reminder intervals.
+
+Usage:
+    python benchmarks/bench_due_alerts.py [--open 20000] [--due 20] [--runs 50]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_manager import DatabaseManager  # noqa: E402
+from src.trader_config import TraderConfig  # noqa: E402
+
+NOW = 1800000000
+
+
+def fill(db_manager: DatabaseManager, trader_config: TraderConfig, open_trades: int, due: int,
+         rng: random.Random):
+    rows = []
+    for i in range(open_trades):
+        trader = f"Trader{rng.randrange(40)}"
+        # The due trades were opened long ago, the others within the initial wait
+        timestamp = NOW - 86400 if i < due else NOW - rng.randrange(3600)
+        next_alert_at = trader_config.next_alert_at(trader, timestamp, 0)
+        rows.append((f"PAIR{i}", trader, 1.0, "Mon, 01 Jan 2024 12:00:00 +0000", "LONG", "OPEN", timestamp, next_alert_at))
+    db_manager.cursor.executemany(
+        """INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction, status, timestamp, next_alert_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""", rows)
+    db_manager.conn.commit()
+
+
+def full_scan(db_manager: DatabaseManager, trader_config: TraderConfig) -> list[dict]:
+    """The selection of check_open_positions before next_alert_at was stored."""
+    due = []
+    for trade in db_manager.get_open_trades_details():
+        next_alert_at = trader_config.next_alert_at(trade['trader'], trade['timestamp'], trade['alerts_sent'])
+        if next_alert_at is not None and NOW >= next_alert_at:
+            due.append(trade)
+    return due
+
+
+def measure(select, runs: int) -> tuple[float, int]:
+    start = time.perf_counter()
+    for _ in range(runs):
+        found = len(select())
+    return (time.perf_counter() - start) / runs, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--open", type=int, default=20000, help="Number of open trades.")
+    parser.add_argument("--due", type=int, default=20, help="Number of those that are due.")
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        config_file = os.path.join(tmp, "trader_config.json")
+        with open(config_file, 'w') as f:
+            json.dump([{"trader": f"Trader{i}", "initial_wait_time": "2h", "reminder_intervals": ["4h", "1d"]}
+                       for i in range(40)], f)
+        trader_config = TraderConfig(config_file)
+        db_manager = DatabaseManager(os.path.join(tmp, "trades.db"))
+        fill(db_manager, trader_config, args.open, args.due, random.Random(42))
+        scan_seconds, scan_found = measure(lambda: full_scan(db_manager, trader_config), args.runs)
+        index_seconds, index_found = measure(lambda: db_manager.get_due_trades(NOW), args.runs)
+        db_manager.close_connection()
+
+    print(f"{args.open} open trades, {args.due} due")
+    print(f"  full scan: {scan_seconds * 1000:8.2f}ms per check, {scan_found} due")
+    print(f"  due index: {index_seconds * 1000:8.2f}ms per check, {index_found} due")
+    print(f"  speedup  : {scan_seconds / index_seconds:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+# benchmarks/bench_gmail_backfill.py
+"""
+Measures the parallel Gmail backfill (GmailBackfill) against a stubbed Gmail service
+that answers `after:`/`before:` queries with a simulated round-trip latency.
+
+Every run starts from an empty temporary database, and the stub's trade emails
+alternate opens and closes, so the final trade count checks the merge order.
+
+Usage:
+    python benchmarks/bench_gmail_backfill.py [--days 120] [--emails-per-day 20] [--latency 0.05] [--quota UNITS]
+
+By default every worker count runs twice: with a quota that never binds, which shows how
+the parallel windows hide the round-trip latency, and with the real per-user quota of 250
+units/s, where the backfill is quota-bound and more workers cannot help. --quota runs
+only the given quota.
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from email.utils import formatdate
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_manager import DatabaseManager  # noqa: E402
+from src.gmail_backfill import GmailBackfill  # noqa: E402
+from src.gmail_checker import GmailChecker  # noqa: E402
+from src.gmail_rate_limiter import GmailRateLimiter  # noqa: E402
+
+START = 1704067200  # 2024-01-01 00:00:00 UTC
+# Far above what the stub's latency allows, so the rate limiter never waits
+UNBOUND_QUOTA = 100_000.0
+
+
+def make_message(index: int, timestamp: int) -> dict:
+    """Builds a message resource; even indexes open a position, odd indexes close it."""
+    pair = f"PAIR{index // 2}"
+    trader = f"Trader{index // 2 % 7}"
+    if index % 2 == 0:
+        subject = "[MEXC][Copy Trade] Position Opened Successfully"
+        snippet = f"You have opened a {pair} LONG position. Entry Price: 1.5; Trader: {trader}"
+    else:
+        subject = "[MEXC][Copy Trade] Position Closed Successfully"
+        snippet = f"Your {pair} position has been closed successfully. Trader: {trader}"
+    return {
+        "id": f"{index:08x}",
+        "snippet": snippet,
+        "labelIds": ["INBOX"],
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "Subject", "value": subject},
+                {"name": "From", "value": "info@notify.mexc.com"},
+                {"name": "Date", "value": formatdate(timestamp)},
+            ],
+        },
+    }
+
+
+class StubRequest:
+    def __init__(self, service, result):
+        self.service = service
+        self.result = result
+
+    def execute(self):
+        self.service.round_trip()
+        return self.result
+
+
+class StubBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trip()
+        for request_id, request in self.requests:
+            self.callback(request_id, request.result, None)
+
+
+class StubGmailService:
+    """The part of the Gmail service used by GmailChecker, with date filtering on the query."""
+
+    def __init__(self, mailbox: list, latency: float):
+        self.mailbox = mailbox  # (timestamp, message), oldest first
+        self.messages_by_id = {message['id']: message for _, message in mailbox}
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.round_trips = 0
+
+    def round_trip(self):
+        with self.lock:
+            self.round_trips += 1
+        time.sleep(self.latency)
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q='', maxResults=500, pageToken=None, **kwargs):
+        after = int(re.search(r"after:(\d+)", q).group(1))
+        before = int(re.search(r"before:(\d+)", q).group(1))
+        # Newest first, like Gmail
+        ids = [message['id'] for timestamp, message in reversed(self.mailbox) if after < timestamp < before]
+        offset = int(pageToken or 0)
+        result = {"messages": [{"id": msg_id} for msg_id in ids[offset:offset + maxResults]]}
+        if offset + maxResults < len(ids):
+            result["nextPageToken"] = str(offset + maxResults)
+        return StubRequest(self, result)
+
+    def get(self, userId, id, **kwargs):
+        return StubRequest(self, self.messages_by_id[id])
+
+    def new_batch_http_request(self, callback):
+        return StubBatch(self, callback)
+
+
+def run(mailbox: list, latency: float, quota: float, days: int, workers: int) -> tuple[float, int, int, int]:
+    service = StubGmailService(mailbox, latency)
+    rate_limiter = GmailRateLimiter(quota)
+    # The database migrations and the backfill report on the console
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(os.path.join(tmp, "trades.db"))
+        backfill = GmailBackfill(
+            db_manager, lambda: GmailChecker(scopes=[], service=service, rate_limiter=rate_limiter), "label:mexc",
+            workers=workers, window_days=7)
+        start = time.perf_counter()
+        stats = backfill.run(START, START + days * 86400)
+        elapsed = time.perf_counter() - start
+        open_trades = len(db_manager.get_open_trades_details())
+        db_manager.close_connection()
+    return elapsed, stats['applied'], open_trades, service.round_trips
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--emails-per-day", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round-trip time in seconds.")
+    parser.add_argument("--quota", type=float, default=None,
+                        help="Quota units per second of the shared rate limiter (Gmail allows 250 per user). "
+                             "By default both an unbound quota and 250 are run.")
+    args = parser.parse_args()
+
+    total = args.days * args.emails_per_day
+    interval = 86400 // args.emails_per_day
+    mailbox = [(START + i * interval, make_message(i, START + i * interval)) for i in range(total)]
+    quotas = [args.quota] if args.quota else [UNBOUND_QUOTA, GmailRateLimiter.DEFAULT_UNITS_PER_SECOND]
+
+    print(f"Backfilling {total} emails over {args.days} days with a simulated latency of "
+          f"{args.latency * 1000:.0f}ms per round trip")
+    for quota in quotas:
+        print(f"{quota:g} quota units/s (at most {quota / GmailRateLimiter.QUOTA_UNITS['messages.get']:g} messages/s):")
+        baseline = None
+        for workers in (1, 2, 4, 8):
+            elapsed, applied, open_trades, round_trips = run(mailbox, args.latency, quota, args.days, workers)
+            rate = applied / elapsed if elapsed else 0.0
+            baseline = baseline or rate
+            print(f"  workers={workers}: {applied:>5} applied, {open_trades} left open, {round_trips:>4} round trips, "
+                  f"{rate:8.1f} emails/s ({rate / baseline:4.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/bench_gmail_batch.py
+"""
+Compares sequential and batched message fetching in GmailChecker.get_new_emails
+against a stubbed Gmail service that simulates a fixed round-trip latency.
+
+Usage:
+    python benchmarks/bench_gmail_batch.py [--emails 100] [--latency 0.05]
+"""
+
+import argparse
+import base64
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.gmail_checker import GmailChecker  # noqa: E402
+from src.gmail_rate_limiter import GmailRateLimiter  # noqa: E402
+
+
+def make_message(msg_id: str) -> dict:
+    """Builds a message resource shaped like a MEXC 'position opened' notification."""
+    snippet = f"You have opened a BTC LONG position. Entry Price: 65000.5; Trader: Trader{msg_id}"
+    return {
+        "id": msg_id,
+        "snippet": snippet,
+        "labelIds": ["INBOX"],
+        "payload": {
+            "mimeType": "text/plain",
+            "headers": [
+                {"name": "Subject", "value": "[MEXC][Copy Trade] Position Opened Successfully"},
+                {"name": "From", "value": "info@notify.mexc.com"},
+                {"name": "Date", "value": "Mon, 01 Jan 2024 12:00:00 +0000"},
+            ],
+            "body": {"data": base64.urlsafe_b64encode(snippet.encode()).decode()},
+        },
+    }
+
+
+class StubRequest:
+    def __init__(self, service, result):
+        self.service = service
+        self.result = result
+
+    def execute(self):
+        # Every standalone call pays a full HTTPS round trip.
+        self.service.round_trips += 1
+        time.sleep(self.service.latency)
+        return self.result
+
+
+class StubBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        # A batch is one round trip, whatever the number of calls inside it.
+        self.service.round_trips += 1
+        time.sleep(self.service.latency)
+        for request_id, request in self.requests:
+            self.callback(request_id, request.result, None)
+
+
+class StubGmailService:
+    """Implements the small part of the Gmail discovery service used by GmailChecker."""
+
+    def __init__(self, num_emails: int, latency: float):
+        self.latency = latency
+        self.round_trips = 0
+        self.messages_by_id = {str(i): make_message(str(i)) for i in range(num_emails)}
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def list(self, userId, q=None, **kwargs):
+        return StubRequest(self, {"messages": [{"id": msg_id} for msg_id in self.messages_by_id]})
+
+    def get(self, userId, id, **kwargs):
+        return StubRequest(self, self.messages_by_id[id])
+
+    def new_batch_http_request(self, callback):
+        return StubBatch(self, callback)
+
+
+def run(num_emails: int, latency: float, batch_size: int) -> tuple[float, int, int]:
+    service = StubGmailService(num_emails, latency)
+    # Only the round trips are measured here, not the Gmail quota
+    checker = GmailChecker(scopes=[], batch_size=batch_size, service=service,
+                           rate_limiter=GmailRateLimiter(units_per_second=None))
+    start = time.perf_counter()
+    emails = checker.get_new_emails(query="")
+    elapsed = time.perf_counter() - start
+    return elapsed, service.round_trips, len(emails)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round-trip time in seconds.")
+    args = parser.parse_args()
+
+    print(f"Fetching {args.emails} emails with a simulated latency of {args.latency * 1000:.0f}ms per round trip")
+    baseline = None
+    for batch_size in (1, 10, 50, 100):
+        elapsed, round_trips, fetched = run(args.emails, args.latency, batch_size)
+        per_100 = elapsed / fetched * 100 if fetched else 0.0
+        baseline = baseline or per_100
+        print(f"  batch_size={batch_size:>3}: {round_trips:>4} round trips, {per_100:6.3f}s per 100 emails "
+              f"({baseline / per_100:5.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
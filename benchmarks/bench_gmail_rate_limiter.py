@@ -0,0 +1,157 @@
+# benchmarks/bench_gmail_rate_limiter.py
+"""
+Fetches messages with several parallel GmailCheckers against a stubbed Gmail service
+that enforces a per-second quota and answers 429 to every call above it, and compares:
+
+- no limiter:     no quota accounting and no retries; throttled messages are lost.
+- backoff only:   no quota accounting, but jittered exponential backoff and AIMD.
+- quota + backoff: the token bucket keeps the calls below the quota as well.
+
+Usage:
+    python benchmarks/bench_gmail_rate_limiter.py [--emails 3000] [--quota 1000] [--threads 4] [--latency 0.02]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httplib2
+from googleapiclient.errors import HttpError
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.gmail_checker import GmailChecker  # noqa: E402
+from src.gmail_rate_limiter import GmailRateLimiter  # noqa: E402
+
+UNITS_PER_GET = GmailRateLimiter.QUOTA_UNITS['messages.get']
+
+
+def make_message(msg_id: str) -> dict:
+    return {
+        "id": msg_id,
+        "snippet": f"You have opened a BTC LONG position. Entry Price: 65000.5; Trader: Trader{msg_id}",
+        "labelIds": ["INBOX"],
+        "payload": {"headers": [
+            {"name": "Subject", "value": "[MEXC][Copy Trade] Position Opened Successfully"},
+            {"name": "Date", "value": "Mon, 01 Jan 2024 12:00:00 +0000"},
+        ]},
+    }
+
+
+class StubRequest:
+    def __init__(self, service, msg_id):
+        self.service = service
+        self.msg_id = msg_id
+
+    def execute(self):
+        self.service.round_trip()
+        if not self.service.charge():
+            raise self.service.throttle_error()
+        return make_message(self.msg_id)
+
+
+class StubBatch:
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.round_trip()
+        for request_id, request in self.requests:
+            # Gmail checks the quota for every call inside a batch on its own
+            if self.service.charge():
+                self.callback(request_id, make_message(request.msg_id), None)
+            else:
+                self.callback(request_id, None, self.service.throttle_error())
+
+
+class ThrottlingGmailService:
+    """A Gmail stub with a fixed one-second quota window shared by all callers."""
+
+    def __init__(self, quota: float, latency: float):
+        self.quota = quota
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.window = int(time.monotonic())
+        self.used = 0
+        self.throttled = 0
+
+    def round_trip(self):
+        time.sleep(self.latency)
+
+    def charge(self) -> bool:
+        with self.lock:
+            window = int(time.monotonic())
+            if window != self.window:
+                self.window, self.used = window, 0
+            if self.used + UNITS_PER_GET > self.quota:
+                self.throttled += 1
+                return False
+            self.used += UNITS_PER_GET
+            return True
+
+    @staticmethod
+    def throttle_error() -> HttpError:
+        return HttpError(httplib2.Response({'status': 429}), b'{"error": {"message": "Too many requests"}}')
+
+    def users(self):
+        return self
+
+    def messages(self):
+        return self
+
+    def get(self, userId, id, **kwargs):
+        return StubRequest(self, id)
+
+    def new_batch_http_request(self, callback):
+        return StubBatch(self, callback)
+
+
+def run(num_emails: int, quota: float, threads: int, latency: float, limiter: GmailRateLimiter):
+    service = ThrottlingGmailService(quota, latency)
+    msg_ids = [str(i) for i in range(num_emails)]
+    shards = [msg_ids[i::threads] for i in range(threads)]
+
+    def fetch(shard):
+        checker = GmailChecker(scopes=[], batch_size=50, service=service, rate_limiter=limiter)
+        return len(list(checker.iter_emails(shard)))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(threads) as pool:
+        fetched = sum(pool.map(fetch, shards))
+    return time.perf_counter() - start, fetched, service.throttled
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=3000)
+    parser.add_argument("--quota", type=float, default=1000, help="Quota units per second enforced by the stub.")
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.02, help="Simulated round-trip time in seconds.")
+    args = parser.parse_args()
+
+    print(f"Fetching {args.emails} emails on {args.threads} threads from a stub that allows "
+          f"{args.quota:g} quota units/s ({args.quota / UNITS_PER_GET:g} messages/s)")
+    scenarios = [
+        ("no limiter", GmailRateLimiter(units_per_second=None, max_retries=0)),
+        ("backoff only", GmailRateLimiter(units_per_second=None)),
+        ("quota + backoff", GmailRateLimiter(units_per_second=args.quota * 0.95, burst=args.quota * 0.5)),
+    ]
+    for name, limiter in scenarios:
+        elapsed, fetched, throttled = run(args.emails, args.quota, args.threads, args.latency, limiter)
+        print(f"  {name:<15}: {fetched:>5}/{args.emails} fetched, {throttled:>5} throttled calls, "
+              f"{limiter.retries:>3} retries, {fetched / elapsed:7.1f} messages/s, "
+              f"concurrency limit lowest {limiter.min_concurrency_seen}")
+
+
+if __name__ == "__main__":
+    main()
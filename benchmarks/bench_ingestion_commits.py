@@ -0,0 +1,86 @@
+# benchmarks/bench_ingestion_commits.py
+"""
+Measures bulk ingestion through a unit of work with different commit policies: one
+commit per email (like Analyze before the unit of work), one commit per Gmail batch
+of 50 emails (the monitor's default) and a single commit for the whole cycle.
+
+The emails are a mix of opens, re-opens of an already open trade (the UPDATE path)
+and closes. Every policy also runs on the old rollback journal with the default
+synchronous=FULL, where each commit costs several fsyncs.
+
+The database is created in a temporary directory; use --dir to put it on the disk
+the monitor really uses (tmpfs hides the cost of fsync).
+
+Usage:
+    python benchmarks/bench_ingestion_commits.py [--emails 2000] [--dir PATH]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import Analyze  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+
+
+class RollbackJournalDatabaseManager(DatabaseManager):
+    """The connection settings before WAL: rollback journal with synchronous=FULL."""
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def make_email(index: int) -> dict:
+    """Every pair is opened, opened again (an update) and then closed."""
+    pair, trader, step = f"PAIR{index // 3}", f"Trader{index // 3 % 40}", index % 3
+    if step < 2:
+        subject = Analyze.OPEN_SUBJECT
+        snippet = f"You have opened a {pair} LONG position. Entry Price: {2.5 + step}; Trader: {trader}"
+    else:
+        subject = Analyze.CLOSE_SUBJECT
+        snippet = f"Your {pair} position has been closed successfully. Trader: {trader}"
+    return {"id": f"bench-{index}", "subject": subject, "snippet": snippet, "sender": "info@notify.mexc.com",
+            "labels": [], "date": "Mon, 01 Jan 2024 12:00:00 +0000", "timestamp": 1704067200 + index}
+
+
+def run(manager_class, emails: list[dict], commit_every: int | None, directory: str | None) -> tuple[float, int]:
+    with tempfile.TemporaryDirectory(dir=directory) as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_manager = manager_class(os.path.join(tmp, "trades.db"))
+        start = time.perf_counter()
+        with db_manager.unit_of_work(commit_every) as unit_of_work:
+            for batch_start in range(0, len(emails), 50):
+                Analyze.process_batch(emails[batch_start:batch_start + 50], unit_of_work)
+        elapsed = time.perf_counter() - start
+        closed = db_manager.cursor.execute("SELECT COUNT(*) FROM trades WHERE status = 'CLOSED'").fetchone()[0]
+        db_manager.close_connection()
+    return elapsed, closed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=2000)
+    parser.add_argument("--dir", default=None, help="Directory for the temporary database.")
+    args = parser.parse_args()
+
+    emails = [make_email(i) for i in range(args.emails)]
+    print(f"Ingesting {args.emails} emails (opens, updates and closes)")
+    baseline = None
+    for journal, manager_class in (("rollback journal", RollbackJournalDatabaseManager), ("WAL", DatabaseManager)):
+        for policy, commit_every in (("commit per email", 1), ("commit per batch", 50), ("commit per cycle", None)):
+            elapsed, closed = run(manager_class, emails, commit_every, args.dir)
+            baseline = baseline or elapsed
+            print(f"  {journal:<16} {policy:<17}: {args.emails / elapsed:9.0f} emails/s, "
+                  f"{baseline / elapsed:6.1f}x, {closed} trades closed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/bench_mexc_http.py
+"""
+Sends sequential requests to a local stub of the MEXC API, once with a bare
+requests.get() per call (a new connection every time, like the MEXC callers before)
+and once through the pooled MexcHttpClient.
+
+The stub speaks HTTP/1.1 with keep-alive and charges --handshake seconds for every new
+connection, to stand in for the TCP and TLS handshake with the exchange. With
+--throttle N it answers every Nth request with 429 and a Retry-After header.
+
+Usage:
+    python benchmarks/bench_mexc_http.py [--requests 200] [--handshake 0.03] [--throttle 0]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mexc_http import MexcHttpClient  # noqa: E402
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Keep-alive
+    # Headers and body are written separately; with Nagle a kept-alive connection waits for the delayed ACK
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+        time.sleep(self.server.handshake)
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+            throttled = server.throttle and server.requests % server.throttle == 0
+        if throttled:
+            self.send_response(429)
+            self.send_header("Retry-After", "0.05")
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        payload = b'{"symbol": "BTCUSDT", "price": "65000.5"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(handshake: float, throttle: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.daemon_threads = True
+    server.handshake = handshake
+    server.throttle = throttle
+    server.lock = threading.Lock()
+    server.requests = server.connections = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run(server: ThreadingHTTPServer, get, count: int) -> tuple[list[float], int, int]:
+    url = f"http://127.0.0.1:{server.server_address[1]}/api/v3/ticker/price"
+    server.requests = server.connections = 0
+    latencies = []
+    failed = 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(count):
+            start = time.perf_counter()
+            response = get(url, params={'symbol': 'BTCUSDT'})
+            latencies.append(time.perf_counter() - start)
+            failed += response.status_code != 200
+    return latencies, server.connections, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--handshake", type=float, default=0.03, help="Simulated cost of a new connection in seconds.")
+    parser.add_argument("--throttle", type=int, default=0, help="Answer every Nth request with 429 (0: never).")
+    args = parser.parse_args()
+
+    server = start_server(args.handshake, args.throttle)
+    client = MexcHttpClient()
+    print(f"{args.requests} sequential requests, {args.handshake * 1000:g}ms per new connection"
+          + (f", every {args.throttle}th request throttled" if args.throttle else ""))
+    results = {}
+    for name, get in (("bare requests.get", lambda url, params: requests.get(url, params=params, timeout=10)),
+                      ("MexcHttpClient", client.get)):
+        latencies, connections, failed = run(server, get, args.requests)
+        results[name] = statistics.median(latencies)
+        print(f"  {name:<17}: median {results[name] * 1000:6.1f}ms, total {sum(latencies):6.2f}s, "
+              f"{connections:>4} connection(s), {failed:>3} failed")
+    print(f"  speedup          : {results['bare requests.get'] / results['MexcHttpClient']:6.1f}x per request")
+    print(client.format_stats())
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
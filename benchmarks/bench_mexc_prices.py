@@ -0,0 +1,107 @@
+# benchmarks/bench_mexc_prices.py
+"""
+Fetches the prices for a monitor cycle over many open trades from a local stub of the
+MEXC ticker endpoint, and compares:
+
+- per trade:  MexcApiClient.get_current_price() for every due trade (the monitor before).
+- snapshot:   MexcApiClient.get_prices() once for all due trades.
+
+The stub serves --symbols tickers and adds --latency seconds to every response to
+simulate the round trip to the exchange. Several trades hold the same pair.
+
+Usage:
+    python benchmarks/bench_mexc_prices.py [--trades 100] [--pairs 30] [--symbols 2000] [--latency 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mexc_api_client import MexcApiClient  # noqa: E402
+
+
+class TickerHandler(BaseHTTPRequestHandler):
+    """Answers /api/v3/ticker/price for one symbol, or for all symbols without a parameter."""
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.requests += 1
+        time.sleep(server.latency)
+        url = urlparse(self.path)
+        symbol = parse_qs(url.query).get('symbol', [None])[0]
+        if symbol is None:
+            body = [{"symbol": s, "price": p} for s, p in server.tickers.items()]
+        elif symbol in server.tickers:
+            body = {"symbol": symbol, "price": server.tickers[symbol]}
+        else:
+            self.send_response(400)
+            self.end_headers()
+            return
+        payload = json.dumps(body).encode()
+        server.bytes_sent += len(payload)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(symbols: int, latency: float) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TickerHandler)
+    server.tickers = {f"PAIR{i}USDT": f"{1 + i / 100:.4f}" for i in range(symbols)}
+    server.latency = latency
+    server.lock = threading.Lock()
+    server.requests = 0
+    server.bytes_sent = 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def measure(server: ThreadingHTTPServer, fetch) -> tuple[float, int, int, dict]:
+    server.requests = server.bytes_sent = 0
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        prices = fetch()
+    return time.perf_counter() - start, server.requests, server.bytes_sent, prices
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=100, help="Due trades in the cycle.")
+    parser.add_argument("--pairs", type=int, default=30, help="Distinct pairs held by those trades.")
+    parser.add_argument("--symbols", type=int, default=2000, help="Symbols listed by the stub exchange.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round trip per request in seconds.")
+    args = parser.parse_args()
+
+    server = start_server(args.symbols, args.latency)
+    client = MexcApiClient()
+    client.API_BASE_URL = f"http://127.0.0.1:{server.server_address[1]}"
+    pairs = [f"PAIR{i % args.pairs}" for i in range(args.trades)]
+
+    print(f"{args.trades} due trades on {args.pairs} pairs, stub with {args.symbols} symbols "
+          f"and {args.latency * 1000:g}ms latency")
+    per_trade = measure(server, lambda: {pair: client.get_current_price(pair) for pair in pairs})
+    snapshot = measure(server, lambda: client.get_prices(pairs))
+    for name, (seconds, requests, sent, prices) in (("per trade", per_trade), ("snapshot", snapshot)):
+        print(f"  {name:<9}: {requests:>4} request(s), {seconds * 1000:8.1f}ms, {sent / 1024:7.1f} KiB, "
+              f"{len(prices)} prices")
+    assert per_trade[3] == snapshot[3], "the snapshot returned different prices"
+    print(f"  speedup  : {per_trade[0] / snapshot[0]:8.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
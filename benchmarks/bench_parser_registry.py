@@ -0,0 +1,90 @@
+# benchmarks/bench_parser_registry.py
+"""
+Runs the regex fast path of the parser registry over a synthetic corpus of MEXC
+emails and reports emails/second and the fraction that would fall through to
+the LLMDataExtractor.
+
+Usage:
+    python benchmarks/bench_parser_registry.py [--emails 100000]
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser_registry import build_default_registry, OPEN_POSITION, CLOSE_POSITION  # noqa: E402
+
+PAIRS = ["BTC", "ETH", "SOL", "BERA", "DOGE", "PEPE"]
+TRADERS = ["Limer", "Normie", "Whale42"]
+
+# (email type, weight, snippet template) - roughly the mix seen after a small template drift
+CORPUS_FORMATS = [
+    (OPEN_POSITION, 45, "You have opened a {pair} {direction} position. Entry Price: {price}; Trader: {trader}"),
+    (CLOSE_POSITION, 40, "Your {pair} position has been closed successfully. Trader: {trader}"),
+    (OPEN_POSITION, 6, "You have opened a {pair}USDT {direction_lower} position, Entry Price: {price} USDT, "
+                       "Trader: {trader}"),
+    (CLOSE_POSITION, 6, "Your {pair}USDT {direction} position has been closed. Trader: {trader}"),
+    (OPEN_POSITION, 3, "Copy trade started for {pair} with {trader} at {price}"),
+]
+
+# The single inline patterns Analyze used before the registry, for comparison
+LEGACY_PATTERNS = {
+    OPEN_POSITION: r"opened a (\w+) (LONG|SHORT) position\. Entry Price: ([0-9.,]+); Trader: (\w+)",
+    CLOSE_POSITION: r"Your (\w+) position has been closed successfully\. Trader: (\w+)",
+}
+
+
+def legacy_parse(email_type: str, snippet: str) -> dict | None:
+    """Extracts the fields the way Analyze did before the registry existed."""
+    match = re.search(LEGACY_PATTERNS[email_type], snippet)
+    if not match:
+        return None
+    if email_type == OPEN_POSITION:
+        return {"crypto_pair": match.group(1), "direction": match.group(2),
+                "entry_price": float(match.group(3).replace(',', '.')), "trader": match.group(4)}
+    return {"crypto_pair": match.group(1), "trader": match.group(2)}
+
+
+def build_corpus(size: int, seed: int = 42) -> list[tuple[str, str]]:
+    rng = random.Random(seed)
+    weights = [weight for _, weight, _ in CORPUS_FORMATS]
+    corpus = []
+    for email_type, _, template in rng.choices(CORPUS_FORMATS, weights=weights, k=size):
+        direction = rng.choice(["LONG", "SHORT"])
+        snippet = template.format(pair=rng.choice(PAIRS), direction=direction, direction_lower=direction.lower(),
+                                  price=f"{rng.uniform(0.01, 70000):.4f}", trader=rng.choice(TRADERS))
+        corpus.append((email_type, snippet))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--emails", type=int, default=100_000)
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.emails)
+
+    start = time.perf_counter()
+    legacy_misses = sum(1 for email_type, snippet in corpus if legacy_parse(email_type, snippet) is None)
+    legacy_elapsed = time.perf_counter() - start
+
+    registry = build_default_registry()
+    start = time.perf_counter()
+    misses = sum(1 for email_type, snippet in corpus if registry.parse(email_type, snippet) is None)
+    elapsed = time.perf_counter() - start
+
+    print(f"Corpus: {len(corpus)} emails")
+    print(f"  inline patterns: {len(corpus) / legacy_elapsed:>10,.0f} emails/s, "
+          f"LLM fallthrough {legacy_misses / len(corpus):.1%}")
+    print(f"  parser registry: {len(corpus) / elapsed:>10,.0f} emails/s, "
+          f"LLM fallthrough {misses / len(corpus):.1%}")
+    print(registry.format_stats())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmarks/bench_price_cache.py
+"""
+Starts --processes processes that each run --checks price checks for the same pairs in
+a burst (the daemon, the GUIs and ad-hoc scripts checking at once) against a local stub
+of the MEXC ticker endpoint, and compares:
+
+- no cache:    every check requests its prices from the exchange.
+- price cache: the processes share a PriceCache file; a price younger than --ttl is
+               served from it.
+
+The stub adds --latency seconds to every response to simulate the round trip to the
+exchange. Reported are the requests the exchange received, the wall time, the check
+latency and the age of the prices the checks used.
+
+Usage:
+    python benchmarks/bench_price_cache.py [--processes 4] [--checks 50] [--pairs 5] [--ttl 3] [--latency 0.05]
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.bench_mexc_prices import start_server  # noqa: E402
+from src.mexc_api_client import MexcApiClient  # noqa: E402
+from src.price_cache import PriceCache  # noqa: E402
+
+
+def burst(base_url: str, cache_file: str | None, ttl: float, pairs: list[str], checks: int,
+          start_at: float, results):
+    cache = PriceCache(cache_file, ttl_seconds=ttl) if cache_file else None
+    client = MexcApiClient(cache=cache)
+    client.API_BASE_URL = base_url
+    latencies = []
+    ages = []
+    # All processes start together, like checks triggered by the same price move
+    time.sleep(max(0.0, start_at - time.time()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(checks):
+            start = time.perf_counter()
+            quotes = client.get_quotes(pairs)
+            latencies.append(time.perf_counter() - start)
+            ages.extend(quote['age_seconds'] for quote in quotes.values())
+    results.put((latencies, ages))
+
+
+def run(server, cache_file: str | None, args) -> tuple[int, float, list[float], list[float]]:
+    base_url = f"http://127.0.0.1:{server.server_address[1]}"
+    pairs = [f"PAIR{i}" for i in range(args.pairs)]
+    server.requests = server.bytes_sent = 0
+    results = multiprocessing.Queue()
+    start_at = time.time() + 0.5
+    processes = [multiprocessing.Process(target=burst, args=(base_url, cache_file, args.ttl, pairs, args.checks,
+                                                             start_at, results))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    latencies, ages = [], []
+    for _ in processes:
+        process_latencies, process_ages = results.get()
+        latencies.extend(process_latencies)
+        ages.extend(process_ages)
+    for process in processes:
+        process.join()
+    return server.requests, time.time() - start_at, latencies, ages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--processes", type=int, default=4)
+    parser.add_argument("--checks", type=int, default=50, help="Price checks per process.")
+    parser.add_argument("--pairs", type=int, default=5, help="Pairs per check.")
+    parser.add_argument("--ttl", type=float, default=3.0, help="Price cache TTL in seconds.")
+    parser.add_argument("--latency", type=float, default=0.05, help="Simulated round trip per request in seconds.")
+    args = parser.parse_args()
+
+    server = start_server(2000, args.latency)
+    print(f"{args.processes} processes x {args.checks} checks of {args.pairs} pairs, "
+          f"{args.latency * 1000:g}ms latency, TTL {args.ttl:g}s")
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {}
+        for name, cache_file in (("no cache", None), ("price cache", os.path.join(tmp, "price_cache.db"))):
+            requests, seconds, latencies, ages = run(server, cache_file, args)
+            results[name] = seconds
+            print(f"  {name:<11}: {requests:>4} request(s), {seconds:6.2f}s, check median "
+                  f"{statistics.median(latencies) * 1000:6.2f}ms, price age max {max(ages):4.2f}s")
+    print(f"  speedup    : {results['no cache'] / results['price cache']:6.1f}x")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+# benchmarks/bench_price_stream.py
+"""
+Streams deal prices from a local stand-in of the MEXC WebSocket API through the
+MexcPriceStream and measures how long a price move takes to reach the daemon, compared
+with the polling it replaces (a price check every --price-interval seconds).
+
+The stub accepts SUBSCRIPTION, UNSUBSCRIPTION and PING messages like MEXC and pushes a
+protobuf deal for every subscribed symbol every --tick-interval seconds (the stand-in of
+tests/test_mexc_price_stream.py encodes it). Trades are opened and
+later closed through the stream's trade listener, so the (un)subscriptions are driven
+like in the daemon. With --drop-after the stub closes all connections once after that
+many seconds, to exercise the reconnect and resubscription.
+
+Usage:
+    python benchmarks/bench_price_stream.py [--symbols 20] [--seconds 5] [--tick-interval 0.05] [--drop-after 2] [--price-interval 10]
+"""
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+from websockets.asyncio.server import serve
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mexc_api_client import MexcApiClient  # noqa: E402
+from src.mexc_price_stream import MexcPriceStream  # noqa: E402
+from tests.test_mexc_price_stream import deals_push  # noqa: E402
+
+
+class StubExchange:
+    """A MEXC WebSocket stand-in that remembers when it sent each price."""
+
+    def __init__(self, tick_interval: float, drop_after: float | None):
+        self.tick_interval = tick_interval
+        self.drop_after = drop_after
+        self.connections = set()
+        self.subscriptions: dict[object, set[str]] = {}
+        self.sent: dict[tuple[str, float], float] = {}  # (symbol, price) -> send time
+        self.subscribe_messages = self.unsubscribe_messages = self.drops = 0
+        self.counter = 0
+        self.loop = None
+        self.port = None
+        self.ready = threading.Event()
+
+    async def handler(self, websocket):
+        self.connections.add(websocket)
+        self.subscriptions[websocket] = set()
+        try:
+            async for message in websocket:
+                request = json.loads(message)
+                if request['method'] == "SUBSCRIPTION":
+                    self.subscribe_messages += 1
+                    self.subscriptions[websocket].update(request['params'])
+                elif request['method'] == "UNSUBSCRIPTION":
+                    self.unsubscribe_messages += 1
+                    self.subscriptions[websocket].difference_update(request['params'])
+                    await websocket.send(json.dumps({"id": 0, "code": 0, "msg": ",".join(request['params'])}))
+                elif request['method'] == "PING":
+                    await websocket.send(json.dumps({"id": 0, "code": 0, "msg": "PONG"}))
+        except Exception:
+            pass
+        finally:
+            self.connections.discard(websocket)
+            self.subscriptions.pop(websocket, None)
+
+    async def push(self):
+        started = time.monotonic()
+        while True:
+            await asyncio.sleep(self.tick_interval)
+            if self.drop_after is not None and not self.drops and time.monotonic() - started >= self.drop_after:
+                self.drops += 1
+                for websocket in list(self.connections):
+                    await websocket.close()
+            for websocket, channels in list(self.subscriptions.items()):
+                for channel in channels:
+                    symbol = channel.rsplit("@", 1)[1]
+                    self.counter += 1
+                    price = 1 + self.counter / 1e6  # Unique, so the client's tick can be matched
+                    self.sent[(symbol, price)] = time.perf_counter()
+                    message = deals_push(symbol, [(str(price), int(time.time() * 1000))])
+                    with contextlib.suppress(Exception):
+                        await websocket.send(message)
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        async with serve(self.handler, "127.0.0.1", 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await self.push()
+
+    def start(self):
+        threading.Thread(target=asyncio.run, args=(self.main(),), daemon=True).start()
+        self.ready.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=20, help="Symbols of the open trades (two trades each).")
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--tick-interval", type=float, default=0.05, help="Seconds between the deals of a symbol.")
+    parser.add_argument("--drop-after", type=float, default=2.0, help="Close all connections once after N seconds.")
+    parser.add_argument("--price-interval", type=float, default=10.0, help="Cadence of the polling compared with.")
+    args = parser.parse_args()
+
+    stub = StubExchange(args.tick_interval, args.drop_after or None)
+    stub.start()
+    latencies = []
+
+    def on_tick(symbol: str, price: float):
+        latencies.append(time.perf_counter() - stub.sent[(symbol, price)])
+
+    stream = MexcPriceStream(MexcApiClient(), on_tick=on_tick, url=f"ws://127.0.0.1:{stub.port}")
+    stream.BACKOFF_BASE_SECONDS = 0.05
+    trades = [{'id': i, 'crypto_pair': f"PAIR{i % args.symbols}"} for i in range(2 * args.symbols)]
+    with contextlib.redirect_stdout(io.StringIO()):
+        stream.start()
+        stream.load(trades[:args.symbols])
+        for trade in trades[args.symbols:]:
+            stream.trade_opened(trade)
+        time.sleep(args.seconds / 2)
+        # Closing both trades of half the symbols unsubscribes them
+        for trade in trades:
+            if int(trade['crypto_pair'][4:]) % 2:
+                stream.trade_closed(trade['id'])
+        time.sleep(args.seconds / 2)
+        subscribed = sum(len(channels) for channels in stub.subscriptions.values())
+        stream.stop()
+
+    print(f"{args.symbols} symbols of {len(trades)} open trades, a deal per symbol every "
+          f"{args.tick_interval * 1000:g}ms for {args.seconds:g}s, half of the symbols closed halfway")
+    print(f"  stream : {len(latencies)} ticks, latency median {statistics.median(latencies) * 1000:.2f}ms / "
+          f"p99 {statistics.quantiles(latencies, n=100)[98] * 1000:.2f}ms / max {max(latencies) * 1000:.2f}ms")
+    print(f"           {stream.connections} connection(s) ({stub.drops} dropped by the stub), "
+          f"{stub.subscribe_messages} SUBSCRIPTION / {stub.unsubscribe_messages} UNSUBSCRIPTION message(s), "
+          f"{subscribed} channel(s) subscribed at the end")
+    print(f"  polling: latency mean {args.price_interval / 2 * 1000:.0f}ms / max {args.price_interval * 1000:.0f}ms "
+          f"plus the request, with a check every {args.price_interval:g}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+# benchmarks/bench_startup.py
+"""
+Measures the cold-start import time of main.py and fails if it exceeds a budget.
+
+Every sample imports main in a fresh interpreter, and the time of a bare interpreter
+start is subtracted. The script also checks that the heavy optional dependencies
+(the OpenAI SDK, the Google client and auth libraries, requests) are not imported
+by main.py itself; they must only be imported at their first real use.
+
+Exits with status 1 when the budget is exceeded or a heavy module is imported eagerly,
+so it can guard against regressions in CI or a pre-commit hook.
+
+Usage:
+    python benchmarks/bench_startup.py [--budget-ms 150] [--runs 7]
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that must not be imported when main.py is loaded
+LAZY_MODULES = [
+    'openai',
+    'google_auth_oauthlib',
+    'google.oauth2.credentials',
+    'google.auth.transport.requests',
+    'googleapiclient.discovery',
+    'requests',
+    'asyncio',
+]
+
+
+def time_command(code: str, runs: int) -> float:
+    """Returns the median wall time in seconds of running `code` in a fresh interpreter."""
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', code], cwd=PROJECT_ROOT, check=True)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples)
+
+
+def slowest_imports(limit: int) -> list[tuple[int, str]]:
+    """Returns the top-level imports of main.py with the largest cumulative import time (in µs)."""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import main'],
+                            cwd=PROJECT_ROOT, capture_output=True, text=True, check=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        parts = line.split('|')
+        if len(parts) != 3 or not parts[1].strip().isdigit():
+            continue
+        # Drop the separator space; the rest is the indentation of the import tree
+        name = parts[2][1:].rstrip()
+        if name == 'site':
+            # Everything before belongs to the interpreter start, not to main.py
+            imports = []
+        # Only direct imports of main (two spaces of indentation in the importtime tree)
+        elif name.startswith('  ') and not name.startswith('   '):
+            imports.append((int(parts[1]), name.strip()))
+    return sorted(imports, reverse=True)[:limit]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget-ms", type=float, default=150, help="Maximum import time of main.py.")
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+
+    baseline = time_command('pass', args.runs)
+    total = time_command('import main', args.runs)
+    import_ms = (total - baseline) * 1000
+    print(f"Interpreter start: {baseline * 1000:.1f}ms, import main: {import_ms:.1f}ms "
+          f"(budget {args.budget_ms:g}ms, median of {args.runs} runs)")
+
+    print("Slowest imports of main.py:")
+    for micros, name in slowest_imports(5):
+        print(f"   -> {name:<28} {micros / 1000:7.1f}ms")
+
+    check = (f"import sys, main; print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))")
+    eager = subprocess.run([sys.executable, '-c', check], cwd=PROJECT_ROOT,
+                           capture_output=True, text=True, check=True).stdout.strip()
+
+    failed = False
+    if eager:
+        print(f"FAIL: imported eagerly by main.py: {eager}")
+        failed = True
+    if import_ms > args.budget_ms:
+        print(f"FAIL: import time {import_ms:.1f}ms exceeds the budget of {args.budget_ms:g}ms")
+        failed = True
+    if failed:
+        sys.exit(1)
+    print("OK: startup is within budget.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# benchmarks/bench_stop_loss_engine.py
+"""
+Replays a random-walk tick stream over many armed open trades and compares how the
+breached trades of each tick are found:
+
+- scan:   PositionMonitor.percentage_change() for every armed trade of the tick's
+          symbol, compared with its stop-loss (the per-trade check before).
+- engine: StopLossEngine.breached(), a bisect per side on the precomputed trigger prices.
+
+Like in the daemon, a breached trade is disarmed once found. Both must find the same
+trades at the same ticks, also when every trade gets a tick exactly at its trigger price
+(where the trigger and P/L formulas round differently).
+
+Usage:
+    python benchmarks/bench_stop_loss_engine.py [--trades 10000] [--symbols 50] [--ticks 100000]
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.position_monitor import PositionMonitor  # noqa: E402
+from src.stop_loss_engine import StopLossEngine  # noqa: E402
+
+
+def make_trades(count: int, symbols: int, rng: random.Random) -> list[dict]:
+    return [{'id': i, 'crypto_pair': f"PAIR{rng.randrange(symbols)}", 'direction': rng.choice(("LONG", "SHORT")),
+             'entry_price': 100 * rng.uniform(0.9, 1.1), 'stoploss': -rng.choice((2, 5, 10, 20))}
+            for i in range(count)]
+
+
+def make_ticks(count: int, symbols: int, rng: random.Random) -> list[tuple[str, float]]:
+    prices = [100.0] * symbols
+    ticks = []
+    for _ in range(count):
+        index = rng.randrange(symbols)
+        prices[index] *= 1 + rng.gauss(0, 0.002)
+        ticks.append((f"PAIR{index}USDT", prices[index]))
+    return ticks
+
+
+def run_scan(trades: list[dict], ticks: list[tuple[str, float]]) -> tuple[float, list[tuple[int, int]]]:
+    armed: dict[str, dict[int, dict]] = {}
+    for trade in trades:
+        armed.setdefault(trade['crypto_pair'] + "USDT", {})[trade['id']] = trade
+    found = []
+    start = time.perf_counter()
+    for position, (symbol, price) in enumerate(ticks):
+        symbol_trades = armed.get(symbol, {})
+        breached = [trade['id'] for trade in symbol_trades.values()
+                    if PositionMonitor.percentage_change(trade['direction'], trade['entry_price'], price)
+                    <= trade['stoploss']]
+        for trade_id in breached:
+            del symbol_trades[trade_id]
+            found.append((position, trade_id))
+    return time.perf_counter() - start, found
+
+
+def run_engine(trades: list[dict], ticks: list[tuple[str, float]]) -> tuple[float, list[tuple[int, int]]]:
+    engine = StopLossEngine()
+    for trade in trades:
+        engine.arm(trade, trade['stoploss'])
+    found = []
+    start = time.perf_counter()
+    for position, (symbol, price) in enumerate(ticks):
+        for trade_id in engine.breached(symbol, price):
+            engine.disarm(trade_id)
+            found.append((position, trade_id))
+    return time.perf_counter() - start, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--trades", type=int, default=10000, help="Armed open trades.")
+    parser.add_argument("--symbols", type=int, default=50)
+    parser.add_argument("--ticks", type=int, default=100000)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    trades = make_trades(args.trades, args.symbols, rng)
+    ticks = make_ticks(args.ticks, args.symbols, rng)
+
+    print(f"{args.trades} armed trades on {args.symbols} symbols, {args.ticks} ticks")
+    results = {}
+    for name, run in (("scan", run_scan), ("engine", run_engine)):
+        seconds, found = run(trades, ticks)
+        results[name] = (seconds, sorted(found))
+        print(f"  {name:<6}: {args.ticks / seconds:>10.0f} ticks/s, {seconds / args.ticks * 1e6:7.2f}µs per tick, "
+              f"{len(found)} breaches found")
+    assert results['scan'][1] == results['engine'][1], "the engine found different breaches"
+    print(f"  speedup: {results['scan'][0] / results['engine'][0]:10.1f}x")
+
+    boundary = [(trade['crypto_pair'] + "USDT",
+                 StopLossEngine.trigger_price(trade['direction'], trade['entry_price'], trade['stoploss']))
+                for trade in trades]
+    (_, scan_found), (_, engine_found) = run_scan(trades, boundary), run_engine(trades, boundary)
+    assert sorted(scan_found) == sorted(engine_found), "the engine disagrees with the P/L at a trigger price"
+    print(f"  boundary: {len(boundary)} ticks at trigger prices, {len(engine_found)} breaches found by both")
+
+
+if __name__ == "__main__":
+    main()
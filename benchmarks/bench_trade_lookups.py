@@ -0,0 +1,96 @@
+# benchmarks/bench_trade_lookups.py
+"""
+Measures the per-email trade lookups of Analyze (open and close) and the open trade
+listing of the position monitor on a database with a large closed history, with and
+without the indexes of the schema migrations.
+
+Usage:
+    python benchmarks/bench_trade_lookups.py [--closed 200000] [--open 50] [--lookups 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import Analyze  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+
+def fill(db_manager: DatabaseManager, closed: int, open_trades: int, rng: random.Random):
+    rows = []
+    for i in range(closed + open_trades):
+        status = 'CLOSED' if i < closed else 'OPEN'
+        rows.append((f"PAIR{rng.randrange(300)}", f"Trader{rng.randrange(40)}", 1.0, "Mon, 01 Jan 2024 12:00:00 +0000",
+                     rng.choice(['LONG', 'SHORT']), status, 1704067200 + i))
+    db_manager.cursor.executemany(
+        """INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction, status, timestamp)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""", rows)
+    db_manager.conn.commit()
+
+
+def make_email(index: int, pair: str, trader: str, opened: bool) -> dict:
+    if opened:
+        subject = Analyze.OPEN_SUBJECT
+        snippet = f"You have opened a {pair} LONG position. Entry Price: 2.5; Trader: {trader}"
+    else:
+        subject = Analyze.CLOSE_SUBJECT
+        snippet = f"Your {pair} position has been closed successfully. Trader: {trader}"
+    return {"id": f"bench-{index}", "subject": subject, "snippet": snippet, "sender": "info@notify.mexc.com",
+            "labels": [], "date": "Mon, 01 Jan 2024 12:00:00 +0000", "timestamp": 1800000000 + index}
+
+
+def run(closed: int, open_trades: int, lookups: int, indexed: bool) -> tuple[float, float]:
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        db_manager = DatabaseManager(os.path.join(tmp, "trades.db"))
+        if not indexed:
+            # Every index of the migrations, so the baseline really scans the table
+            indexes = [row[0] for row in db_manager.cursor.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'index' AND name LIKE 'idx_trades_%'").fetchall()]
+            for index in indexes:
+                db_manager.cursor.execute(f"DROP INDEX {index}")
+        fill(db_manager, closed, open_trades, rng)
+
+        # Alternating open and close emails for random pairs, one transaction per email
+        start = time.perf_counter()
+        with db_manager.unit_of_work(commit_every=1) as unit_of_work:
+            for i in range(lookups):
+                pair, trader = f"PAIR{rng.randrange(300)}", f"Trader{rng.randrange(40)}"
+                Analyze(make_email(i, pair, trader, opened=i % 2 == 0), unit_of_work).process()
+        email_seconds = (time.perf_counter() - start) / lookups
+
+        start = time.perf_counter()
+        for _ in range(100):
+            db_manager.get_open_trades_details()
+        listing_seconds = (time.perf_counter() - start) / 100
+        db_manager.close_connection()
+    return email_seconds, listing_seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--closed", type=int, default=200000, help="Number of closed trades in the history.")
+    parser.add_argument("--open", type=int, default=50, help="Number of open trades.")
+    parser.add_argument("--lookups", type=int, default=2000, help="Number of open/close emails applied.")
+    args = parser.parse_args()
+
+    print(f"{args.closed} closed and {args.open} open trades, {args.lookups} open/close emails")
+    results = {}
+    for indexed in (False, True):
+        results[indexed] = run(args.closed, args.open, args.lookups, indexed)
+        email_seconds, listing_seconds = results[indexed]
+        label = "with indexes" if indexed else "no indexes"
+        print(f"  {label:<13}: {email_seconds * 1e6:9.1f}µs per email, "
+              f"{listing_seconds * 1e6:9.1f}µs per open trade listing")
+    print(f"  speedup      : {results[False][0] / results[True][0]:9.1f}x per email, "
+          f"{results[False][1] / results[True][1]:9.1f}x per listing")
+
+
+if __name__ == "__main__":
+    main()
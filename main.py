@@ -2,18 +2,29 @@
 
 import os
 import time
+import signal
+import argparse
+import threading
+from itertools import islice
+from typing import Iterable, Iterator
 from pathlib import Path
 from dotenv import load_dotenv
 from src.gmail_checker import GmailChecker
+from src.gmail_rate_limiter import GmailRateLimiter
 from src.analyzer import Analyze
+from src.parser_registry import DEFAULT_REGISTRY
+from src.template_inducer import TemplateInducer
 from src.mexc_api_client import MexcApiClient
 from src.position_monitor import PositionMonitor
-from src.database_manager import DatabaseManager
+from src.database_manager import DatabaseManager, UnitOfWork
 from src.trader_config import TraderConfig
+from src.alert_scheduler import AlertScheduler
+from src.stop_loss_engine import StopLossEngine
 from src.email_notifier import EmailNotifier
 
 DB_FILE = "trades.db"
 TIMESTAMP_FILE = "last_run_timestamp.txt"
+HISTORY_ID_FILE = "last_history_id.txt"
 TRADER_CONFIG_FILE = "trader_config.json"
 
 
@@ -27,26 +38,89 @@ def read_last_run_timestamp() -> int | None:
         return None
 
 
-def write_current_timestamp():
-    """Writes the current Unix timestamp to the state file."""
-    current_timestamp = int(time.time())
+def write_current_timestamp(current_timestamp: int | None = None):
+    """Writes the given (default: current) Unix timestamp to the state file."""
+    if current_timestamp is None:
+        current_timestamp = int(time.time())
     with open(TIMESTAMP_FILE, 'w') as f:
         f.write(str(current_timestamp))
     # Print at the beginning of a new line for clarity
     print(f"\nTimestamp {current_timestamp} saved for the next run.")
 
 
-def main():
+def read_last_history_id() -> str | None:
+    """Reads the Gmail historyId checkpoint of the last incremental sync from the state file."""
+    try:
+        with open(HISTORY_ID_FILE, 'r') as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def write_history_id(history_id: str):
+    """Writes the Gmail historyId checkpoint to the state file."""
+    with open(HISTORY_ID_FILE, 'w') as f:
+        f.write(str(history_id))
+    print(f"HistoryId {history_id} saved for the next run.")
+
+
+def iter_chunks(items: Iterable, size: int) -> Iterator[list]:
+    """Groups an iterable into lists of at most `size` items, without reading ahead further."""
+    iterator = iter(items)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def create_notifier() -> EmailNotifier | None:
+    """Reads the email settings and creates a notifier, or None if they are incomplete."""
+    sender = os.getenv('SENDER_EMAIL')
+    password = os.getenv('SENDER_APP_PASSWORD')
+    recipient = os.getenv('RECIPIENT_EMAIL')
+
+    if sender and password and recipient:
+        return EmailNotifier(sender_email=sender, app_password=password, recipient_email=recipient)
+    print(
+        "Email settings (SENDER_EMAIL, etc.) not fully found in .env. Alerts will only be shown in the console.")
+    return None
+
+
+def create_gmail_checker() -> GmailChecker:
+    """Authenticates with Gmail and builds the checker and its rate limiter from the .env settings."""
+    scopes = [os.getenv('SCOPES')]
+    batch_size = int(os.getenv('GMAIL_BATCH_SIZE', GmailChecker.DEFAULT_BATCH_SIZE))
+    units_per_second = float(os.getenv('GMAIL_QUOTA_UNITS_PER_SECOND', GmailRateLimiter.DEFAULT_UNITS_PER_SECOND))
+    rate_limiter = GmailRateLimiter(units_per_second)
+    return GmailChecker(scopes=scopes, batch_size=batch_size, rate_limiter=rate_limiter)
+
+
+def ingest_sequentially(new_emails: Iterable[dict], unit_of_work: UnitOfWork, batch_size: int) -> tuple[int, int | None]:
     """
-    The main function of the application.
+    Applies the emails batch by batch and returns the number of processed emails
+    and the timestamp of the oldest email that has to be retried.
     """
-    env_path = Path('.') / '.env'
-    load_dotenv(dotenv_path=env_path)
+    # Emails are streamed from old to new: each batch is analyzed before the next one is downloaded.
+    # The regex failures of a batch share one LLM request.
+    processed_count = 0
+    retry_from = None  # Timestamp of the oldest email that has to be retried
+    for email_batch in iter_chunks(new_emails, batch_size):
+        if processed_count == 0:
+            print("\nNew email(s) found. Processing from old to new...")
+        results = Analyze.process_batch(email_batch, unit_of_work)
+        for email, completed in zip(email_batch, results):
+            if not completed and retry_from is None:
+                retry_from = email['timestamp']
+        processed_count += len(email_batch)
+    return processed_count, retry_from
 
-    scopes = [os.getenv('SCOPES')]
-    base_query = os.getenv('QUERY')
 
-    db_manager = DatabaseManager(DB_FILE)
+def process_new_emails(checker: GmailChecker, db_manager: DatabaseManager, base_query: str, sync_mode: str,
+                       use_pipeline: bool = False):
+    """
+    Fetches the new MEXC emails and applies them to the trades database, either batch by
+    batch or through the staged asyncio IngestionPipeline.
+    """
+    # Taken before searching, so mail arriving during this run is picked up by the next one
+    run_started_at = int(time.time())
 
     # Dynamically build the search query
     last_timestamp = read_last_run_timestamp()
@@ -59,106 +133,403 @@ def main():
 
     print(f"Full search query: '{full_query}'")
 
-    checker = GmailChecker(scopes=scopes)
-    new_emails = checker.get_new_emails(query=full_query)
+    # 'history' only pulls the messages added since the stored historyId checkpoint
+    new_history_id = None
+    if sync_mode == 'history':
+        last_history_id = read_last_history_id()
+        print(f"Incremental sync from historyId: {last_history_id or 'none (full query)'}")
+        msg_ids, new_history_id = checker.sync_message_ids(query=full_query, history_id=last_history_id)
+        new_emails = checker.iter_emails(reversed(msg_ids), skip=db_manager.is_message_processed)
+    else:
+        new_emails = checker.iter_new_emails(query=full_query, skip=db_manager.is_message_processed)
 
-    # The timestamp is written after processing
-    write_current_timestamp()
+    # One unit of work per cycle. By default it commits once per Gmail batch, so the write lock
+    # is not held while the next batch is downloaded; DB_COMMIT_EVERY=0 commits once at the end.
+    commit_every = int(os.getenv('DB_COMMIT_EVERY', checker.batch_size)) or None
+    with db_manager.unit_of_work(commit_every) as unit_of_work:
+        if use_pipeline:
+            # asyncio is only imported when the pipeline is used
+            from src.ingestion_pipeline import IngestionPipeline
+            pipeline = IngestionPipeline(unit_of_work, batch_size=checker.batch_size)
+            processed_count, retry_from = pipeline.run(new_emails)
+            if processed_count:
+                print(pipeline.format_stats())
+        else:
+            processed_count, retry_from = ingest_sequentially(new_emails, unit_of_work, checker.batch_size)
 
-    if not new_emails:
+    if processed_count == 0:
         print("No new emails found matching the query.")
     else:
-        print(f"\n{len(new_emails)} unread email(s) found. Processing from old to new...")
-        for email in reversed(new_emails):
-            # Pass the database connection from the manager
-            analyzer = Analyze(email_data=email, db_connection=db_manager.get_connection())
-            analyzer.process()
+        print(f"{processed_count} email(s) processed.")
+        # The next run tries the templates that matched most often first
+        DEFAULT_REGISTRY.reorder()
+        print(DEFAULT_REGISTRY.format_stats())
 
-    # --- Checking open positions ---
-    print("\n--- Checking open positions ---")
+    # The checkpoints only advance after the unit of work has committed, and not past an email that
+    # has to be retried. Emails seen again after a crash are skipped through the processed_messages ledger.
+    if not new_emails.complete or (sync_mode == 'history' and new_history_id is None):
+        # A failed search, page or message: advancing would skip the emails that were not fetched for good
+        print("Not all new emails could be fetched. Checkpoints kept; they are fetched again on the next run.")
+    elif retry_from is None:
+        write_current_timestamp(run_started_at)
+        if new_history_id:
+            write_history_id(new_history_id)
+    else:
+        print(f"Some emails could not be processed. Checkpoint kept before timestamp {retry_from}.")
+        write_current_timestamp(min(run_started_at, retry_from - 1))
 
-    # Read email settings and create a notifier object
-    sender = os.getenv('SENDER_EMAIL')
-    password = os.getenv('SENDER_APP_PASSWORD')
-    recipient = os.getenv('RECIPIENT_EMAIL')
-    notifier = None  # Default no notifier
 
-    if sender and password and recipient:
-        notifier = EmailNotifier(sender_email=sender, app_password=password, recipient_email=recipient)
-    else:
-        print(
-            "Email settings (SENDER_EMAIL, etc.) not fully found in .env. Alerts will only be shown in the console.")
-    trader_config = TraderConfig(TRADER_CONFIG_FILE)
+def schedule_open_trades(db_manager: DatabaseManager, trader_config: TraderConfig) -> bool:
+    """
+    Recalculates the next alert time of every open trade when the trader configuration
+    differs from the one the stored times were calculated from. Returns True if it did.
+    """
+    if trader_config.reload_if_changed():
+        print("Trader configuration file changed, reloaded.")
+    fingerprint = trader_config.fingerprint()
+    if db_manager.get_meta('trader_config_fingerprint') == fingerprint:
+        return False
     open_trades = db_manager.get_open_trades_details()
+    db_manager.reschedule_trades(
+        {trade['id']: trader_config.next_alert_at(trade['trader'], trade['timestamp'], trade['alerts_sent'])
+         for trade in open_trades},
+        config_fingerprint=fingerprint)
+    print(f"Alert schedules of {len(open_trades)} open position(s) recalculated from the trader configuration.")
+    return True
 
-    if not open_trades:
-        print("No open positions found in the database.")
-    else:
-        print(f"{len(open_trades)} open position(s) found. Checking against schedules...")
-        mexc_client = MexcApiClient()
-        # Initialize the monitor WITHOUT the global stop_loss
-        monitor = PositionMonitor(email_notifier=notifier, db_manager=db_manager)
-        current_time = int(time.time())
-
-        for trade in open_trades:
-            trader_name = trade['trader']
-            trade_timestamp = trade['timestamp']
-            alerts_sent = trade['alerts_sent']
-
-            # Get the full configuration for this specific trader
-            config = trader_config.get_trader_config(trader_name)
-            schedule = config['schedule']
-            trader_stop_loss = config['stoploss']
-
-            initial_wait = schedule['initial']
-            reminder_intervals = schedule['reminders']
-
-            # ... (logic for max_alerts and total_wait_seconds remains the same)
-
-            max_alerts = 1 + len(reminder_intervals)
-            if alerts_sent >= max_alerts:
-                print(
-                    f"   -> Skipping {trade['crypto_pair']} ({trader_name}): All {max_alerts} scheduled alerts have been sent.")
-                continue
-
-            # Calculate the total time that must pass before the *next* alert
-            if alerts_sent == 0:
-                # This is the first check
-                total_wait_seconds = initial_wait
-            else:
-                # This is a reminder check
-                # We sum the initial wait + all reminder intervals up to the previous alert
-                reminders_to_sum = reminder_intervals[:alerts_sent]
-                total_wait_seconds = initial_wait + sum(reminders_to_sum)
-
-            next_alert_time = trade_timestamp + total_wait_seconds
-
-            # Check if it's time to perform the check
-            if current_time >= next_alert_time:
-                elapsed_time = current_time - trade_timestamp
-                print(
-                    f"   -> Checking {trade['crypto_pair']} ({trader_name}), open for {elapsed_time // 60}m. (Alert level: {alerts_sent}, SL: {trader_stop_loss}%)")
-                current_price = mexc_client.get_current_price(trade['crypto_pair'])
-
-                if current_price is not None:
-                    # The monitor will now check the P/L and send an email if the SL is hit
-                    monitor.check_position(
-                        trade_id=trade['id'],
-                        crypto_pair=trade['crypto_pair'],
-                        direction=trade['direction'],
-                        entry_price=trade['entry_price'],
-                        current_price=current_price,
-                        alerts_sent=alerts_sent,
-                        stop_loss_percentage=trader_stop_loss  # Pass the specific stop-loss here
-                    )
+
+def check_trades(trades: list[dict], current_time: int, trader_config: TraderConfig,
+                 mexc_client: MexcApiClient, monitor: PositionMonitor) -> dict[int, int | None]:
+    """
+    Checks the open positions whose next scheduled alert is due against their stop-loss,
+    with one price snapshot for all of them. Returns the time of each trade's next scheduled
+    alert afterwards, or None once all its alerts are sent.
+    """
+    next_alerts = {}
+    due_trades = []
+    for trade in trades:
+        trader_name = trade['trader']
+        next_alert_time = trader_config.next_alert_at(trader_name, trade['timestamp'], trade['alerts_sent'])
+        next_alerts[trade['id']] = next_alert_time
+        if next_alert_time is None:
+            print(f"   -> Skipping {trade['crypto_pair']} ({trader_name}): All scheduled alerts have been sent.")
+        elif current_time < next_alert_time:
+            # It's not yet time to check this trade for its next alert
+            wait_remaining = next_alert_time - current_time
+            print(f"   -> Skipping {trade['crypto_pair']} ({trader_name}): Next check in {wait_remaining // 60}m.")
+        else:
+            due_trades.append(trade)
+
+    if not due_trades:
+        return next_alerts
+    # One request for all due trades, however many of them hold the same pair
+    prices = mexc_client.get_prices(trade['crypto_pair'] for trade in due_trades)
+
+    for trade in due_trades:
+        trader_name = trade['trader']
+        alerts_sent = trade['alerts_sent']
+        # Get the full configuration for this specific trader
+        trader_stop_loss = trader_config.get_trader_config(trader_name)['stoploss']
+        elapsed_time = current_time - trade['timestamp']
+        print(
+            f"   -> Checking {trade['crypto_pair']} ({trader_name}), open for {elapsed_time // 60}m. (Alert level: {alerts_sent}, SL: {trader_stop_loss}%)")
+        current_price = prices.get(trade['crypto_pair'])
+
+        if current_price is not None:
+            # The monitor will now check the P/L and send an email if the SL is hit
+            alert_sent = monitor.check_position(
+                trade_id=trade['id'],
+                crypto_pair=trade['crypto_pair'],
+                direction=trade['direction'],
+                entry_price=trade['entry_price'],
+                current_price=current_price,
+                alerts_sent=alerts_sent,
+                stop_loss_percentage=trader_stop_loss  # Pass the specific stop-loss here
+            )
+            if alert_sent:
+                next_alerts[trade['id']] = trader_config.next_alert_at(trader_name, trade['timestamp'], alerts_sent + 1)
+        else:
+            print(f"   -> No current price for {trade['crypto_pair']}; the position is checked again later.")
+    return next_alerts
+
+
+def check_open_positions(db_manager: DatabaseManager, trader_config: TraderConfig,
+                         mexc_client: MexcApiClient, monitor: PositionMonitor):
+    """Checks every open position whose next scheduled alert is due against its stop-loss."""
+    schedule_open_trades(db_manager, trader_config)
+    current_time = int(time.time())
+    # Only the trades whose stored next_alert_at has passed; all other open trades are not read at all
+    due_trades = db_manager.get_due_trades(current_time)
+
+    if not due_trades:
+        print("No open positions are due for a check.")
+        return
+
+    print(f"{len(due_trades)} open position(s) due. Checking against schedules...")
+    next_alerts = check_trades(due_trades, current_time, trader_config, mexc_client, monitor)
+    # The stored time of a new trade is its open time; it is brought in line with the schedule here
+    rescheduled = {trade['id']: next_alerts[trade['id']] for trade in due_trades
+                   if next_alerts[trade['id']] != trade['next_alert_at']}
+    if rescheduled:
+        db_manager.reschedule_trades(rescheduled)
+
+
+def check_due_trades(scheduler: AlertScheduler, db_manager: DatabaseManager, trader_config: TraderConfig,
+                     mexc_client: MexcApiClient, monitor: PositionMonitor,
+                     stop_loss_engine: StopLossEngine | None = None):
+    """
+    Checks the positions whose check is due in the AlertScheduler and re-arms them. With a
+    StopLossEngine, the positions left waiting for a recheck are armed in it.
+    """
+    current_time = int(time.time())
+    # Trades closed by another process (e.g. the GUI) are no longer returned and drop out here
+    due_trades = db_manager.get_open_trades_by_id(scheduler.pop_due(current_time))
+    print(f"{len(due_trades)} open position(s) due, {len(scheduler)} more scheduled.")
+    next_alerts = check_trades(due_trades, current_time, trader_config, mexc_client, monitor)
+    for trade_id, next_alert_time in next_alerts.items():
+        scheduler.rearm(trade_id, next_alert_time, current_time)
+    if stop_loss_engine is not None:
+        for trade in due_trades:
+            if trade['id'] in scheduler.rechecks:
+                stop_loss_engine.arm(trade, trader_config.get_trader_config(trade['trader'])['stoploss'])
             else:
-                # It's not yet time to check this trade for its next alert
-                wait_remaining = next_alert_time - current_time
-                print(f"   -> Skipping {trade['crypto_pair']} ({trader_name}): Next check in {wait_remaining // 60}m.")
+                stop_loss_engine.disarm(trade['id'])
+    rescheduled = {trade['id']: next_alerts[trade['id']] for trade in due_trades
+                   if next_alerts[trade['id']] != trade['next_alert_at']}
+    if rescheduled:
+        db_manager.reschedule_trades(rescheduled)
+
+
+def sync_schedule(scheduler: AlertScheduler, db_manager: DatabaseManager, price_stream=None,
+                  stop_loss_engine: StopLossEngine | None = None):
+    """
+    Picks up the trades opened, closed or alerted by other processes (backfill.py, a one-shot
+    run, the GUI, another daemon): the trade listeners only report this process's own trades.
+    """
+    changed = scheduler.sync(db_manager.get_scheduled_trades())
+    if not changed:
+        return
+    print(f"   -> Alert schedule of {len(changed)} position(s) changed by another process.")
+    if stop_loss_engine is not None:
+        # Armed again at their next check, with the stored state
+        for trade_id in changed:
+            stop_loss_engine.disarm(trade_id)
+    if price_stream is not None:
+        price_stream.load(db_manager.get_open_trades_details())
+
+
+def check_streamed_trades(ticks: dict[str, tuple[float, float]], stop_loss_engine: StopLossEngine,
+                          scheduler: AlertScheduler, db_manager: DatabaseManager,
+                          trader_config: TraderConfig, monitor: PositionMonitor):
+    """
+    Checks the positions armed in the StopLossEngine whose trigger price was crossed by the
+    streamed price range (low, high) of their symbol, instead of waiting for their next
+    recheck. Ticks that breach nothing cost a bisect per side and are not logged.
+    A checked position is disarmed until its next recheck arms it again.
+    """
+    breach_prices = {}
+    for symbol, (low, high) in ticks.items():
+        for trade_id in stop_loss_engine.breached(symbol, low, high):
+            breach_prices[trade_id] = (low, high)
+    if not breach_prices:
+        return
+    current_time = int(time.time())
+    rescheduled = {}
+    for trade in db_manager.get_open_trades_by_id(sorted(breach_prices)):
+        stop_loss_engine.disarm(trade['id'])
+        low, high = breach_prices[trade['id']]
+        # The price that crossed the trigger: the low for a long, the high for a short
+        current_price = low if trade['direction'].upper() == 'LONG' else high
+        trader_name = trade['trader']
+        trader_stop_loss = trader_config.get_trader_config(trader_name)['stoploss']
+        print(f"   -> Streamed price of {trade['crypto_pair']} ({trader_name}) reached the stop-loss of {trader_stop_loss}%.")
+        alert_sent = monitor.check_position(
+            trade_id=trade['id'],
+            crypto_pair=trade['crypto_pair'],
+            direction=trade['direction'],
+            entry_price=trade['entry_price'],
+            current_price=current_price,
+            alerts_sent=trade['alerts_sent'],
+            stop_loss_percentage=trader_stop_loss
+        )
+        if alert_sent:
+            next_alert_time = trader_config.next_alert_at(trader_name, trade['timestamp'], trade['alerts_sent'] + 1)
+            scheduler.rearm(trade['id'], next_alert_time, current_time)
+            rescheduled[trade['id']] = next_alert_time
+    if rescheduled:
+        db_manager.reschedule_trades(rescheduled)
+
+
+def run_once(use_pipeline: bool = False):
+    """
+    Runs a single cycle: processes new emails, then checks the open positions.
+    """
+    base_query = os.getenv('QUERY')
+    sync_mode = os.getenv('GMAIL_SYNC_MODE', 'query').lower()
+
+    db_manager = DatabaseManager(DB_FILE)
+    # Registers the templates learned from earlier LLM extractions on the regex fast path
+    TemplateInducer.shared()
+
+    checker = create_gmail_checker()
+    process_new_emails(checker, db_manager, base_query, sync_mode, use_pipeline)
+
+    # --- Checking open positions ---
+    print("\n--- Checking open positions ---")
+
+    notifier = create_notifier()
+    trader_config = TraderConfig(TRADER_CONFIG_FILE)
+    mexc_client = MexcApiClient.shared()
+    # Initialize the monitor WITHOUT the global stop_loss
+    monitor = PositionMonitor(email_notifier=notifier, db_manager=db_manager)
+    check_open_positions(db_manager, trader_config, mexc_client, monitor)
+    if http_stats := mexc_client.format_stats():
+        print(http_stats)
 
     db_manager.close_connection()
     print("\nProcess completed. Database connection closed.")
 
 
+def run_daemon(mail_interval: float, price_interval: float, use_pipeline: bool = False, use_stream: bool = False):
+    """
+    Keeps the Gmail, database, MEXC and notifier clients alive until SIGINT or SIGTERM is
+    received. Emails are ingested every `mail_interval` seconds; positions are checked by
+    the AlertScheduler exactly when they are due, and rechecked every `price_interval`
+    seconds while their alert is due but the stop-loss is not hit. With `use_stream`,
+    the MEXC price stream also rechecks those positions on every deal of their symbol.
+    """
+    base_query = os.getenv('QUERY')
+    sync_mode = os.getenv('GMAIL_SYNC_MODE', 'query').lower()
+
+    db_manager = DatabaseManager(DB_FILE)
+    TemplateInducer.shared()
+    checker = create_gmail_checker()
+    notifier = create_notifier()
+    trader_config = TraderConfig(TRADER_CONFIG_FILE)
+    mexc_client = MexcApiClient.shared()
+    monitor = PositionMonitor(email_notifier=notifier, db_manager=db_manager)
+
+    # Trades opened and closed by the mail cycles are (un)scheduled as they are committed
+    scheduler = AlertScheduler(trader_config, recheck_interval=price_interval)
+    db_manager.add_trade_listener(scheduler)
+    schedule_open_trades(db_manager, trader_config)
+    scheduler.load(db_manager.get_scheduled_trades())
+
+    stop_event = threading.Event()
+    # Set on shutdown and by the price stream, to end the wait for the next cycle early
+    wake_event = threading.Event()
+
+    price_stream = None
+    stop_loss_engine = None
+    price_source = mexc_client
+    if use_stream:
+        # asyncio and websockets are only imported when the stream is used
+        from src.mexc_price_stream import MexcPriceStream
+        # Watches the trigger prices of the positions waiting for a recheck
+        stop_loss_engine = StopLossEngine()
+        db_manager.add_trade_listener(stop_loss_engine)
+
+        def on_tick(symbol: str, price: float):
+            # Only a deal that may breach an armed stop-loss wakes the daemon; the rest wait for the next cycle
+            if stop_loss_engine.watches(symbol):
+                wake_event.set()
+
+        price_stream = MexcPriceStream(mexc_client, on_tick=on_tick,
+                                       url=os.getenv('MEXC_STREAM_URL', MexcPriceStream.WS_URL))
+        db_manager.add_trade_listener(price_stream)
+        price_stream.load(db_manager.get_open_trades_details())
+        price_stream.start()
+        # Due checks use the streamed prices and fetch only the symbols without one
+        price_source = price_stream
+
+    def request_shutdown(signum, frame):
+        print(f"\nReceived {signal.Signals(signum).name}, shutting down after the current cycle...")
+        stop_event.set()
+        wake_event.set()
+
+    signal.signal(signal.SIGINT, request_shutdown)
+    signal.signal(signal.SIGTERM, request_shutdown)
+
+    print(f"Daemon started. Checking emails every {mail_interval:g}s, {len(scheduler)} position(s) scheduled, "
+          f"due positions rechecked every {price_interval:g}s.")
+    next_mail_run = time.monotonic()
+    while not stop_event.is_set():
+        if time.monotonic() >= next_mail_run:
+            run_timed_cycle("mail", process_new_emails, checker, db_manager, base_query, sync_mode, use_pipeline)
+            # The trader configuration is checked for changes with the mail cycle, not on every wakeup
+            if schedule_open_trades(db_manager, trader_config):
+                scheduler.load(db_manager.get_scheduled_trades())
+                if stop_loss_engine is not None:
+                    # The stop-losses may have changed; the trades are armed again at their next check
+                    stop_loss_engine.clear()
+            sync_schedule(scheduler, db_manager, price_stream, stop_loss_engine)
+            next_mail_run = time.monotonic() + mail_interval
+        if stop_event.is_set():
+            break
+        next_check = scheduler.next_due_at()
+        if next_check is not None and time.time() >= next_check:
+            run_timed_cycle("prices", check_due_trades, scheduler, db_manager, trader_config, price_source, monitor,
+                            stop_loss_engine)
+        if price_stream is not None and (ticks := price_stream.pop_ticks()):
+            check_streamed_trades(ticks, stop_loss_engine, scheduler, db_manager, trader_config, monitor)
+
+        # Sleep until the next mail cycle or the next due check, waking up immediately on shutdown or a price tick
+        # of an armed position
+        wait = next_mail_run - time.monotonic()
+        next_check = scheduler.next_due_at()
+        if next_check is not None:
+            wait = min(wait, next_check - time.time())
+        wake_event.wait(max(0.0, wait))
+        wake_event.clear()
+
+    if price_stream is not None:
+        price_stream.stop()
+        print(price_stream.format_stats())
+    if http_stats := mexc_client.format_stats():
+        print(http_stats)
+    db_manager.close_connection()
+    print("Daemon stopped. Database connection closed.")
+
+
+def run_timed_cycle(name: str, cycle, *args):
+    """Runs one daemon cycle and prints its duration. Errors are reported without stopping the daemon."""
+    print(f"\n--- [{name}] cycle started at {time.strftime('%H:%M:%S')} ---")
+    start = time.perf_counter()
+    try:
+        cycle(*args)
+    except Exception as e:
+        print(f"   -> ERROR: The {name} cycle failed: {e}")
+    print(f"--- [{name}] cycle took {time.perf_counter() - start:.3f}s ---")
+
+
+def main():
+    """
+    The main function of the application.
+    """
+    parser = argparse.ArgumentParser(description="Monitors MEXC copy trading emails and open positions.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Keep running with persistent clients instead of a single cycle.")
+    parser.add_argument('--mail-interval', type=float, default=None,
+                        help="Seconds between email checks in daemon mode (default: MAIL_INTERVAL or 60).")
+    parser.add_argument('--price-interval', type=float, default=None,
+                        help="Seconds between the rechecks of a due position in daemon mode "
+                             "(default: PRICE_INTERVAL or 10).")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="Ingest emails through the staged asyncio pipeline (fetch, parse, write).")
+    parser.add_argument('--stream', action='store_true',
+                        help="In daemon mode, recheck due positions on every deal streamed from the MEXC WebSocket API.")
+    args = parser.parse_args()
+
+    env_path = Path('.') / '.env'
+    load_dotenv(dotenv_path=env_path)
+
+    if args.daemon:
+        mail_interval = args.mail_interval or float(os.getenv('MAIL_INTERVAL', 60))
+        price_interval = args.price_interval or float(os.getenv('PRICE_INTERVAL', 10))
+        run_daemon(mail_interval, price_interval, args.pipeline, args.stream)
+    else:
+        run_once(args.pipeline)
+
+
 if __name__ == '__main__':
     main()
\ No newline at end of file
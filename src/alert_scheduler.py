@@ -0,0 +1,115 @@
+# src/alert_scheduler.py
+
+import heapq
+from .trader_config import TraderConfig
+
+
+class AlertScheduler:
+    """
+    Keeps the open trades that still have an alert to come in a min-heap of
+    (next_check_time, trade_id), so the daemon can sleep exactly until the next check
+    is due instead of polling all open trades on a fixed interval.
+
+    The scheduler is a trade listener of the DatabaseManager: trades opened by Analyze
+    are scheduled from the per-trader alert schedule of the TraderConfig as soon as they
+    are committed, and closed trades are dropped, without rescanning the database.
+    A checked trade is re-armed at its next alert time, or after `recheck_interval`
+    seconds if its alert is still due (the stop-loss was not hit); such trades are kept
+    in `rechecks`, so a price stream can check them on every tick in between.
+
+    Trades opened, closed or alerted by other processes (backfill.py, a one-shot run, the
+    GUI, another daemon) reach the scheduler through sync(), which compares the stored
+    next alert times with those this process last read or wrote in `stored`.
+
+    Changed entries are not removed from the heap; they are skipped when they come up
+    because their time no longer matches the trade's entry in `due_at`. Not thread-safe:
+    the daemon only uses it from its main thread.
+    """
+
+    def __init__(self, trader_config: TraderConfig, recheck_interval: float):
+        self.trader_config = trader_config
+        self.recheck_interval = recheck_interval
+        self.heap: list[tuple[int, int]] = []
+        self.due_at: dict[int, int] = {}  # trade_id -> current next check time
+        self.rechecks: set[int] = set()  # trade_ids whose alert is due, waiting for the stop-loss
+        self.stored: dict[int, int] = {}  # trade_id -> next_alert_at as stored in the database
+
+    def __len__(self) -> int:
+        return len(self.due_at)
+
+    def load(self, scheduled_trades: list[dict]):
+        """Replaces the schedule with the stored next alert times (DatabaseManager.get_scheduled_trades)."""
+        self.due_at = {trade['id']: trade['next_alert_at'] for trade in scheduled_trades}
+        self.stored = dict(self.due_at)
+        self.rechecks.clear()
+        self.heap = [(due_at, trade_id) for trade_id, due_at in self.due_at.items()]
+        heapq.heapify(self.heap)
+
+    def sync(self, scheduled_trades: list[dict]) -> list[int]:
+        """
+        Applies the changes other processes made to the stored schedule
+        (DatabaseManager.get_scheduled_trades): new and changed trades are scheduled at their
+        stored time, trades that left it are dropped. Returns the IDs of the changed trades.
+        """
+        stored = {trade['id']: trade['next_alert_at'] for trade in scheduled_trades}
+        changed = [trade_id for trade_id, due_at in stored.items() if self.stored.get(trade_id) != due_at]
+        changed += self.stored.keys() - stored.keys()
+        for trade_id in changed:
+            self.schedule(trade_id, stored.get(trade_id))
+        self.stored = stored
+        return changed
+
+    def schedule(self, trade_id: int, due_at: int | None):
+        """(Re)schedules the next check of a trade; None removes it from the schedule."""
+        self.rechecks.discard(trade_id)
+        if due_at is None:
+            self.due_at.pop(trade_id, None)
+            return
+        self.due_at[trade_id] = due_at
+        heapq.heappush(self.heap, (due_at, trade_id))
+
+    def rearm(self, trade_id: int, next_alert_at: int | None, now: int):
+        """Re-arms a checked trade: at its next alert time, or for a recheck if that has passed."""
+        self._store(trade_id, next_alert_at)
+        recheck = next_alert_at is not None and next_alert_at <= now
+        if recheck:
+            next_alert_at = now + int(self.recheck_interval)
+        self.schedule(trade_id, next_alert_at)
+        if recheck:
+            self.rechecks.add(trade_id)
+
+    def trade_opened(self, trade: dict):
+        """Trade listener: schedules a new (or updated) open trade."""
+        self._store(trade['id'], trade['next_alert_at'])
+        self.schedule(trade['id'],
+                      self.trader_config.next_alert_at(trade['trader'], trade['timestamp'], trade['alerts_sent']))
+
+    def trade_closed(self, trade_id: int):
+        """Trade listener: a closed trade needs no more checks."""
+        self._store(trade_id, None)
+        self.schedule(trade_id, None)
+
+    def next_due_at(self) -> int | None:
+        """Returns the Unix time of the next due check, or None if nothing is scheduled."""
+        self._drop_stale()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_due(self, now: int) -> list[int]:
+        """Removes and returns the IDs of all trades whose check is due at `now`, most overdue first."""
+        trade_ids = []
+        while self.next_due_at() is not None and self.heap[0][0] <= now:
+            _, trade_id = heapq.heappop(self.heap)
+            del self.due_at[trade_id]
+            self.rechecks.discard(trade_id)
+            trade_ids.append(trade_id)
+        return trade_ids
+
+    def _store(self, trade_id: int, next_alert_at: int | None):
+        if next_alert_at is None:
+            self.stored.pop(trade_id, None)
+        else:
+            self.stored[trade_id] = next_alert_at
+
+    def _drop_stale(self):
+        while self.heap and self.due_at.get(self.heap[0][1]) != self.heap[0][0]:
+            heapq.heappop(self.heap)
@@ -1,8 +1,10 @@
 # src/analyzer.py
 
-import re
-import sqlite3
-from .llm_extractor import LLMDataExtractor
+import time
+from .database_manager import UnitOfWork
+from .llm_extractor import LLMDataExtractor, LLMUnavailableError
+from .parser_registry import ParserRegistry, DEFAULT_REGISTRY, OPEN_POSITION, CLOSE_POSITION
+from .template_inducer import TemplateInducer
 
 
 class Analyze:
@@ -10,49 +12,196 @@ class Analyze:
     Analyzes emails about MEXC Copy Trading and updates a database.
     """
 
-    def __init__(self, email_data: dict, db_connection: sqlite3.Connection):
+    OPEN_SUBJECT = "[MEXC][Copy Trade] Position Opened Successfully"
+    CLOSE_SUBJECT = "[MEXC][Copy Trade] Position Closed Successfully"
+
+    # The statements never change, so the connection's statement cache prepares each one only once
+    SELECT_OPEN_TRADE_SQL = """SELECT id, alerts_sent FROM trades
+                               WHERE crypto_pair = ? AND trader = ? AND direction = ? AND status = 'OPEN'"""
+    # next_alert_at starts at the open time, a lower bound of every alert schedule. The
+    # monitor then replaces it with the time calculated from the trader configuration.
+    UPDATE_OPEN_TRADE_SQL = """UPDATE trades SET entry_price = ?, open_time = ?, timestamp = ?, next_alert_at = ?
+                               WHERE id = ?"""
+    INSERT_TRADE_SQL = """INSERT INTO trades
+                          (crypto_pair, trader, entry_price, open_time, direction, status, timestamp, next_alert_at)
+                          VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+    # open_time is an RFC 2822 string that does not sort chronologically; timestamp does
+    SELECT_TRADE_TO_CLOSE_SQL = """SELECT id, direction FROM trades
+                                   WHERE crypto_pair = ? AND trader = ? AND status = 'OPEN'
+                                   ORDER BY timestamp DESC
+                                   LIMIT 1"""
+    CLOSE_TRADE_SQL = "UPDATE trades SET status = 'CLOSED' WHERE id = ?"
+    RECORD_MESSAGE_SQL = "INSERT OR IGNORE INTO processed_messages (message_id, processed_at) VALUES (?, ?)"
+    SELECT_MESSAGE_SQL = "SELECT 1 FROM processed_messages WHERE message_id = ?"
+
+    def __init__(self, email_data: dict, unit_of_work: UnitOfWork,
+                 registry: ParserRegistry | None = None):
         self.email = email_data
-        self.conn = db_connection
-        self.cursor = self.conn.cursor()
+        self.unit_of_work = unit_of_work
+        self.registry = registry or DEFAULT_REGISTRY
 
-    def process(self):
-        """ Determines the email type and performs the appropriate action. """
+        # Determine the email type from the subject
         subject = self.email.get('subject', '')
+        self.email_type = None
+        if self.OPEN_SUBJECT in subject:
+            self.email_type = OPEN_POSITION
+        elif self.CLOSE_SUBJECT in subject:
+            self.email_type = CLOSE_POSITION
+
+        self.trade_data = None
+        self.llm_unavailable = False
+
+    def process(self) -> bool:
+        """
+        Determines the email type and performs the appropriate action.
+
+        The email is recorded in the processed_messages ledger in the same transaction
+        as its trade changes, so it is never applied twice. The unit of work decides
+        when that transaction is committed. Returns False if the email
+        could not be handled for a temporary reason (e.g. the LLM is unavailable);
+        it then stays out of the ledger so it can be retried.
+        """
+        if not self.parse():
+            print("   -> Starting Attempt 2: LLM Fallback...")
+            self.extract_with_llm()
+        return self.apply()
+
+    @classmethod
+    def process_batch(cls, emails: list, unit_of_work: UnitOfWork,
+                      registry: ParserRegistry | None = None) -> list[bool]:
+        """
+        Processes several emails like process(), but sends all regex failures to the LLM together.
+
+        Every email is parsed first and applied afterwards in the original order,
+        so an open is still applied before its matching close.
 
-        if "[MEXC][Copy Trade] Position Opened Successfully" in subject:
+        Returns:
+            list: The result of process() for each email.
+        """
+        analyzers = [cls(email, unit_of_work, registry) for email in emails]
+        cls.extract_batch_with_llm([analyzer for analyzer in analyzers if not analyzer.parse()])
+        return [analyzer.apply() for analyzer in analyzers]
+
+    @classmethod
+    def extract_batch_with_llm(cls, analyzers: list['Analyze']):
+        """
+        Attempt 2 for several emails whose regex failed: extracts their trade data with
+        batched LLM requests. Like extract_with_llm(), it sets llm_unavailable on the
+        emails whose body or extraction could not be reached.
+        """
+        # Emails whose body could not be downloaded are retried later, without the LLM
+        pending = [analyzer for analyzer in analyzers if analyzer._has_body()]
+        if not pending:
+            return
+
+        print(f"   -> Starting Attempt 2: Batched LLM Fallback for {len(pending)} email(s)...")
+        try:
+            extractor = LLMDataExtractor.shared()
+        except ValueError as e:
+            print(f"   -> LLM Error: Cannot initialize extractor. {e}")
+            for analyzer in pending:
+                analyzer.llm_unavailable = True
+            return
+        unavailable = False
+        try:
+            results = extractor.extract_trade_data_batch(
+                {analyzer.email['id']: analyzer.email['body'] for analyzer in pending})
+        except LLMUnavailableError as e:
+            results, unavailable = e.results, True
+        for analyzer in pending:
+            if unavailable and analyzer.email['id'] not in results:
+                analyzer.llm_unavailable = True
+                continue
+            analyzer.trade_data = results.get(analyzer.email['id'])
+            analyzer._learn_template()
+
+    def parse(self) -> bool:
+        """
+        Attempt 1: extracts the trade data with the regex templates.
+        Returns False if the email still needs the LLM fallback.
+        """
+        if self.email_type == OPEN_POSITION:
+            print("   -> Attempt 1: Extracting data with Regex...")
+            self.trade_data = self.registry.parse(OPEN_POSITION, self.email['snippet'])
+            if not self.trade_data:
+                print("   -> Regex Failed.")
+                return False
+            print(f"   -> Regex Success: Data found (template '{self.trade_data['template']}').")
+        elif self.email_type == CLOSE_POSITION:
+            self.trade_data = self.registry.parse(CLOSE_POSITION, self.email['snippet'])
+        return True
+
+    def extract_with_llm(self):
+        """
+        Attempt 2: extracts the trade data of an 'open' email with the LLM. Sets llm_unavailable
+        if the body or the LLM could not be reached, so the email is retried instead of recorded.
+        """
+        if not self._has_body():
+            return
+        try:
+            extractor = LLMDataExtractor.shared()
+        except ValueError as e:
+            print(f"   -> LLM Error: Cannot initialize extractor. {e}")
+            self.llm_unavailable = True
+            return
+        try:
+            self.trade_data = extractor.extract_trade_data(self.email['body'])
+        except LLMUnavailableError:
+            self.llm_unavailable = True
+            return
+        self._learn_template()
+
+    def _has_body(self) -> bool:
+        """Reads the (lazy) body; a failed download marks the email for a retry."""
+        if self.email['body'] is None:
+            print("   -> The email body could not be downloaded; the email is retried later.")
+            self.llm_unavailable = True
+            return False
+        return True
+
+    def _learn_template(self):
+        """Feeds a successful LLM extraction to the template inducer of the default registry."""
+        if not self.trade_data or self.registry is not DEFAULT_REGISTRY:
+            return
+        try:
+            TemplateInducer.shared().observe(self.email_type, self.email['snippet'], self.trade_data)
+        except (KeyError, TypeError, ValueError) as e:
+            print(f"   -> Template Learning skipped: {e}")
+
+    def apply(self) -> bool:
+        """
+        Writes the extracted data to the database and records the email in the ledger.
+        Returns False if the email has to be retried later.
+
+        A database error propagates; the unit of work then rolls back the emails that
+        were not committed yet, so no half-applied email is ever committed.
+        """
+        if self.llm_unavailable:
+            return False
+
+        # The ledger key is the Gmail ID; the Message-ID header identifies the same email across
+        # sources, e.g. one imported from a mail archive before the monitor saw it (or vice versa)
+        message_id = self.email.get('message_id')
+        if message_id and message_id != self.email['id'] and \
+                self.unit_of_work.execute(self.SELECT_MESSAGE_SQL, (message_id,)).fetchone():
+            print(f"   -> Already applied under its Message-ID {message_id}. Skipping.")
+        elif self.email_type == OPEN_POSITION:
             self._handle_open_position()
-        elif "[MEXC][Copy Trade] Position Closed Successfully" in subject:
+        elif self.email_type == CLOSE_POSITION:
             self._handle_close_position()
-        else:
-            return
+
+        processed_at = int(time.time())
+        self.unit_of_work.execute(self.RECORD_MESSAGE_SQL, (self.email['id'], processed_at))
+        if message_id and message_id != self.email['id']:
+            self.unit_of_work.execute(self.RECORD_MESSAGE_SQL, (message_id, processed_at))
+        self.unit_of_work.email_done()
+        return True
 
     def _handle_open_position(self):
         """
         Now also extracts the entry_price and saves it to the database.
         """
-        print("   -> Attempt 1: Extracting data with Regex...")
-        # Regex is adjusted to capture the entry price as a separate group (group 3).
-        pattern = r"opened a (\w+) (LONG|SHORT) position\. Entry Price: ([0-9.,]+); Trader: (\w+)"
-        match = re.search(pattern, self.email['snippet'])
-
-        if match:
-            print("   -> Regex Success: Data found.")
-            # Convert the price (replace comma with dot) to a float.
-            price_str = match.group(3).replace(',', '.')
-            trade_data = {
-                "crypto_pair": match.group(1),
-                "direction": match.group(2),
-                "entry_price": float(price_str),
-                "trader": match.group(4)  # Trader is now group 4
-            }
-        else:
-            print("   -> Regex Failed. Starting Attempt 2: LLM Fallback...")
-            try:
-                extractor = LLMDataExtractor()
-                trade_data = extractor.extract_trade_data(self.email['body'])
-            except ValueError as e:
-                print(f"   -> LLM Error: Cannot initialize extractor. {e}")
-                return
+        trade_data = self.trade_data
 
         # Validate that all necessary data has been extracted
         if trade_data and all(
@@ -64,66 +213,59 @@ class Analyze:
             open_time = self.email['date']
             timestamp = self.email['timestamp']
 
-            self.cursor.execute(
-                """SELECT id FROM trades
-                   WHERE crypto_pair = ? AND trader = ? AND direction = ? AND status = 'OPEN'""",
-                (crypto_pair, trader, direction)
-            )
-            existing_trade = self.cursor.fetchone()
+            existing_trade = self.unit_of_work.execute(
+                self.SELECT_OPEN_TRADE_SQL, (crypto_pair, trader, direction)).fetchone()
             if existing_trade:
                 # An open trade already exists, update it.
-                trade_id = existing_trade[0]
+                trade_id, alerts_sent = existing_trade
                 print(
                     f"🔄 Position UPDATED: Existing 'OPEN' trade (ID: {trade_id}) found for {crypto_pair}/{trader}.")
-                self.cursor.execute(
-                    """UPDATE trades SET entry_price = ?, open_time = ?, timestamp = ?
-                       WHERE id = ?""",
-                    (entry_price, open_time, timestamp, trade_id)
-                )
+                self.unit_of_work.execute(self.UPDATE_OPEN_TRADE_SQL,
+                                          (entry_price, open_time, timestamp, timestamp, trade_id))
                 print("   -> Record successfully updated in the database.")
+                self._report_open(trade_id, alerts_sent)
             else:
                 print(
                     f"📈 Position OPENED: Pair={crypto_pair}, Direction={direction.upper()}, Price={entry_price}, Trader={trader}")
 
                 # INSERT query is adjusted with the 'entry_price' column
-                self.cursor.execute(
-                    """INSERT INTO trades 
-                       (crypto_pair, trader, entry_price, open_time, direction, status, timestamp) 
-                       VALUES (?, ?, ?, ?, ?, ?, ?)""",
-                    (crypto_pair, trader, entry_price, open_time, direction.upper(), 'OPEN', timestamp)
-                )
-                self.conn.commit()
+                trade_id = self.unit_of_work.execute(
+                    self.INSERT_TRADE_SQL,
+                    (crypto_pair, trader, entry_price, open_time, direction.upper(), 'OPEN', timestamp, timestamp)
+                ).lastrowid
                 print("   -> Record successfully added to the database.")
+                self._report_open(trade_id, 0)
         else:
             print(
                 f"   -> CRITICAL ERROR: Could not fully extract trade data from email with subject: '{self.email['subject']}'")
 
+    def _report_open(self, trade_id: int, alerts_sent: int):
+        """Reports the inserted or updated open trade to the trade listeners, after the commit."""
+        trade_data = self.trade_data
+        self.unit_of_work.trade_opened({
+            'id': trade_id, 'crypto_pair': trade_data['crypto_pair'], 'trader': trade_data['trader'],
+            'direction': trade_data['direction'].upper(), 'entry_price': float(trade_data['entry_price']),
+            'timestamp': self.email['timestamp'], 'alerts_sent': alerts_sent,
+            'next_alert_at': self.email['timestamp'],
+        })
+
     def _handle_close_position(self):
         """
-        Extracts data, finds the corresponding open trade (incl. direction),
+        Finds the corresponding open trade (incl. direction) of the extracted data
         and updates it in the DB.
         """
-        pattern = r"Your (\w+) position has been closed successfully\. Trader: (\w+)"
-        match = re.search(pattern, self.email['snippet'])
+        close_data = self.trade_data
 
-        if not match:
+        if not close_data:
             print(f"Could not extract data from 'close' email: {self.email['subject']}")
             return
 
-        crypto_pair = match.group(1)
-        trader = match.group(2)
+        crypto_pair = close_data['crypto_pair']
+        trader = close_data['trader']
 
         # Find the ID and direction of the most recent matching open trade.
-        self.cursor.execute(
-            """
-            SELECT id, direction FROM trades
-            WHERE crypto_pair = ? AND trader = ? AND status = 'OPEN'
-            ORDER BY open_time DESC
-            LIMIT 1
-            """,
-            (crypto_pair, trader)
-        )
-        trade_to_close = self.cursor.fetchone()  # Fetch one result
+        trade_to_close = self.unit_of_work.execute(
+            self.SELECT_TRADE_TO_CLOSE_SQL, (crypto_pair, trader)).fetchone()  # Fetch one result
 
         # If we found a trade, update it.
         if trade_to_close:
@@ -133,12 +275,9 @@ class Analyze:
             print(f"📉 Position CLOSED: Pair={crypto_pair}, Direction={trade_direction}, Trader={trader}")
 
             # Update the specific trade based on its unique ID.
-            self.cursor.execute(
-                "UPDATE trades SET status = 'CLOSED' WHERE id = ?",
-                (trade_id,)
-            )
-            self.conn.commit()
+            self.unit_of_work.execute(self.CLOSE_TRADE_SQL, (trade_id,))
             print("   -> Record updated in the database.")
+            self.unit_of_work.trade_closed(trade_id)
         else:
             # If there is no corresponding open trade, issue a clear warning.
             print(f"   -> WARNING: No corresponding 'OPEN' position found for {crypto_pair}/{trader}.")
\ No newline at end of file
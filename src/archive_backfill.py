@@ -0,0 +1,172 @@
+# src/archive_backfill.py
+
+import contextlib
+import email
+import email.policy
+import hashlib
+import html
+import mailbox
+import os
+import re
+import time
+from email.utils import parsedate_to_datetime
+from multiprocessing import Pool
+from typing import Iterable, Iterator
+from .analyzer import Analyze
+from .database_manager import DatabaseManager
+
+# Gmail snippets are about 200 characters; a bit more is kept so the regex templates
+# still match when an archived email has a longer preamble.
+SNIPPET_LENGTH = 500
+TRADE_SUBJECTS = (Analyze.OPEN_SUBJECT, Analyze.CLOSE_SUBJECT)
+
+
+def iter_raw_messages(paths: Iterable[str]) -> Iterator[bytes]:
+    """
+    Yields the raw bytes of every message in the given mbox files, EML files and
+    directories (searched recursively for *.eml and *.mbox files).
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith(('.eml', '.mbox')):
+                        yield from iter_raw_messages([os.path.join(root, name)])
+        elif path.lower().endswith('.eml'):
+            with open(path, 'rb') as f:
+                yield f.read()
+        else:
+            # Only the raw bytes are read here; parsing is left to the worker processes.
+            # The "From " line is kept: in a Google Takeout export it holds the Gmail message ID.
+            mbox = mailbox.mbox(path, create=False)
+            for key in mbox.iterkeys():
+                yield mbox.get_bytes(key, from_=True)
+
+
+def gmail_id_from_line(from_line: bytes) -> str | None:
+    """
+    Returns the Gmail API message ID of a Google Takeout mbox "From " line
+    ("From 1689486578149470234@xxx ..."), which carries it in decimal; None otherwise.
+    """
+    match = re.match(rb"From (\d+)@xxx ", from_line)
+    return format(int(match.group(1)), 'x') if match else None
+
+
+def parse_raw_message(raw: bytes) -> dict | None:
+    """
+    Parses one archived message into the email data dictionary used by Analyze.
+    Runs in the worker processes. Returns None for messages that are not MEXC trade emails.
+    """
+    gmail_id = None
+    if raw.startswith(b"From "):
+        from_line, _, raw = raw.partition(b"\n")
+        gmail_id = gmail_id_from_line(from_line)
+    message = email.message_from_bytes(raw, policy=email.policy.default)
+    subject = str(message.get('subject', 'No subject'))
+    if not any(trade_subject in subject for trade_subject in TRADE_SUBJECTS):
+        return None
+
+    date_str = str(message.get('date', ''))
+    timestamp = 0
+    if date_str:
+        try:
+            timestamp = int(parsedate_to_datetime(date_str).timestamp())
+        except (TypeError, ValueError):
+            pass
+
+    body = ""
+    part = message.get_body(preferencelist=('plain', 'html'))
+    if part is not None:
+        try:
+            body = part.get_content()
+        except (LookupError, UnicodeDecodeError):
+            body = part.get_payload(decode=True).decode('utf-8', errors='replace')
+        if part.get_content_type() == 'text/html':
+            body = html.unescape(re.sub(r"<[^>]+>", " ", body))
+
+    # The ledger key is the Gmail ID, like for the emails of the live monitor; without one (not a
+    # Takeout export), the Message-ID or a hash of the message. Analyze also checks the Message-ID.
+    message_id = str(message.get('message-id', '')).strip() or None
+    ledger_id = gmail_id or message_id or hashlib.sha1(raw).hexdigest()
+
+    return {
+        "id": ledger_id,
+        "message_id": message_id,
+        "sender": str(message.get('from', 'Unknown sender')),
+        "subject": subject,
+        "snippet": re.sub(r"\s+", " ", body).strip()[:SNIPPET_LENGTH],
+        "labels": [],
+        "date": date_str,
+        "body": body,
+        "timestamp": timestamp
+    }
+
+
+class ArchiveBackfill:
+    """
+    Imports exported MEXC notification mail (mbox files or EML directories) into the
+    trades database without any network access.
+
+    Messages are parsed on a process pool, ordered by timestamp and applied through the
+    regular Analyze open/close logic in large transactions. There is no LLM fallback:
+    emails the regex templates cannot parse are reported and left unprocessed, so a
+    later run with the LLM available can still pick them up.
+    """
+
+    def __init__(self, db_manager: DatabaseManager, workers: int | None = None,
+                 commit_every: int = 5000, verbose: bool = False):
+        self.db_manager = db_manager
+        self.workers = workers or os.cpu_count() or 1
+        self.commit_every = commit_every
+        self.verbose = verbose
+
+    def run(self, paths: list[str]) -> dict:
+        """Runs the backfill and returns its statistics."""
+        start = time.perf_counter()
+        scanned = 0
+        emails = []
+        with Pool(self.workers) as pool:
+            for email_data in pool.imap(parse_raw_message, iter_raw_messages(paths), chunksize=256):
+                scanned += 1
+                if email_data is not None:
+                    emails.append(email_data)
+        parse_seconds = time.perf_counter() - start
+        print(f"Parsed {scanned} messages ({len(emails)} trade emails) in {parse_seconds:.2f}s "
+              f"with {self.workers} worker(s): {scanned / parse_seconds if parse_seconds else 0:,.0f} emails/s.")
+
+        # Analyze relies on an open being applied before its matching close
+        emails.sort(key=lambda e: e['timestamp'])
+
+        apply_start = time.perf_counter()
+        stats = self.apply(emails)
+        apply_seconds = time.perf_counter() - apply_start
+        total_seconds = time.perf_counter() - start
+        print(f"Applied {stats['applied']} emails in {apply_seconds:.2f}s "
+              f"({stats['applied'] / apply_seconds if apply_seconds else 0:,.0f} emails/s). "
+              f"Skipped {stats['skipped']} already processed, {stats['unparsed']} unparsed.")
+        print(f"Backfill finished in {total_seconds:.2f}s: "
+              f"{scanned / total_seconds if total_seconds else 0:,.0f} emails/s overall.")
+        stats.update(scanned=scanned, trade_emails=len(emails), seconds=total_seconds)
+        return stats
+
+    def apply(self, emails: list[dict]) -> dict:
+        """Applies the emails in the given order, committing every `commit_every` emails."""
+        stats = {'applied': 0, 'skipped': 0, 'unparsed': 0}
+        # Analyze reports every email on the console; that would dominate a large backfill
+        with contextlib.ExitStack() as stack:
+            if not self.verbose:
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            unit_of_work = stack.enter_context(self.db_manager.unit_of_work(self.commit_every))
+            for email_data in emails:
+                if self.db_manager.is_message_processed(email_data['id']) or (
+                        email_data['message_id'] and self.db_manager.is_message_processed(email_data['message_id'])):
+                    stats['skipped'] += 1
+                    continue
+                analyzer = Analyze(email_data=email_data, unit_of_work=unit_of_work)
+                if not analyzer.parse():
+                    analyzer.llm_unavailable = True
+                if analyzer.apply():
+                    stats['applied'] += 1
+                else:
+                    stats['unparsed'] += 1
+        return stats
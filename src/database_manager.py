@@ -1,22 +1,152 @@
 # src/database_manager.py
 
 import sqlite3
+import threading
+import time
+
+
+class UnitOfWork:
+    """
+    One write transaction for the emails of an ingestion cycle.
+
+    All statements go through a single cursor. sqlite3 caches the compiled statements of
+    a connection by their SQL text, so the fixed statements of Analyze are prepared once
+    and reused for every email. The transaction is committed every `commit_every` emails
+    (only at the end with None), on commit(), and when the `with` block is left normally;
+    an exception leaving the block rolls back everything since the last commit.
+
+    Trades opened and closed in the unit of work are reported to the trade listeners
+    of the DatabaseManager, but only once they are committed.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, commit_every: int | None = None, listeners: list | None = None):
+        self.conn = conn
+        self.cursor = conn.cursor()
+        self.commit_every = commit_every
+        self.listeners = listeners or []
+        self.events: list[tuple[str, object]] = []  # (listener method, argument), sent on commit
+        self.pending = 0  # Emails applied since the last commit
+        self.emails = 0
+        self.commits = 0
+        self.committed_at = time.monotonic()
+
+    def __enter__(self) -> 'UnitOfWork':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def execute(self, sql: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        """Executes a statement in the transaction of this unit of work."""
+        return self.cursor.execute(sql, parameters)
+
+    def email_done(self):
+        """Counts an applied email and commits once `commit_every` emails are pending."""
+        self.pending += 1
+        self.emails += 1
+        if self.commit_every and self.pending >= self.commit_every:
+            self.commit()
+
+    def trade_opened(self, trade: dict):
+        """Reports a trade that was inserted or updated as open, once it is committed."""
+        if self.listeners:
+            self.events.append(('trade_opened', trade))
+
+    def trade_closed(self, trade_id: int):
+        """Reports a trade that was closed, once it is committed."""
+        if self.listeners:
+            self.events.append(('trade_closed', trade_id))
+
+    def commit(self):
+        """Commits the pending emails, if any statement was executed since the last commit."""
+        if self.conn.in_transaction:
+            self.conn.commit()
+            self.commits += 1
+        self.pending = 0
+        self.committed_at = time.monotonic()
+        events, self.events = self.events, []
+        for method, argument in events:
+            for listener in self.listeners:
+                getattr(listener, method)(argument)
+
+    def rollback(self):
+        """Discards everything since the last commit; those emails stay out of the ledger."""
+        self.conn.rollback()
+        self.pending = 0
+        self.events = []
 
 
 class DatabaseManager:
     """
     Manages all interactions with the SQLite database for trades.
+
+    The database runs in WAL mode, so the monitor, the backfills and the GUIs can use it
+    at the same time: readers never block the writer and the writer never blocks readers.
+    Every thread gets its own connection from get_connection(); a writer that finds the
+    database locked by another process waits up to BUSY_TIMEOUT_SECONDS.
     """
+    BUSY_TIMEOUT_SECONDS = 10.0
 
     def __init__(self, db_file: str):
         self.db_file = db_file
-        self.conn = sqlite3.connect(db_file)
-        self.conn.row_factory = sqlite3.Row  # For dictionary-like results
+        self.local = threading.local()
+        self.connections: list[sqlite3.Connection] = []
+        self.connections_lock = threading.Lock()
+        self.trade_listeners = []
+        # The connection of the thread that created the manager
+        self.conn = self.get_connection()
         self.cursor = self.conn.cursor()
         self._setup_database()
 
+    def _connect(self) -> sqlite3.Connection:
+        # Each connection is only used by its own thread, but close_connection() may close it from another
+        conn = sqlite3.connect(self.db_file, timeout=self.BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        conn.row_factory = sqlite3.Row  # For dictionary-like results
+        # WAL is stored in the database file, so this only changes something the first time
+        conn.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode NORMAL is still safe against corruption; it only skips an fsync per commit
+        conn.execute("PRAGMA synchronous = NORMAL")
+        return conn
+
     def _setup_database(self):
-        """Creates the table and adds columns for alerts if they don't exist."""
+        """
+        Brings the schema up to date. PRAGMA user_version holds the number of the last
+        migration applied, so every migration runs exactly once per database.
+        Each migration and its version number are one explicit transaction: sqlite3 would
+        otherwise run DDL statements outside of a transaction, so a failed migration would
+        leave e.g. an added column behind.
+        """
+        version = self.cursor.execute("PRAGMA user_version").fetchone()[0]
+        migrations = self._migrations()
+        for number, (description, migrate) in enumerate(migrations[version:], start=version + 1):
+            try:
+                self.cursor.execute("BEGIN")
+                migrate()
+                # PRAGMA does not accept parameters; the number is an int
+                self.cursor.execute(f"PRAGMA user_version = {number}")
+                self.conn.commit()
+            except sqlite3.Error:
+                self.conn.rollback()
+                raise
+            print(f"Database migrated to version {number}: {description}.")
+
+    def _migrations(self) -> list:
+        """The numbered schema migrations, in order. Only ever append to this list."""
+        return [
+            ("base schema", self._migration_base_schema),
+            ("indexes for the trade lookups", self._migration_trade_indexes),
+            ("next alert time of the open trades", self._migration_next_alert),
+        ]
+
+    def _migration_base_schema(self):
+        """
+        Creates the tables. Databases from before the versioning already have some of them,
+        possibly without the alerts_sent column, so everything here is conditional.
+        """
         self.cursor.execute("""
             CREATE TABLE IF NOT EXISTS trades (
                 id INTEGER PRIMARY KEY AUTOINCREMENT, crypto_pair TEXT NOT NULL,
@@ -28,51 +158,170 @@ class DatabaseManager:
                 alerts_sent INTEGER NOT NULL DEFAULT 0
             )
         """)
-        # Add columns if they don't exist for backward compatibility
-        try:
+        columns = [info[1] for info in self.cursor.execute("PRAGMA table_info(trades)").fetchall()]
+        if 'alerts_sent' not in columns:
             self.cursor.execute("ALTER TABLE trades ADD COLUMN alerts_sent INTEGER NOT NULL DEFAULT 0")
-        except sqlite3.OperationalError:
-            pass  # Column already exists
-        try:
-            # Check if 'mail_send' exists before trying to rename.
-            self.cursor.execute("PRAGMA table_info(trades)")
-            columns = [info[1] for info in self.cursor.fetchall()]
-            if 'mail_send' in columns and 'alerts_sent' not in columns:
-                # This part is for migration, but safer just to add and use the new one.
-                pass
-        except sqlite3.OperationalError:
-            pass
-        self.conn.commit()
+        # Ledger of handled Gmail messages, so an email is applied at most once
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS processed_messages (
+                message_id TEXT PRIMARY KEY,
+                processed_at INTEGER NOT NULL
+            )
+        """)
+        # Date windows a Gmail backfill has completely applied, per search query
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS backfill_windows (
+                query TEXT NOT NULL,
+                window_start INTEGER NOT NULL,
+                window_end INTEGER NOT NULL,
+                emails INTEGER NOT NULL,
+                completed_at INTEGER NOT NULL,
+                PRIMARY KEY (query, window_start, window_end)
+            )
+        """)
+
+    def _migration_trade_indexes(self):
+        """
+        Indexes for the queries that run per email and per price check. The partial indexes
+        only hold the open trades, so they stay small however long the closed history grows.
+        """
+        # Open/close emails (Analyze): look up the open trade of a pair and trader (and direction).
+        # With status as last column SQLite answers both lookups from the index alone (covering).
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trades_open_lookup
+            ON trades (crypto_pair, trader, direction, timestamp, status) WHERE status = 'OPEN'
+        """)
+        # Position monitoring: all open trades, newest first
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trades_open_timestamp
+            ON trades (timestamp) WHERE status = 'OPEN'
+        """)
+        # GUI: all trades newest first, and the trader filter
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_timestamp ON trades (timestamp)")
+        self.cursor.execute("CREATE INDEX IF NOT EXISTS idx_trades_trader ON trades (trader)")
+
+    def _migration_next_alert(self):
+        """
+        Persists the time of the next scheduled alert of every open trade (NULL once all
+        alerts have been sent), so the monitor only reads the trades that are due.
+
+        The existing open trades start at their open time, a lower bound of any schedule;
+        the monitor replaces it with the time from the trader configuration.
+        """
+        columns = [info[1] for info in self.cursor.execute("PRAGMA table_info(trades)").fetchall()]
+        if 'next_alert_at' not in columns:
+            self.cursor.execute("ALTER TABLE trades ADD COLUMN next_alert_at INTEGER")
+        self.cursor.execute("UPDATE trades SET next_alert_at = timestamp WHERE status = 'OPEN'")
+        self.cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_trades_next_alert
+            ON trades (next_alert_at) WHERE status = 'OPEN'
+        """)
+        # Small key/value store, e.g. for the fingerprint of the trader configuration
+        self.cursor.execute("""
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
 
     def get_open_trades_details(self) -> list[dict]:
         """
         Fetches a list of dictionaries with all details of open trades.
         """
-        self.cursor.execute("""
+        cursor = self.get_connection().cursor()
+        cursor.execute("""
             SELECT id, crypto_pair, direction, trader, entry_price, open_time, timestamp, alerts_sent
             FROM trades WHERE status = 'OPEN' ORDER BY timestamp DESC
         """)
-        results = self.cursor.fetchall()
+        results = cursor.fetchall()
         return [dict(row) for row in results]
 
+    def get_scheduled_trades(self) -> list[dict]:
+        """Fetches the ID and next alert time of every open trade that still has an alert to come."""
+        cursor = self.get_connection().cursor()
+        cursor.execute("""
+            SELECT id, next_alert_at FROM trades WHERE status = 'OPEN' AND next_alert_at IS NOT NULL
+        """)
+        return [dict(row) for row in cursor.fetchall()]
+
+    def get_open_trades_by_id(self, trade_ids: list[int]) -> list[dict]:
+        """Fetches the details of the given trades that are still open, in the order of the IDs."""
+        if not trade_ids:
+            return []
+        cursor = self.get_connection().cursor()
+        placeholders = ", ".join("?" * len(trade_ids))
+        cursor.execute(f"""
+            SELECT id, crypto_pair, direction, trader, entry_price, open_time, timestamp, alerts_sent, next_alert_at
+            FROM trades WHERE status = 'OPEN' AND id IN ({placeholders})
+        """, trade_ids)
+        trades = {row['id']: dict(row) for row in cursor.fetchall()}
+        return [trades[trade_id] for trade_id in trade_ids if trade_id in trades]
+
+    def get_due_trades(self, now: int) -> list[dict]:
+        """
+        Fetches the open trades whose next scheduled alert is due at `now`, most overdue first.
+        Served by a partial index, so the cost depends on the due trades, not on all open trades.
+        """
+        cursor = self.get_connection().cursor()
+        cursor.execute("""
+            SELECT id, crypto_pair, direction, trader, entry_price, open_time, timestamp, alerts_sent, next_alert_at
+            FROM trades WHERE status = 'OPEN' AND next_alert_at <= ? ORDER BY next_alert_at
+        """, (now,))
+        return [dict(row) for row in cursor.fetchall()]
+
+    def reschedule_trades(self, next_alerts: dict[int, int | None], config_fingerprint: str | None = None):
+        """
+        Stores the next alert time per trade ID (None: no alert left). With a config_fingerprint,
+        records in the same transaction which trader configuration the times were calculated from.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.executemany("UPDATE trades SET next_alert_at = ? WHERE id = ?",
+                               [(next_alert_at, trade_id) for trade_id, next_alert_at in next_alerts.items()])
+            if config_fingerprint is not None:
+                cursor.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('trader_config_fingerprint', ?)",
+                               (config_fingerprint,))
+            conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+
+    def get_meta(self, key: str) -> str | None:
+        """Reads a value of the meta table."""
+        cursor = self.get_connection().cursor()
+        row = cursor.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row['value'] if row else None
+
     def close_trade_manually(self, trade_id: int) -> bool:
         """Sets the status of a specific trade to 'CLOSED' based on its ID."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         try:
-            self.cursor.execute("UPDATE trades SET status = 'CLOSED' WHERE id = ?", (trade_id,))
-            self.conn.commit()
+            cursor.execute("UPDATE trades SET status = 'CLOSED' WHERE id = ?", (trade_id,))
+            conn.commit()
             # rowcount > 0 means the update was successful
-            return self.cursor.rowcount > 0
+            if cursor.rowcount > 0:
+                for listener in self.trade_listeners:
+                    listener.trade_closed(trade_id)
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
+            # Do not keep the write lock of a failed transaction
+            conn.rollback()
             print(f"Database error while closing trade {trade_id}: {e}")
             return False
 
     def increment_alert_count(self, trade_id: int) -> bool:
         """Increments the alert counter for a specific trade."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
         try:
-            self.cursor.execute("UPDATE trades SET alerts_sent = alerts_sent + 1 WHERE id = ?", (trade_id,))
-            self.conn.commit()
-            return self.cursor.rowcount > 0
+            cursor.execute("UPDATE trades SET alerts_sent = alerts_sent + 1 WHERE id = ?", (trade_id,))
+            conn.commit()
+            return cursor.rowcount > 0
         except sqlite3.Error as e:
+            # Do not keep the write lock of a failed transaction
+            conn.rollback()
             print(f"Database error while incrementing alert count for trade {trade_id}: {e}")
             return False
 
@@ -81,26 +330,83 @@ class DatabaseManager:
         """
         Fetches a list of dictionaries with all details of ALL trades (open and closed).
         """
-        self.cursor.execute("""
+        cursor = self.get_connection().cursor()
+        cursor.execute("""
             SELECT id, crypto_pair, direction, trader, entry_price, open_time, timestamp, mail_send, status
             FROM trades ORDER BY timestamp DESC
         """)
-        results = self.cursor.fetchall()
+        results = cursor.fetchall()
         return [dict(row) for row in results]
 
     # Add this method too
     def get_unique_traders(self) -> list[str]:
         """Fetches a list of unique trader names from the database."""
-        self.cursor.execute("SELECT DISTINCT trader FROM trades ORDER BY trader")
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT DISTINCT trader FROM trades ORDER BY trader")
         # fetchall() returns a list of tuples, e.g., [('TraderA',), ('TraderB',)]
-        results = self.cursor.fetchall()
+        results = cursor.fetchall()
         return [row['trader'] for row in results]
 
+    def is_message_processed(self, message_id: str) -> bool:
+        """Checks whether an email has already been handled by Analyze."""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT 1 FROM processed_messages WHERE message_id = ?", (message_id,))
+        return cursor.fetchone() is not None
+
+    def get_completed_backfill_windows(self, query: str) -> set[tuple[int, int]]:
+        """Returns the (start, end) date windows a backfill with this query has already applied."""
+        cursor = self.get_connection().cursor()
+        cursor.execute("SELECT window_start, window_end FROM backfill_windows WHERE query = ?", (query,))
+        return {(row['window_start'], row['window_end']) for row in cursor.fetchall()}
+
+    def mark_backfill_window_completed(self, query: str, window_start: int, window_end: int, emails: int,
+                                       commit: bool = True):
+        """
+        Checkpoints a backfill window. With commit=False the checkpoint becomes part of
+        the caller's transaction, e.g. the one that applied the window's emails.
+        """
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute(
+            """INSERT OR REPLACE INTO backfill_windows (query, window_start, window_end, emails, completed_at)
+               VALUES (?, ?, ?, ?, strftime('%s', 'now'))""",
+            (query, window_start, window_end, emails)
+        )
+        if commit:
+            conn.commit()
+
+    def add_trade_listener(self, listener):
+        """
+        Registers an object with trade_opened(trade: dict) and trade_closed(trade_id: int)
+        methods. They are called after the commit of a unit of work that opened or closed
+        trades, and after a manual close; only for writes made by this process.
+        """
+        self.trade_listeners.append(listener)
+
+    def unit_of_work(self, commit_every: int | None = None) -> UnitOfWork:
+        """
+        Opens a unit of work on the connection of the calling thread, for use in a `with` block:
+
+            with db_manager.unit_of_work(commit_every=50) as unit_of_work:
+                Analyze.process_batch(emails, unit_of_work)
+        """
+        return UnitOfWork(self.get_connection(), commit_every, self.trade_listeners)
+
     def get_connection(self) -> sqlite3.Connection:
-        """Returns the active database connection for use by other classes."""
-        return self.conn
+        """
+        Returns the database connection of the calling thread for use by other classes,
+        opening it on the first call. SQLite connections must not be shared between threads.
+        """
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            conn = self.local.conn = self._connect()
+            with self.connections_lock:
+                self.connections.append(conn)
+        return conn
 
     def close_connection(self):
-        """Closes the database connection."""
-        if self.conn:
-            self.conn.close()
\ No newline at end of file
+        """Closes the database connections of all threads."""
+        with self.connections_lock:
+            for conn in self.connections:
+                conn.close()
+            self.connections.clear()
\ No newline at end of file
@@ -0,0 +1,166 @@
+# src/gmail_backfill.py
+
+import contextlib
+import heapq
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from googleapiclient.errors import HttpError
+from .analyzer import Analyze
+from .database_manager import DatabaseManager
+from .gmail_checker import GmailChecker
+
+DAY_SECONDS = 86400
+
+
+class GmailBackfill:
+    """
+    Rebuilds the trade history from Gmail over a date range.
+
+    The range is split into `after:`/`before:` windows of `window_days` days. Groups of
+    `workers` consecutive windows are fetched in parallel, each thread with its own
+    GmailChecker (the Gmail client is not thread-safe), all sharing one rate limiter.
+    The emails of a group are merged in timestamp order and applied with Analyze in a
+    single transaction, together with the checkpoints of the windows whose emails were
+    all applied. An interrupted backfill resumes with the windows that have no checkpoint.
+
+    A close must be applied after its open, so the backfill stops after a group with an
+    incomplete window instead of applying later windows out of order.
+    """
+    DEFAULT_WINDOW_DAYS = 7
+    DEFAULT_WORKERS = 4
+
+    def __init__(self, db_manager: DatabaseManager, checker_factory: Callable[[], GmailChecker], base_query: str,
+                 workers: int = DEFAULT_WORKERS, window_days: float = DEFAULT_WINDOW_DAYS, verbose: bool = False):
+        self.db_manager = db_manager
+        self.checker_factory = checker_factory
+        self.base_query = base_query
+        self.workers = max(1, workers)
+        self.window_seconds = max(1, int(window_days * DAY_SECONDS))
+        self.verbose = verbose
+        self.local = threading.local()
+
+    @staticmethod
+    def build_windows(start: int, end: int, window_seconds: int) -> list[tuple[int, int]]:
+        """
+        Splits [start, end) into consecutive windows. The boundaries are aligned on `start`,
+        so a resumed backfill produces the same windows (only the last one may grow).
+        """
+        return [(window_start, min(window_start + window_seconds, end))
+                for window_start in range(start, end, window_seconds)]
+
+    def window_query(self, window: tuple[int, int]) -> str:
+        """The search query of a window. `after:` is exclusive, so it starts one second early."""
+        return f"{self.base_query} after:{window[0] - 1} before:{window[1]}"
+
+    def run(self, start: int, end: int) -> dict:
+        """Backfills the emails between the Unix timestamps `start` and `end`, returns the statistics."""
+        windows = self.build_windows(start, end, self.window_seconds)
+        completed = self.db_manager.get_completed_backfill_windows(self.base_query)
+        pending = [window for window in windows if window not in completed]
+        print(f"Backfilling {len(windows)} window(s) of {self.window_seconds / DAY_SECONDS:g} day(s), "
+              f"{len(windows) - len(pending)} already completed, with {self.workers} worker(s).")
+
+        stats = {'windows': 0, 'failed_windows': 0, 'emails': 0, 'applied': 0, 'retry': 0}
+        run_start = time.perf_counter()
+        with ThreadPoolExecutor(self.workers, thread_name_prefix='gmail-backfill') as pool:
+            for index in range(0, len(pending), self.workers):
+                group = pending[index:index + self.workers]
+                completed_group = self._run_group(group, pool, stats)
+                elapsed = time.perf_counter() - run_start
+                print(f"   -> {index + len(group)}/{len(pending)} window(s) done, {stats['emails']} email(s), "
+                      f"{stats['emails'] / elapsed if elapsed else 0:,.1f} emails/s.")
+                if not completed_group:
+                    print("   -> Stopping: later windows must not be applied before the incomplete ones.")
+                    break
+
+        stats['seconds'] = time.perf_counter() - run_start
+        print(f"Backfill finished in {stats['seconds']:.2f}s: {stats['applied']} email(s) applied, "
+              f"{stats['retry']} to retry, {stats['failed_windows']} window(s) incomplete.")
+        if stats['retry'] or stats['failed_windows']:
+            print("Run the backfill again to retry the incomplete windows.")
+        return stats
+
+    def _run_group(self, group: list[tuple[int, int]], pool: ThreadPoolExecutor, stats: dict) -> bool:
+        """
+        Fetches a group of windows in parallel and applies their emails in one transaction,
+        up to the first window that could not be fetched completely: the emails of the later
+        windows must not be applied before the missing ones. Returns False if a window of the
+        group could not be completed.
+        """
+        # The ledger lives in SQLite, which is only used on this thread
+        id_lists = list(pool.map(self._list_window_ids, group))
+        new_id_lists = [
+            None if msg_ids is None else [msg_id for msg_id in msg_ids
+                                          if not self.db_manager.is_message_processed(msg_id)]
+            for msg_ids in id_lists
+        ]
+        email_lists = list(pool.map(self._fetch_window_emails, new_id_lists))
+
+        # A window is only fetched completely if it was listed and every new message was downloaded
+        complete = [
+            msg_ids is not None and len(emails) == len(msg_ids)
+            for msg_ids, emails in zip(new_id_lists, email_lists)
+        ]
+        fetched = complete.index(False) if False in complete else len(group)
+        if fetched < len(group):
+            window = group[fetched]
+            print(f"   -> Window {window[0]}-{window[1]} could not be fetched completely; "
+                  f"it and the {len(group) - fetched - 1} later window(s) of the group are left for the next run.")
+            complete[fetched:] = [False] * (len(group) - fetched)
+
+        # Each window is sorted on its own; the windows of a group are merged.
+        # Neighbouring windows overlap by one second, so a message can show up twice.
+        email_lists = email_lists[:fetched]
+        for emails in email_lists:
+            emails.sort(key=lambda e: e['timestamp'])
+        merged = []
+        seen = set()
+        for email in heapq.merge(*email_lists, key=lambda e: e['timestamp']):
+            if email['id'] not in seen:
+                seen.add(email['id'])
+                merged.append(email)
+
+        with contextlib.ExitStack() as stack:
+            if not self.verbose:
+                # Analyze reports every email on the console; that would dominate a large backfill
+                stack.enter_context(contextlib.redirect_stdout(stack.enter_context(open(os.devnull, 'w'))))
+            # One transaction for the group: its emails and the checkpoints of its windows
+            unit_of_work = stack.enter_context(self.db_manager.unit_of_work())
+            results = dict(zip((email['id'] for email in merged), Analyze.process_batch(merged, unit_of_work)))
+            for position, (window, emails) in enumerate(zip(group, email_lists)):
+                complete[position] = complete[position] and all(results[email['id']] for email in emails)
+                if complete[position]:
+                    self.db_manager.mark_backfill_window_completed(
+                        self.base_query, window[0], window[1], len(emails), commit=False)
+
+        applied = sum(results.values())
+        stats['emails'] += len(merged)
+        stats['applied'] += applied
+        stats['retry'] += len(merged) - applied
+        stats['windows'] += len(group)
+        stats['failed_windows'] += complete.count(False)
+        return all(complete)
+
+    def _checker(self) -> GmailChecker:
+        """Returns the GmailChecker of the current worker thread."""
+        checker = getattr(self.local, 'checker', None)
+        if checker is None:
+            checker = self.local.checker = self.checker_factory()
+        return checker
+
+    def _list_window_ids(self, window: tuple[int, int]) -> list | None:
+        """Runs on a worker thread. Returns None if the window could not be listed."""
+        try:
+            return self._checker().list_message_ids(self.window_query(window))
+        except HttpError as error:
+            print(f"An error occurred while listing window {window[0]}-{window[1]}: {error}")
+            return None
+
+    def _fetch_window_emails(self, msg_ids: list | None) -> list:
+        """Runs on a worker thread. Message errors are reported by the checker and leave the message out."""
+        if not msg_ids:
+            return []
+        return list(self._checker().iter_emails(msg_ids))
@@ -1,38 +1,174 @@
 # src/gmail_checker.py
 
 import os
+import json
+import time
 import base64
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator
 from email.utils import parsedate_to_datetime
-from google.auth.transport.requests import Request
-from google.oauth2.credentials import Credentials
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from .gmail_rate_limiter import GmailRateLimiter
+
+if TYPE_CHECKING:
+    from google.oauth2.credentials import Credentials
+
+
+class LazyBodyEmail(dict):
+    """
+    An email data dictionary whose 'body' is only downloaded on first access.
+
+    The regex fast path in Analyze only reads the subject and snippet, so the body
+    is fetched when `email['body']` is actually read, e.g. by the LLM fallback.
+    Note that `email.get('body')` and `'body' in email` do not trigger the download.
+    The body is None if the download failed.
+    """
+
+    def __init__(self, data: dict, load_body):
+        super().__init__(data)
+        self._load_body = load_body
+
+    def __missing__(self, key):
+        if key != 'body':
+            raise KeyError(key)
+        body = self._load_body()
+        self['body'] = body
+        return body
+
+
+class EmailFetch:
+    """
+    The iterator over the emails of GmailChecker.iter_emails. `complete` turns False when
+    a message is missing: a failed request ends the iteration early, and a message that
+    fails inside a batch is left out. Callers check it once the iterator is consumed and
+    must then not advance their checkpoints past the missing messages.
+    """
+
+    def __init__(self, checker: 'GmailChecker | None', msg_ids: list):
+        # Without a checker the messages could not even be listed
+        self.complete = checker is not None
+        self._emails = checker._fetch_emails(msg_ids, self) if checker is not None else iter(())
+
+    def __iter__(self) -> 'EmailFetch':
+        return self
+
+    def __next__(self) -> dict:
+        return next(self._emails)
 
 
 class GmailChecker:
     """
     A class to authenticate with the Gmail API and fetch emails.
     """
+    # Gmail accepts up to 100 calls per batch request, but recommends 50 or fewer
+    # to avoid rate limiting. A batch size of 1 disables batching.
+    DEFAULT_BATCH_SIZE = 50
+    MAX_BATCH_SIZE = 100
+    # Maximum number of message IDs per messages().list() page allowed by Gmail.
+    LIST_PAGE_SIZE = 500
+    # Partial responses used when the body is loaded lazily: the first tier only asks for
+    # what the regex fast path needs, the second tier only for the body parts.
+    METADATA_HEADERS = ['Subject', 'From', 'Date', 'Message-ID']
+    METADATA_FIELDS = 'id,snippet,labelIds,payload/headers'
+    BODY_FIELDS = 'payload(mimeType,body/data,parts(mimeType,body/data))'
+    # The discovery document is stored locally, reduced to the methods used here,
+    # so building the service does not load and parse the full Gmail API description.
+    DISCOVERY_CACHE_FILE = 'gmail_discovery.json'
+    DISCOVERY_URL = 'https://gmail.googleapis.com/$discovery/rest?version=v1'
+    USED_METHODS = {
+        'users': ['getProfile'],
+        'messages': ['list', 'get'],
+        'history': ['list'],
+    }
 
-    def __init__(self, scopes: list):
+    def __init__(self, scopes: list, batch_size: int = DEFAULT_BATCH_SIZE, service=None, lazy_body: bool = True,
+                 rate_limiter: GmailRateLimiter | None = None):
         self.scopes = scopes
-        self.creds = self._authenticate()
-        self.service = build('gmail', 'v1', credentials=self.creds)
+        self.batch_size = max(1, min(batch_size, self.MAX_BATCH_SIZE))
+        self.lazy_body = lazy_body
+        # Quota, retries and concurrency; shared by all checkers of one account, e.g. the threads of a GmailBackfill
+        self.rate_limiter = rate_limiter or GmailRateLimiter()
+        self.creds = None
+        if service is None:
+            # An already built service can be injected, e.g. a stub for benchmarks.
+            self.creds = self._authenticate()
+            service = self._build_service(self.creds)
+        self.service = service
 
-    def _authenticate(self) -> Credentials:
+    def clone(self) -> 'GmailChecker':
+        """
+        Returns a checker with the same credentials, settings and rate limiter but its own
+        HTTP connection. The Gmail client is not thread-safe, so every thread needs its own.
+        """
+        if self.creds is None:
+            raise ValueError("A checker built around an injected service cannot be cloned.")
+        checker = GmailChecker(self.scopes, self.batch_size, service=self._build_service(self.creds),
+                               lazy_body=self.lazy_body, rate_limiter=self.rate_limiter)
+        checker.creds = self.creds
+        return checker
+
+    def _execute(self, request, method: str, count: int = 1):
+        """Executes a request through the rate limiter, which retries throttling and server errors."""
+        return self.rate_limiter.execute(request, method, count)
+
+    @classmethod
+    def _build_service(cls, creds: 'Credentials'):
+        """Builds the Gmail service from the locally cached discovery document."""
+        # The Google client libraries take a noticeable share of startup, so they are imported on first use
+        from googleapiclient.discovery import build_from_document
+
+        cache_file = os.getenv('GMAIL_DISCOVERY_CACHE_FILE', cls.DISCOVERY_CACHE_FILE)
+        try:
+            with open(cache_file, 'r') as f:
+                document = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            document = cls._reduce_discovery_document(cls._load_discovery_document())
+            with open(cache_file, 'w') as f:
+                json.dump(document, f)
+        return build_from_document(document, credentials=creds)
+
+    @classmethod
+    def _load_discovery_document(cls) -> dict:
+        """Returns the full Gmail discovery document, preferably the copy bundled with the client library."""
+        from googleapiclient.discovery_cache import get_static_doc
+
+        document = get_static_doc('gmail', 'v1')
+        if document is None:
+            import requests
+            response = requests.get(cls.DISCOVERY_URL, timeout=30)
+            response.raise_for_status()
+            return response.json()
+        return json.loads(document)
+
+    @classmethod
+    def _reduce_discovery_document(cls, document: dict) -> dict:
+        """Drops every resource and method of the Gmail API that GmailChecker does not call."""
+        users = document['resources']['users']
+        document['resources'] = {'users': {
+            'methods': {name: users['methods'][name] for name in cls.USED_METHODS['users']},
+            'resources': {
+                resource: {'methods': {name: users['resources'][resource]['methods'][name] for name in methods}}
+                for resource, methods in cls.USED_METHODS.items() if resource != 'users'
+            },
+        }}
+        return document
+
+    def _authenticate(self) -> 'Credentials':
         """
         Manages user authentication and returns valid credentials.
         Creates or refreshes token.json if necessary.
         """
+        from google.oauth2.credentials import Credentials
+
         creds = None
         if os.path.exists('token.json'):
             creds = Credentials.from_authorized_user_file('token.json', self.scopes)
 
         if not creds or not creds.valid:
             if creds and creds.expired and creds.refresh_token:
+                from google.auth.transport.requests import Request
                 creds.refresh(Request())
             else:
+                from google_auth_oauthlib.flow import InstalledAppFlow
                 flow = InstalledAppFlow.from_client_secrets_file(
                     'credentials.json', self.scopes)
                 creds = flow.run_local_server(port=0)
@@ -49,29 +185,228 @@ class GmailChecker:
             query (str): The search query for the Gmail API (e.g., 'is:unread').
 
         Returns:
-            list: A list of email data dictionaries.
+            list: A list of email data dictionaries, newest first.
         """
         try:
-            result = self.service.users().messages().list(userId='me', q=query).execute()
-            messages_raw = result.get('messages', [])
+            msg_ids = self.list_message_ids(query)
+            return list(self.iter_emails(msg_ids))
 
-            if not messages_raw:
-                return []
+        except HttpError as error:
+            print(f'An error occurred while fetching emails: {error}')
+            return []
 
-            emails = []
-            for msg_ref in messages_raw:
-                msg_id = msg_ref['id']
-                full_msg = self.service.users().messages().get(userId='me', id=msg_id).execute()
+    def iter_new_emails(self, query: str, skip: Callable[[str], bool] | None = None) -> EmailFetch:
+        """
+        Returns an iterator over the emails matching a query from old to new, as they are downloaded.
 
-                # Parse the email details
-                email_data = self._parse_email_details(full_msg)
-                emails.append(email_data)
+        Every result page is followed. The message IDs are listed (and filtered with
+        `skip`) when this method is called; the messages themselves are fetched one
+        batch at a time while the caller consumes the iterator, so processing can start
+        before the last batch has arrived. The iterator may be consumed on another thread.
 
-            return emails
+        Args:
+            query (str): The search query for the Gmail API (e.g., 'is:unread').
+            skip (Callable, optional): Returns True for message IDs that must not be
+                downloaded, e.g. because they were already processed.
 
+        Returns:
+            EmailFetch: The email data dictionaries; incomplete if the search failed.
+        """
+        try:
+            msg_ids = self.list_message_ids(query)
         except HttpError as error:
             print(f'An error occurred while fetching emails: {error}')
-            return []
+            return EmailFetch(None, [])
+        return self.iter_emails(reversed(msg_ids), skip=skip)
+
+    def list_message_ids(self, query: str) -> list:
+        """Follows every page of messages().list() and returns the matching message IDs, newest first."""
+        msg_ids = []
+        page_token = None
+        while True:
+            result = self._execute(self.service.users().messages().list(
+                userId='me', q=query, maxResults=self.LIST_PAGE_SIZE, pageToken=page_token), 'messages.list')
+            msg_ids.extend(msg_ref['id'] for msg_ref in result.get('messages', []))
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                return msg_ids
+
+    def get_current_history_id(self) -> str:
+        """Returns the current historyId of the mailbox, the starting point for incremental syncs."""
+        profile = self._execute(self.service.users().getProfile(userId='me'), 'getProfile')
+        return profile['historyId']
+
+    def sync_new_emails(self, query: str, history_id: str | None) -> tuple[list, str | None]:
+        """
+        Fetches the emails added since `history_id` using the Gmail history API.
+
+        Without a stored history_id, or when Gmail no longer has the history for it
+        (it is typically kept for about a week), this falls back to a full search with `query`.
+
+        Args:
+            query (str): The search query used for the full sync fallback.
+            history_id (str | None): The historyId checkpoint of the previous sync.
+
+        Returns:
+            tuple: A list of email data dictionaries (newest first, like get_new_emails)
+                   and the historyId to store as the next checkpoint.
+        """
+        msg_ids, new_history_id = self.sync_message_ids(query, history_id)
+        return list(self.iter_emails(msg_ids)), new_history_id
+
+    def sync_message_ids(self, query: str, history_id: str | None) -> tuple[list, str | None]:
+        """
+        The ID-only part of sync_new_emails, for callers that stream the messages with iter_emails.
+
+        Returns:
+            tuple: The message IDs added since `history_id` (newest first)
+                   and the historyId to store as the next checkpoint, or None if the sync failed.
+        """
+        if history_id:
+            try:
+                return self._get_history_message_ids(history_id, query)
+            except HttpError as error:
+                if error.resp.status != 404:
+                    print(f'An error occurred while fetching the mailbox history: {error}')
+                    return [], None
+                print(f"History for historyId {history_id} has expired. Falling back to a full query.")
+
+        try:
+            # Read the checkpoint before searching, so mail arriving during the search is not missed.
+            new_history_id = self.get_current_history_id()
+            return self.list_message_ids(query), new_history_id
+        except HttpError as error:
+            print(f'An error occurred while fetching emails: {error}')
+            return [], None
+
+    def _get_history_message_ids(self, start_history_id: str, query: str | None = None) -> tuple[list, str]:
+        """
+        Follows all pages of history().list() and collects the IDs of the added messages.
+
+        The history contains every message added to the mailbox, not only the MEXC ones.
+        With a `query`, the IDs are narrowed to the messages matching it, with one
+        messages().list() search, so unrelated mail is never downloaded or analyzed.
+
+        Returns:
+            tuple: The message IDs (newest first) and the latest historyId of the mailbox.
+        """
+        msg_ids = []
+        latest_history_id = start_history_id
+        page_token = None
+        while True:
+            result = self._execute(self.service.users().history().list(
+                userId='me', startHistoryId=start_history_id, historyTypes=['messageAdded'],
+                pageToken=page_token), 'history.list')
+            for record in result.get('history', []):
+                for added in record.get('messagesAdded', []):
+                    msg_ids.append(added['message']['id'])
+            latest_history_id = result.get('historyId', latest_history_id)
+            page_token = result.get('nextPageToken')
+            if not page_token:
+                break
+
+        # History records are oldest first; keep the order of messages().list(), which is newest first.
+        msg_ids = list(dict.fromkeys(reversed(msg_ids)))
+        if msg_ids and query:
+            # Searched after reading the history, so it also covers the messages added meanwhile
+            matching = set(self.list_message_ids(query))
+            msg_ids = [msg_id for msg_id in msg_ids if msg_id in matching]
+        return msg_ids, latest_history_id
+
+    def iter_emails(self, msg_ids: Iterable[str], skip: Callable[[str], bool] | None = None) -> EmailFetch:
+        """
+        Returns an iterator that fetches and parses the given messages in order, one batch at a time.
+        Message IDs for which `skip` returns True are filtered out right away and never downloaded.
+        """
+        msg_ids = [msg_id for msg_id in msg_ids if not (skip and skip(msg_id))]
+        return EmailFetch(self, msg_ids)
+
+    def _fetch_emails(self, msg_ids: list, fetch: EmailFetch) -> Iterator[dict]:
+        """
+        The generator behind iter_emails. A request error is reported and ends the iteration;
+        it and every message left out of a batch mark the fetch as incomplete.
+        """
+        try:
+            for start in range(0, len(msg_ids), self.batch_size):
+                chunk_ids = msg_ids[start:start + self.batch_size]
+                if self.batch_size > 1:
+                    full_messages = self._get_messages_batched(chunk_ids)
+                else:
+                    full_messages = []
+                    for msg_id in chunk_ids:
+                        full_messages.append(self._execute(self._get_message_request(msg_id), 'messages.get'))
+                if len(full_messages) < len(chunk_ids):
+                    fetch.complete = False
+
+                # Parse the email details
+                for full_msg in full_messages:
+                    yield self._parse_email_details(full_msg)
+
+        except HttpError as error:
+            fetch.complete = False
+            print(f'An error occurred while fetching emails: {error}')
+
+    def _get_messages_batched(self, msg_ids: list) -> list:
+        """
+        Fetches full messages in Gmail batch requests of at most `batch_size` calls.
+
+        The results are returned in the same order as `msg_ids`. Calls that are throttled
+        inside a batch are retried in a new batch after a backoff. A message that fails
+        otherwise is reported and left out, without failing the rest of the batch.
+        """
+        limiter = self.rate_limiter
+        results = [None] * len(msg_ids)
+        pending = list(range(len(msg_ids)))
+        attempt = 0
+
+        def on_response(request_id, response, exception):
+            index = int(request_id)
+            if exception is not None:
+                if limiter.is_retryable(exception) and attempt < limiter.max_retries:
+                    retry.append(index)
+                    return
+                print(f'An error occurred while fetching message {msg_ids[index]}: {exception}')
+                return
+            results[index] = response
+
+        while pending:
+            retry = []
+            for start in range(0, len(pending), self.batch_size):
+                chunk = pending[start:start + self.batch_size]
+                batch = self.service.new_batch_http_request(callback=on_response)
+                for index in chunk:
+                    batch.add(self._get_message_request(msg_ids[index]), request_id=str(index))
+                # Every call inside a batch counts against the quota on its own
+                self._execute(batch, 'messages.get', len(chunk))
+            if retry:
+                limiter.record_throttle()
+                limiter.record_retry(len(retry))
+                time.sleep(limiter.backoff_delay(attempt))
+                attempt += 1
+            pending = sorted(retry)
+
+        return [message for message in results if message is not None]
+
+    def _get_message_request(self, msg_id: str):
+        """Builds the messages().get() request, restricted to the metadata if the body is loaded lazily."""
+        messages = self.service.users().messages()
+        if self.lazy_body:
+            return messages.get(userId='me', id=msg_id, format='metadata',
+                                metadataHeaders=self.METADATA_HEADERS, fields=self.METADATA_FIELDS)
+        return messages.get(userId='me', id=msg_id)
+
+    def get_email_body(self, msg_id: str) -> str | None:
+        """
+        Downloads and decodes only the plain text body of a message. Returns None if the
+        download failed, so the caller can tell it from an empty body and retry the email.
+        """
+        try:
+            message = self._execute(self.service.users().messages().get(
+                userId='me', id=msg_id, format='full', fields=self.BODY_FIELDS), 'messages.get')
+            return self._get_email_body(message['payload'])
+        except HttpError as error:
+            print(f'An error occurred while fetching the body of message {msg_id}: {error}')
+            return None
 
     @staticmethod
     def _get_email_body(payload: dict) -> str:
@@ -99,6 +434,7 @@ class GmailChecker:
         sender = "Unknown sender"
         date_str = ""
         timestamp = 0
+        message_id = None
 
         for header in headers:
             name = header['name'].lower()
@@ -108,22 +444,30 @@ class GmailChecker:
                 sender = header['value']
             if name == 'date':
                 date_str = header['value']
+            if name == 'message-id':
+                message_id = header['value'].strip()
 
         # Convert the date string to a universal Unix timestamp
         if date_str:
             dt_object = parsedate_to_datetime(date_str)
             timestamp = int(dt_object.timestamp())
 
-        # Now also get the body
-        body = self._get_email_body(payload)
-
-        return {
+        email_data = {
             "id": message['id'],
             "sender": sender,
             "subject": subject,
             "snippet": message['snippet'],
             "labels": message.get('labelIds', []),
             "date": date_str,
-            "body": body,
-            "timestamp": timestamp
-        }
\ No newline at end of file
+            "timestamp": timestamp,
+            # Also recorded in the ledger, so an archive import of the same email is recognized
+            "message_id": message_id
+        }
+
+        if self.lazy_body:
+            msg_id = message['id']
+            return LazyBodyEmail(email_data, lambda: self.get_email_body(msg_id))
+
+        # Now also get the body
+        email_data["body"] = self._get_email_body(payload)
+        return email_data
\ No newline at end of file
@@ -0,0 +1,191 @@
+# src/gmail_rate_limiter.py
+
+import random
+import threading
+import time
+from googleapiclient.errors import HttpError
+
+
+class GmailRateLimiter:
+    """
+    Executes Gmail API requests within the quota, with retries and adaptive concurrency.
+
+    - Quota: Gmail does not limit the number of calls but the quota units they cost, per
+      user and per second (e.g. 5 units for a messages().get(), 2 for a history().list()).
+      A thread-safe token bucket books the units of every call before it is sent.
+    - Retries: throttling (429, 403 rateLimitExceeded) and server errors (5xx) are retried
+      with jittered exponential backoff, honoring a Retry-After header.
+    - Concurrency: the number of requests in flight is limited with AIMD. Every success
+      raises the limit a little, every throttling response halves it.
+
+    One limiter is shared by every GmailChecker working for the same account, so
+    parallel fetches together stay below the per-user limit.
+    """
+    # Quota units per call, from the Gmail API usage limits
+    QUOTA_UNITS = {
+        'messages.list': 5,
+        'messages.get': 5,
+        'history.list': 2,
+        'getProfile': 1,
+    }
+    DEFAULT_QUOTA_UNITS = 5
+    # Gmail's per-user limit is 250 quota units per second (moving average)
+    DEFAULT_UNITS_PER_SECOND = 250
+    DEFAULT_MAX_CONCURRENCY = 8
+    DEFAULT_MAX_RETRIES = 5
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 32.0
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, units_per_second: float | None = DEFAULT_UNITS_PER_SECOND, burst: float | None = None,
+                 max_concurrency: int = DEFAULT_MAX_CONCURRENCY, max_retries: int = DEFAULT_MAX_RETRIES):
+        # units_per_second=None disables the quota accounting, e.g. for stubbed services
+        self.units_per_second = units_per_second
+        self.capacity = burst or units_per_second
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        # AIMD state; the limit is a float so the additive increase can be spread over many calls
+        self.slots = threading.Condition()
+        self.concurrency_limit = float(self.max_concurrency)
+        self.in_flight = 0
+        self.last_decrease_at = 0.0
+
+        self.units_used: dict[str, int] = {}
+        self.calls: dict[str, int] = {}
+        self.wait_seconds = 0.0
+        self.retries = 0
+        self.throttled = 0
+        self.min_concurrency_seen = self.max_concurrency
+
+    def acquire(self, method: str, count: int = 1):
+        """
+        Blocks until `count` calls of `method` fit into the quota, then books their units.
+
+        A request that costs more than the bucket holds (e.g. a batch of 100 messages().get()
+        calls) waits for a full bucket and leaves it in debt, which delays the next callers.
+        """
+        units = self.QUOTA_UNITS.get(method, self.DEFAULT_QUOTA_UNITS) * count
+        while True:
+            with self.lock:
+                if self.units_per_second is None:
+                    wait = 0.0
+                else:
+                    now = time.monotonic()
+                    self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.units_per_second)
+                    self.updated_at = now
+                    needed = min(units, self.capacity)
+                    wait = 0.0 if self.tokens >= needed else (needed - self.tokens) / self.units_per_second
+                if wait == 0.0:
+                    if self.units_per_second is not None:
+                        self.tokens -= units
+                    self.units_used[method] = self.units_used.get(method, 0) + units
+                    self.calls[method] = self.calls.get(method, 0) + count
+                    return
+                self.wait_seconds += wait
+            time.sleep(wait)
+
+    def execute(self, request, method: str, count: int = 1):
+        """
+        Executes a request (or a batch of `count` calls) within the quota and the concurrency
+        limit, retrying transient errors. Raises the last HttpError once the retries are used up.
+        """
+        attempt = 0
+        while True:
+            self.acquire(method, count)
+            self._enter_slot()
+            try:
+                result = request.execute()
+            except HttpError as error:
+                if not self.is_retryable(error) or attempt >= self.max_retries:
+                    raise
+                self.record_throttle(error)
+                delay = self.backoff_delay(attempt, self._retry_after(error))
+            except (ConnectionError, TimeoutError) as error:
+                if attempt >= self.max_retries:
+                    raise
+                print(f"   -> Gmail connection error ({error}), retrying.")
+                delay = self.backoff_delay(attempt)
+            else:
+                self.record_success()
+                return result
+            finally:
+                self._leave_slot()
+            self.record_retry()
+            attempt += 1
+            time.sleep(delay)
+
+    @classmethod
+    def is_retryable(cls, error: Exception) -> bool:
+        """Checks whether an error is transient: throttling or a server error."""
+        if not isinstance(error, HttpError):
+            return False
+        status = error.resp.status
+        if status in cls.RETRYABLE_STATUSES:
+            return True
+        # Gmail reports exceeded quotas as 403 with the reason rateLimitExceeded or userRateLimitExceeded
+        return status == 403 and b'ratelimitexceeded' in (error.content or b'').lower()
+
+    def backoff_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff, but never shorter than the server's Retry-After."""
+        delay = random.uniform(0, min(self.BACKOFF_MAX_SECONDS, self.BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+    @staticmethod
+    def _retry_after(error: HttpError) -> float | None:
+        try:
+            return float(error.resp.get('retry-after'))
+        except (TypeError, ValueError):
+            return None
+
+    def record_retry(self, count: int = 1):
+        """Counts calls that are sent again, including the throttled calls of a batch."""
+        with self.lock:
+            self.retries += count
+
+    def record_success(self):
+        """Additive increase: about one extra slot per `concurrency_limit` successful calls."""
+        with self.slots:
+            self.concurrency_limit = min(self.max_concurrency, self.concurrency_limit + 1 / self.concurrency_limit)
+            self.slots.notify_all()
+
+    def record_throttle(self, error: Exception | None = None):
+        """
+        Multiplicative decrease: halves the concurrency limit. Throttling responses to a
+        burst of requests that were already in flight only count once.
+        """
+        now = time.monotonic()
+        with self.slots:
+            self.throttled += 1
+            if now - self.last_decrease_at >= self.BACKOFF_BASE_SECONDS:
+                self.concurrency_limit = max(1.0, self.concurrency_limit / 2)
+                self.min_concurrency_seen = min(self.min_concurrency_seen, int(self.concurrency_limit))
+                self.last_decrease_at = now
+        status = f" {error.resp.status}" if isinstance(error, HttpError) else ""
+        print(f"   -> Gmail request throttled or failed{status}, backing off. "
+              f"Concurrency limit is now {int(self.concurrency_limit)}.")
+
+    def _enter_slot(self):
+        with self.slots:
+            while self.in_flight >= int(self.concurrency_limit):
+                self.slots.wait()
+            self.in_flight += 1
+
+    def _leave_slot(self):
+        with self.slots:
+            self.in_flight -= 1
+            self.slots.notify()
+
+    def format_stats(self) -> str:
+        """Formats the quota units used per method, the waiting time, retries and throttling."""
+        limit = "unlimited" if self.units_per_second is None else f"limit {self.units_per_second:g} units/s"
+        lines = [f"Gmail quota usage ({limit}, {self.wait_seconds:.2f}s spent waiting):"]
+        for method, units in sorted(self.units_used.items()):
+            lines.append(f"   -> {method}: {self.calls[method]} call(s), {units} units")
+        lines.append(f"   -> {self.retries} retry(s), {self.throttled} throttling response(s), concurrency limit "
+                     f"{int(self.concurrency_limit)}/{self.max_concurrency} (lowest {self.min_concurrency_seen})")
+        return "\n".join(lines)
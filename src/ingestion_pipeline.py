@@ -0,0 +1,219 @@
+# src/ingestion_pipeline.py
+
+import asyncio
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable
+from .analyzer import Analyze
+from .database_manager import UnitOfWork
+from .parser_registry import ParserRegistry
+
+# Marks the end of the stream in a queue
+_DONE = object()
+# Marks the end of a fetch batch in the parse stage's queue
+_BATCH_END = object()
+
+
+class StageStats:
+    """Throughput and output queue depth counters for one pipeline stage."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.max_queue_depth = 0
+        self.queue_depth_total = 0
+        self.queue_samples = 0
+
+    def record(self, seconds: float, items: int = 1):
+        self.items += items
+        self.busy_seconds += seconds
+
+    def sample_queue(self, queue: asyncio.Queue):
+        depth = queue.qsize()
+        self.max_queue_depth = max(self.max_queue_depth, depth)
+        self.queue_depth_total += depth
+        self.queue_samples += 1
+
+    def format(self, elapsed: float) -> str:
+        rate = self.items / self.busy_seconds if self.busy_seconds else 0.0
+        utilization = self.busy_seconds / elapsed if elapsed else 0.0
+        line = (f"   -> {self.name:<6} {self.items:>6} items, {rate:>9.1f} items/s busy, "
+                f"{utilization:>6.1%} of wall time")
+        if self.queue_samples:
+            line += (f", output queue avg {self.queue_depth_total / self.queue_samples:.1f} "
+                     f"/ max {self.max_queue_depth}")
+        return line
+
+
+class IngestionPipeline:
+    """
+    Runs email ingestion as three asyncio stages connected by bounded queues:
+
+    - fetch: pulls emails from a (blocking) GmailChecker iterator on a worker thread,
+      `batch_size` emails (one Gmail batch) at a time.
+    - parse: runs the regex fast path. The regex failures of a fetch batch go to the
+      batched LLM extraction together, like in Analyze.process_batch(), on a thread pool,
+      so the requests of several batches can be in flight at once. Their lazily loaded
+      bodies are downloaded on the fetch thread first: the Gmail client is not thread-safe.
+    - write: a single writer that applies the emails strictly in arrival order through
+      the unit of work, which commits every `commit_every` emails and at the end of the
+      run. To bound the latency of a slow stream, the writer also commits pending emails
+      once the last commit is `commit_interval` seconds old, and before it waits for the
+      LLM, so the write lock is never held while it idles.
+
+    The parse stage hands the writer one future per email in arrival order (the emails
+    of a group share the future of its LLM request), and the writer awaits them in that
+    order. An open is therefore always applied before its matching close, even when the
+    LLM finishes the groups out of order.
+    """
+
+    def __init__(self, unit_of_work: UnitOfWork, registry: ParserRegistry | None = None,
+                 queue_size: int = 100, llm_workers: int = 4, commit_interval: float = 1.0,
+                 batch_size: int = 50):
+        self.unit_of_work = unit_of_work
+        self.registry = registry
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.llm_workers = llm_workers
+        self.commit_interval = commit_interval
+        self.stats = {name: StageStats(name) for name in ('fetch', 'parse', 'llm', 'write')}
+        self.elapsed = 0.0
+
+    def run(self, emails: Iterable[dict]) -> tuple[int, int | None]:
+        """
+        Ingests all emails of the iterable.
+
+        Returns:
+            tuple: The number of processed emails and the timestamp of the oldest email
+                   that has to be retried (None if there is none).
+        """
+        start = time.perf_counter()
+        try:
+            return asyncio.run(self._run(emails))
+        finally:
+            self.elapsed = time.perf_counter() - start
+
+    async def _run(self, emails: Iterable[dict]) -> tuple[int, int | None]:
+        fetch_queue = asyncio.Queue(self.queue_size)
+        write_queue = asyncio.Queue(self.queue_size)
+        with ThreadPoolExecutor(1, thread_name_prefix='gmail-fetch') as fetch_pool, \
+                ThreadPoolExecutor(self.llm_workers, thread_name_prefix='llm') as llm_pool:
+            _, _, result = await asyncio.gather(
+                self._fetch_stage(emails, fetch_queue, fetch_pool),
+                self._parse_stage(fetch_queue, write_queue, fetch_pool, llm_pool),
+                self._write_stage(write_queue),
+            )
+        return result
+
+    async def _fetch_stage(self, emails: Iterable[dict], out_queue: asyncio.Queue, pool: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        iterator = iter(emails)
+        stats = self.stats['fetch']
+        while True:
+            start = time.perf_counter()
+            batch = await loop.run_in_executor(pool, list, islice(iterator, self.batch_size))
+            if not batch:
+                break
+            stats.record(time.perf_counter() - start, len(batch))
+            for email in batch:
+                await out_queue.put(email)
+                stats.sample_queue(out_queue)
+            await out_queue.put(_BATCH_END)
+        await out_queue.put(_DONE)
+
+    async def _parse_stage(self, in_queue: asyncio.Queue, out_queue: asyncio.Queue, fetch_pool: ThreadPoolExecutor,
+                           llm_pool: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        stats = self.stats['parse']
+        parsed = loop.create_future()
+        parsed.set_result(None)
+        # The emails since the first regex failure of the batch, which have to wait for its LLM request
+        held: list[Analyze] = []
+        failures: list[Analyze] = []
+        while (email := await in_queue.get()) is not _DONE:
+            if email is _BATCH_END:
+                if failures:
+                    await self._release(held, failures, out_queue, fetch_pool, llm_pool)
+                    held, failures = [], []
+                continue
+            start = time.perf_counter()
+            analyzer = Analyze(email_data=email, unit_of_work=self.unit_of_work, registry=self.registry)
+            if not analyzer.parse():
+                failures.append(analyzer)
+            stats.record(time.perf_counter() - start)
+            if failures:
+                held.append(analyzer)
+            else:
+                await out_queue.put((analyzer, parsed))
+                stats.sample_queue(out_queue)
+        await out_queue.put(_DONE)
+
+    async def _release(self, held: list[Analyze], failures: list[Analyze], out_queue: asyncio.Queue,
+                       fetch_pool: ThreadPoolExecutor, llm_pool: ThreadPoolExecutor):
+        """Starts the LLM request of a group and hands its held emails to the writer."""
+        future = asyncio.ensure_future(self._extract_with_llm(failures, fetch_pool, llm_pool))
+        for analyzer in held:
+            await out_queue.put((analyzer, future))
+            self.stats['parse'].sample_queue(out_queue)
+
+    async def _extract_with_llm(self, analyzers: list[Analyze], fetch_pool: ThreadPoolExecutor,
+                                llm_pool: ThreadPoolExecutor):
+        loop = asyncio.get_running_loop()
+        # A LazyBodyEmail downloads its body through the checker of the fetch thread, so it is read there
+        await loop.run_in_executor(fetch_pool, self._load_bodies, analyzers)
+        await loop.run_in_executor(llm_pool, self._run_llm, analyzers)
+
+    @staticmethod
+    def _load_bodies(analyzers: list[Analyze]):
+        """Runs on the fetch thread."""
+        for analyzer in analyzers:
+            analyzer.email['body']
+
+    def _run_llm(self, analyzers: list[Analyze]):
+        """Runs on the LLM thread pool."""
+        start = time.perf_counter()
+        Analyze.extract_batch_with_llm(analyzers)
+        self.stats['llm'].record(time.perf_counter() - start, len(analyzers))
+
+    async def _write_stage(self, in_queue: asyncio.Queue) -> tuple[int, int | None]:
+        stats = self.stats['write']
+        processed = 0
+        retry_from = None
+        # Rolling back on an error is left to the caller's `with` block of the unit of work
+        while (item := await self._next_item(in_queue)) is not _DONE:
+            analyzer, future = item
+            if not future.done():
+                # Do not hold the write lock while waiting for the LLM
+                self.unit_of_work.commit()
+            # Wait for this email's LLM result before touching any later email
+            await future
+            start = time.perf_counter()
+            if not analyzer.apply() and retry_from is None:
+                retry_from = analyzer.email['timestamp']
+            processed += 1
+            if self._commit_due() <= 0:
+                self.unit_of_work.commit()
+            stats.record(time.perf_counter() - start)
+        self.unit_of_work.commit()
+        return processed, retry_from
+
+    async def _next_item(self, in_queue: asyncio.Queue):
+        """Waits for the next item; pending emails are committed when it takes until the commit is due."""
+        if self.unit_of_work.pending and in_queue.empty():
+            try:
+                return await asyncio.wait_for(in_queue.get(), max(self._commit_due(), 0.0))
+            except asyncio.TimeoutError:
+                self.unit_of_work.commit()
+        return await in_queue.get()
+
+    def _commit_due(self) -> float:
+        """Seconds until the pending emails are committed for the commit_interval."""
+        return self.unit_of_work.committed_at + self.commit_interval - time.monotonic()
+
+    def format_stats(self) -> str:
+        """Formats the per-stage throughput and queue depths of the last run."""
+        lines = [f"Ingestion pipeline stats ({self.elapsed:.2f}s wall time):"]
+        lines.extend(stats.format(self.elapsed) for stats in self.stats.values())
+        return "\n".join(lines)
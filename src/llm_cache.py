@@ -0,0 +1,90 @@
+# src/llm_cache.py
+
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+
+
+class LLMCache:
+    """
+    A persistent SQLite cache for LLM extraction results.
+
+    Entries are keyed by a hash of the normalized email body and the prompt version,
+    so a changed prompt never returns results produced by an older one. Entries expire
+    after `ttl_seconds`, and the least recently used entries are evicted once the cache
+    holds more than `max_entries`.
+    """
+    DEFAULT_TTL_SECONDS = 30 * 86400
+    DEFAULT_MAX_ENTRIES = 5000
+
+    def __init__(self, db_file: str = "llm_cache.db", ttl_seconds: int = DEFAULT_TTL_SECONDS,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        # The extractor can be called from worker threads, so access is serialized with a lock
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS llm_cache (
+                cache_key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                created_at INTEGER NOT NULL,
+                last_used_at INTEGER NOT NULL
+            )
+        """)
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used_at)")
+        self.conn.commit()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapses whitespace, so re-wrapped or re-encoded copies of an email share one entry."""
+        return re.sub(r"\s+", " ", text or "").strip()
+
+    @classmethod
+    def make_key(cls, email_body: str, prompt_version: str) -> str:
+        """Builds the cache key for an email body and a prompt version."""
+        payload = f"{prompt_version}\0{cls.normalize(email_body)}"
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, cache_key: str) -> dict | None:
+        """Returns the cached result, or None if it is missing or expired."""
+        now = int(time.time())
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT response, created_at FROM llm_cache WHERE cache_key = ?", (cache_key,)).fetchone()
+            if row is None:
+                return None
+            response, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self.conn.execute("DELETE FROM llm_cache WHERE cache_key = ?", (cache_key,))
+                self.conn.commit()
+                return None
+            self.conn.execute("UPDATE llm_cache SET last_used_at = ? WHERE cache_key = ?", (now, cache_key))
+            self.conn.commit()
+        return json.loads(response)
+
+    def set(self, cache_key: str, data: dict):
+        """Stores a result, then drops expired entries and evicts the least recently used ones."""
+        now = int(time.time())
+        with self.lock:
+            self.conn.execute(
+                """INSERT OR REPLACE INTO llm_cache (cache_key, response, created_at, last_used_at)
+                   VALUES (?, ?, ?, ?)""",
+                (cache_key, json.dumps(data), now, now)
+            )
+            self.conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.ttl_seconds,))
+            self.conn.execute(
+                """DELETE FROM llm_cache WHERE cache_key IN (
+                       SELECT cache_key FROM llm_cache ORDER BY last_used_at DESC LIMIT -1 OFFSET ?
+                   )""",
+                (self.max_entries,)
+            )
+            self.conn.commit()
+
+    def close(self):
+        """Closes the cache database connection."""
+        with self.lock:
+            self.conn.close()
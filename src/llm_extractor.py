@@ -2,24 +2,78 @@
 
 import os
 import json
-from openai import OpenAI
+import threading
+from .llm_cache import LLMCache
+
+
+class LLMUnavailableError(Exception):
+    """
+    The LLM could not be reached (network, timeout, rate limit, server or authentication
+    error), so the emails have to be retried later. `results` holds the extractions of a
+    batch that were finished before the error.
+    """
+
+    def __init__(self, message: str, results: dict | None = None):
+        super().__init__(message)
+        self.results = results or {}
 
 
 class LLMDataExtractor:
     """
     Uses an LLM (like GPT) as a fallback to extract trade data from an email text.
     """
+    MODEL = "gpt-5-nano"
+    # Bump this whenever the prompt or model changes, so cached results of the old prompt are not reused.
+    PROMPT_VERSION = "1"
+    # The same for the prompt of the batched requests, which is cached under its own keys
+    BATCH_PROMPT_VERSION = "1"
+    REQUIRED_KEYS = ["crypto_pair", "direction", "trader", "entry_price"]
+    SYSTEM_PROMPT = "You are a highly accurate data extraction assistant that only responds in JSON format."
+    # Maximum number of emails sent to the LLM in one batched request
+    MAX_BATCH_SIZE = 20
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
 
-    def __init__(self):
+    def __init__(self, cache: LLMCache | None = None):
         api_key = os.getenv("OPENAI_API_KEY")
         if not api_key:
             raise ValueError("OPENAI_API_KEY is not set in the .env file.")
+        # Imported here: the OpenAI SDK is slow to import and only needed when the LLM fallback fires
+        from openai import OpenAI
         self.client = OpenAI(api_key=api_key)
+        self.cache = cache
+
+    @classmethod
+    def shared(cls) -> 'LLMDataExtractor':
+        """
+        Returns one extractor per process, so the OpenAI client and the cache are reused
+        for every fallback email. The cache file is set with LLM_CACHE_FILE.
+
+        Raises:
+            ValueError: If OPENAI_API_KEY is not set.
+        """
+        # The pipeline's LLM workers may ask for it at the same time
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                cache = LLMCache(os.getenv("LLM_CACHE_FILE", "llm_cache.db"))
+                cls._shared_instance = cls(cache=cache)
+            return cls._shared_instance
 
     def extract_trade_data(self, email_body: str) -> dict | None:
         """
         Now also asks the LLM for the entry_price.
+        Results are served from the cache when the same email was extracted before.
+        Returns None if the LLM's answer holds no usable data.
+
+        Raises:
+            LLMUnavailableError: If the API could not be reached; the email is worth a retry.
         """
+        cached = self._get_cached(email_body)
+        if cached is not None:
+            print(f"   -> LLM Cache hit: {cached}")
+            return cached
+
         prompt = f"""
         Analyze the following email text from MEXC. Extract the cryptocurrency pair, the trade direction (LONG or SHORT), the trader's name, and the entry price.
         Respond ONLY with a valid JSON object with the keys "crypto_pair", "direction", "trader", and "entry_price".
@@ -35,21 +89,28 @@ class LLMDataExtractor:
         try:
             print("   -> LLM Fallback: Calling OpenAI API...")
             response = self.client.chat.completions.create(
-                model="gpt-5-nano",
+                model=self.MODEL,
                 messages=[
-                    {"role": "system",
-                     "content": "You are a highly accurate data extraction assistant that only responds in JSON format."},
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
                     {"role": "user", "content": prompt}
                 ],
                 response_format={"type": "json_object"}
             )
+        except Exception as e:
+            if self._is_transient(e):
+                print(f"   -> LLM Error: The API is unavailable: {e}")
+                raise LLMUnavailableError(str(e)) from e
+            print(f"   -> LLM Error: An unexpected error occurred: {e}")
+            return None
 
+        try:
             content = response.choices[0].message.content
             data = json.loads(content)
 
             # Validate if 'entry_price' is also present.
-            if all(key in data for key in ["crypto_pair", "direction", "trader", "entry_price"]):
+            if all(key in data for key in self.REQUIRED_KEYS):
                 print(f"   -> LLM Success: Data successfully extracted: {data}")
+                self._set_cached(email_body, data)
                 return data
             else:
                 print(f"   -> LLM Error: The JSON from the API is missing required keys. Received: {data.keys()}")
@@ -57,4 +118,132 @@ class LLMDataExtractor:
 
         except Exception as e:
             print(f"   -> LLM Error: An unexpected error occurred: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def extract_trade_data_batch(self, email_bodies: dict[str, str]) -> dict[str, dict | None]:
+        """
+        Extracts the trade data of several emails with as few API calls as possible.
+
+        Cached emails are answered from the cache. The rest are sent in requests of at
+        most MAX_BATCH_SIZE emails that return a JSON array keyed by message ID. Every
+        item is validated on its own; emails whose item is missing or invalid, or whose
+        whole request failed, fall back to a single extract_trade_data() call.
+
+        Args:
+            email_bodies (dict): The email body per message ID.
+
+        Returns:
+            dict: The extracted data (or None) per message ID.
+
+        Raises:
+            LLMUnavailableError: If the API could not be reached, with the results so far.
+        """
+        results = {}
+        uncached = {}
+        for message_id, email_body in email_bodies.items():
+            # A result of the single-email prompt is as good as one of the batch prompt
+            cached = self._get_cached(email_body, batch=True)
+            if cached is None:
+                cached = self._get_cached(email_body)
+            if cached is not None:
+                results[message_id] = cached
+            else:
+                uncached[message_id] = email_body
+        if results:
+            print(f"   -> LLM Cache hit for {len(results)} email(s).")
+
+        message_ids = list(uncached)
+        try:
+            for start in range(0, len(message_ids), self.MAX_BATCH_SIZE):
+                chunk = {message_id: uncached[message_id]
+                         for message_id in message_ids[start:start + self.MAX_BATCH_SIZE]}
+                results.update(self._extract_chunk(chunk))
+
+            # Partial failures: retry the missing emails one by one
+            for message_id in message_ids:
+                if results.get(message_id) is None:
+                    print(f"   -> LLM Batch: No valid result for message {message_id}, retrying it on its own...")
+                    results[message_id] = self.extract_trade_data(uncached[message_id])
+        except LLMUnavailableError as e:
+            raise LLMUnavailableError(str(e), results={message_id: data for message_id, data in results.items()
+                                                       if data is not None}) from e
+        return results
+
+    def _extract_chunk(self, email_bodies: dict[str, str]) -> dict[str, dict]:
+        """Sends one batched request and returns the valid items per message ID."""
+        emails_text = "\n".join(
+            f"Message ID: {message_id}\n---\n{email_body}\n---" for message_id, email_body in email_bodies.items())
+        prompt = f"""
+        Analyze each of the following email texts from MEXC. For every email, extract the cryptocurrency pair, the trade direction (LONG or SHORT), the trader's name, and the entry price.
+        Respond ONLY with a valid JSON object with a single key "trades", holding an array with one object per email.
+        Each object must have the keys "message_id", "crypto_pair", "direction", "trader", and "entry_price".
+        The value for "message_id" must be copied exactly from the email. The value for "entry_price" must be a number (use a period as the decimal separator), not a string.
+        Do not provide any extra explanation or text.
+
+        {emails_text}
+        """
+
+        try:
+            print(f"   -> LLM Fallback: Calling OpenAI API for a batch of {len(email_bodies)} email(s)...")
+            response = self.client.chat.completions.create(
+                model=self.MODEL,
+                messages=[
+                    {"role": "system", "content": self.SYSTEM_PROMPT},
+                    {"role": "user", "content": prompt}
+                ],
+                response_format={"type": "json_object"}
+            )
+            items = json.loads(response.choices[0].message.content).get("trades", [])
+        except Exception as e:
+            if self._is_transient(e):
+                print(f"   -> LLM Error: The API is unavailable: {e}")
+                raise LLMUnavailableError(str(e)) from e
+            print(f"   -> LLM Error: The batched request failed: {e}")
+            return {}
+
+        results = {}
+        for item in items if isinstance(items, list) else []:
+            if not isinstance(item, dict):
+                continue
+            message_id = str(item.pop("message_id", ""))
+            if message_id not in email_bodies or not self._is_valid(item):
+                print(f"   -> LLM Batch: Ignoring an invalid item: {item}")
+                continue
+            results[message_id] = item
+            self._set_cached(email_bodies[message_id], item, batch=True)
+        print(f"   -> LLM Batch: {len(results)} of {len(email_bodies)} email(s) extracted.")
+        return results
+
+    @staticmethod
+    def _is_transient(error: Exception) -> bool:
+        """Whether an API error is worth a retry later, as opposed to an answer without usable data."""
+        from openai import APIConnectionError, APIStatusError
+        if isinstance(error, APIConnectionError):  # Includes the timeouts
+            return True
+        return isinstance(error, APIStatusError) and (
+            error.status_code >= 500 or error.status_code in (401, 403, 408, 409, 429))
+
+    def _is_valid(self, data: dict) -> bool:
+        """Checks that all keys are present and that the direction and price are usable."""
+        if not all(data.get(key) is not None for key in self.REQUIRED_KEYS):
+            return False
+        if str(data["direction"]).upper() not in ("LONG", "SHORT"):
+            return False
+        try:
+            float(data["entry_price"])
+        except (TypeError, ValueError):
+            return False
+        return True
+
+    def _cache_key(self, email_body: str, batch: bool = False) -> str:
+        prompt_version = f"batch-{self.BATCH_PROMPT_VERSION}" if batch else self.PROMPT_VERSION
+        return LLMCache.make_key(email_body, f"{prompt_version}/{self.MODEL}")
+
+    def _get_cached(self, email_body: str, batch: bool = False) -> dict | None:
+        if not self.cache:
+            return None
+        return self.cache.get(self._cache_key(email_body, batch))
+
+    def _set_cached(self, email_body: str, data: dict, batch: bool = False):
+        if self.cache:
+            self.cache.set(self._cache_key(email_body, batch), data)
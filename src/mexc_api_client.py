@@ -1,14 +1,54 @@
 # src/mexc_api_client.py
 
-import requests
+import os
+import threading
+import time
+from typing import Iterable
+from .mexc_http import MexcHttpClient
+from .price_cache import PriceCache
 
 
 class MexcApiClient:
     """
     A client to communicate with the public MEXC API.
+
+    With a PriceCache, prices are served from the cache while they are younger than its
+    TTL, and every fetched price is stored in it for the other processes. Each price comes
+    with its age, see get_quotes().
     """
     API_BASE_URL = "https://api.mexc.com"
 
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, http: MexcHttpClient | None = None, cache: PriceCache | None = None):
+        # The pooled HTTP client is created on the first request, so startup never imports requests
+        self._http = http
+        self.cache = cache
+
+    @classmethod
+    def shared(cls) -> 'MexcApiClient':
+        """
+        Returns one client per process, with the price cache shared by all processes. The
+        cache is set with PRICE_CACHE_FILE and PRICE_CACHE_TTL_SECONDS (0 disables it).
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                ttl_seconds = float(os.getenv('PRICE_CACHE_TTL_SECONDS', PriceCache.DEFAULT_TTL_SECONDS))
+                cache = PriceCache(os.getenv('PRICE_CACHE_FILE', 'price_cache.db'), ttl_seconds) if ttl_seconds > 0 else None
+                cls._shared_instance = cls(cache=cache)
+            return cls._shared_instance
+
+    @property
+    def http(self) -> MexcHttpClient:
+        if self._http is None:
+            self._http = MexcHttpClient.shared()
+        return self._http
+
+    def format_stats(self) -> str | None:
+        """The HTTP stats of the MEXC requests, or None if this client has not made any."""
+        return self._http.format_stats() if self._http is not None else None
+
     def get_current_price(self, crypto_pair: str) -> float | None:
         """
         Fetches the current market price for a specific trading pair.
@@ -17,18 +57,105 @@ class MexcApiClient:
             crypto_pair (str): The base currency, e.g., "BERA" or "BTC".
 
         Returns:
-            The current price as a float, or None if an error occurs.
+            The current price as a float, or None if an error occurs (see get_prices).
         """
-        # Format the symbol as the MEXC API expects it (e.g., "BERAUSDT")
+        return self.get_prices([crypto_pair]).get(crypto_pair)
+
+    def get_prices(self, crypto_pairs: Iterable[str]) -> dict[str, float]:
+        """
+        Fetches the current market prices of several trading pairs with a single request.
+
+        Args:
+            crypto_pairs (Iterable[str]): Base currencies, e.g., ["BERA", "BTC", "BTC"].
+
+        Returns:
+            A dict with the price per pair. Pairs without a price (unknown symbol, failed request) are missing.
+            So are the stale cached prices get_quotes() falls back to: alerts are only sent on current prices.
+        """
+        return {pair: quote['price'] for pair, quote in self.get_quotes(crypto_pairs).items() if not quote['stale']}
+
+    def get_quotes(self, crypto_pairs: Iterable[str]) -> dict[str, dict]:
+        """
+        Returns the price of each pair with its staleness. Prices younger than the cache TTL
+        are served from the cache; the others are fetched with a single request (see
+        _fetch_prices). If that fails, a cached price up to the cache's max_stale_seconds
+        old is returned instead, marked as stale.
+
+        Args:
+            crypto_pairs (Iterable[str]): Base currencies, e.g., ["BERA", "BTC", "BTC"].
+
+        Returns:
+            A dict per pair with 'price', 'fetched_at' (epoch seconds), 'age_seconds',
+            'cached' (served from the cache) and 'stale' (older than the TTL). Pairs
+            without a price are missing.
+        """
+        symbols = {pair: pair.upper() + "USDT" for pair in set(crypto_pairs)}
+        cached = self.cache.get_many(symbols.values()) if self.cache is not None and symbols else {}
+        now = time.time()
+        quotes = {}
+        missing = {}
+        for pair, symbol in symbols.items():
+            entry = cached.get(symbol)
+            if entry is not None and now - entry[1] <= self.cache.ttl_seconds:
+                quotes[pair] = self._quote(*entry, now, cached=True)
+            else:
+                missing[pair] = symbol
+        if not missing:
+            return quotes
+
+        fetched_at = time.time()
+        fetched = self._fetch_prices(missing)
+        if self.cache is not None and fetched:
+            self.cache.set_many(fetched, fetched_at)
+        now = time.time()
+        for pair, symbol in missing.items():
+            if symbol in fetched:
+                quotes[pair] = self._quote(fetched[symbol], fetched_at, now, cached=False)
+            elif symbol in cached:
+                quotes[pair] = self._quote(*cached[symbol], now, cached=True)
+                print(f"   -> Warning: The price of {symbol} could not be fetched; "
+                      f"the cached one is {quotes[pair]['age_seconds']:.1f}s old (stale).")
+        return quotes
+
+    def _quote(self, price: float, fetched_at: float, now: float, cached: bool) -> dict:
+        age_seconds = max(0.0, now - fetched_at)
+        ttl_seconds = self.cache.ttl_seconds if self.cache is not None else 0.0
+        return {'price': price, 'fetched_at': fetched_at, 'age_seconds': age_seconds,
+                'cached': cached, 'stale': cached and age_seconds > ttl_seconds}
+
+    def _fetch_prices(self, symbols: dict[str, str]) -> dict[str, float]:
+        """
+        Fetches the prices of the given symbols (pair -> symbol) from MEXC, keyed by symbol.
+
+        Every pair is requested once, however many trades hold it. A single pair is requested
+        on its own; for more, one response with the ticker of all symbols replaces a request
+        per pair, and all of its prices are returned (so they can be cached).
+        """
+        if len(symbols) <= 1:
+            prices = {symbol: self._fetch_price(symbol) for symbol in symbols.values()}
+            return {symbol: price for symbol, price in prices.items() if price is not None}
+
+        prices = self._fetch_all_prices()
+        if prices is None:
+            return {}
+        for symbol in symbols.values():
+            if symbol not in prices:
+                print(f"   -> Error: Symbol '{symbol}' not found on MEXC Exchange.")
+        return prices
+
+    def _fetch_price(self, symbol: str) -> float | None:
+        """Requests the price of one symbol (e.g. "BERAUSDT"). Returns None if an error occurs."""
+        # Imported on first use (for its exceptions): a run without open positions never needs it
+        import requests
+
         response = None
-        symbol = crypto_pair.upper() + "USDT"
         endpoint = "/api/v3/ticker/price"
         url = f"{self.API_BASE_URL}{endpoint}"
         params = {'symbol': symbol}
 
         try:
             print(f"   -> Requesting price for {symbol} from MEXC...")
-            response = requests.get(url, params=params)
+            response = self.http.get(url, params=params)
 
             # Checks for HTTP errors (like 404 Not Found, 400 Bad Request)
             response.raise_for_status()
@@ -56,4 +183,22 @@ class MexcApiClient:
         except (ValueError, KeyError) as e:
             # Error for when the price is not a number or the data is unexpected
             print(f"   -> Error: Could not correctly process the API response for {symbol}: {e}")
-            return None
\ No newline at end of file
+            return None
+
+    def _fetch_all_prices(self) -> dict[str, float] | None:
+        """Requests the prices of all symbols in one response. Returns None if an error occurs."""
+        import requests
+
+        url = f"{self.API_BASE_URL}/api/v3/ticker/price"
+        try:
+            print("   -> Requesting the prices of all symbols from MEXC in one request...")
+            response = self.http.get(url)
+            response.raise_for_status()
+            # Without a symbol the endpoint returns a list of {"symbol": ..., "price": ...}
+            return {item['symbol']: float(item['price']) for item in response.json()}
+        except requests.exceptions.RequestException as req_err:
+            print(f"   -> Error: Network error while fetching the prices: {req_err}")
+            return None
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"   -> Error: Could not correctly process the API response for the prices: {e}")
+            return None
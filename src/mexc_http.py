@@ -0,0 +1,137 @@
+# src/mexc_http.py
+
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+class MexcHttpClient:
+    """
+    The shared HTTP layer of all MEXC calls (spot market data and the copy trading API).
+
+    - Connections: one requests.Session with a keep-alive connection pool, so repeated
+      calls reuse the TCP/TLS connection instead of paying the handshake every time.
+    - Timeouts: every request gets a connect and a read timeout unless it passes its own.
+    - Retries: 429 and server errors (5xx), connection errors and timeouts are retried
+      with jittered exponential backoff, never sooner than a Retry-After header asks
+      (up to BACKOFF_MAX_SECONDS, so a large Retry-After cannot block a caller for long).
+      Once the retries are used up, the last response is returned (or the error raised),
+      so callers handle it with raise_for_status() as before.
+    - Stats: requests, retries, errors and latency per endpoint, see format_stats().
+
+    MexcHttpClient.shared() returns the instance of the process. The connection pool is
+    thread-safe, so the GUI's worker threads can share it.
+    """
+    DEFAULT_TIMEOUT = (3.05, 10.0)  # (connect, read) in seconds
+    DEFAULT_MAX_RETRIES = 3
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 30.0
+    RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+    POOL_SIZE = 10
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, timeout: tuple[float, float] | float = DEFAULT_TIMEOUT,
+                 max_retries: int = DEFAULT_MAX_RETRIES, pool_size: int = POOL_SIZE):
+        # requests is imported on first use: a run without open positions never needs it
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        # Retries are done here, so they can be counted and honor Retry-After; not by urllib3
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.lock = threading.Lock()
+        self.stats: dict[str, dict] = {}
+
+    @classmethod
+    def shared(cls) -> 'MexcHttpClient':
+        """Returns the client shared by all MEXC callers of the process, creating it on first use."""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def get(self, url: str, params: dict | None = None, timeout: tuple[float, float] | float | None = None):
+        """
+        Sends a GET request through the connection pool, retrying transient failures.
+
+        Returns:
+            requests.Response: The first non-retryable response, or the last one once the
+                               retries are used up. Connection errors and timeouts are
+                               raised after the last retry.
+        """
+        import requests
+
+        endpoint = urlsplit(url).path
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout)
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as error:
+                self._record(endpoint, time.perf_counter() - start, error=True)
+                if attempt >= self.max_retries:
+                    raise
+                print(f"   -> MEXC connection error ({error}), retrying.")
+                delay = self.backoff_delay(attempt)
+            else:
+                self._record(endpoint, time.perf_counter() - start)
+                if response.status_code not in self.RETRYABLE_STATUSES or attempt >= self.max_retries:
+                    return response
+                delay = self.backoff_delay(attempt, self._retry_after(response))
+                print(f"   -> MEXC returned {response.status_code} for {endpoint}, retrying in {delay:.1f}s.")
+            self._record_retry(endpoint)
+            attempt += 1
+            time.sleep(delay)
+
+    def backoff_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """Full-jitter exponential backoff, but never shorter than the server's Retry-After (capped)."""
+        delay = random.uniform(0, min(self.BACKOFF_MAX_SECONDS, self.BACKOFF_BASE_SECONDS * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, min(retry_after, self.BACKOFF_MAX_SECONDS))
+        return delay
+
+    @staticmethod
+    def _retry_after(response) -> float | None:
+        # Only the delay-seconds form; MEXC does not send HTTP dates
+        try:
+            return float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            return None
+
+    def _endpoint_stats(self, endpoint: str) -> dict:
+        return self.stats.setdefault(endpoint, {'requests': 0, 'retries': 0, 'errors': 0,
+                                                'seconds': 0.0, 'max_seconds': 0.0})
+
+    def _record(self, endpoint: str, seconds: float, error: bool = False):
+        with self.lock:
+            stats = self._endpoint_stats(endpoint)
+            stats['requests'] += 1
+            stats['errors'] += error
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def _record_retry(self, endpoint: str):
+        with self.lock:
+            self._endpoint_stats(endpoint)['retries'] += 1
+
+    def total_requests(self) -> int:
+        with self.lock:
+            return sum(stats['requests'] for stats in self.stats.values())
+
+    def format_stats(self) -> str:
+        """Formats the requests, retries, errors and latency per endpoint."""
+        lines = ["MEXC HTTP usage:"]
+        with self.lock:
+            for endpoint, stats in sorted(self.stats.items()):
+                lines.append(f"   -> {endpoint}: {stats['requests']} request(s), {stats['retries']} retry(s), "
+                             f"{stats['errors']} error(s), latency avg "
+                             f"{stats['seconds'] / stats['requests'] * 1000:.1f}ms / max {stats['max_seconds'] * 1000:.1f}ms")
+        return "\n".join(lines)
@@ -0,0 +1,336 @@
+# src/mexc_price_stream.py
+
+import asyncio
+import json
+import random
+import threading
+from typing import Callable, Iterable, Iterator
+from .mexc_api_client import MexcApiClient
+
+
+def _read_varint(data: bytes, position: int) -> tuple[int, int]:
+    result = shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError("truncated varint")
+        byte = data[position]
+        position += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, position
+        shift += 7
+        if shift >= 64:
+            raise ValueError("varint too long")
+
+
+def protobuf_fields(data: bytes) -> Iterator[tuple[int, int | bytes]]:
+    """
+    Yields the (field number, value) pairs of a protobuf message: an int for a varint, the
+    raw bytes for the other wire types (strings and nested messages are length-delimited).
+    Only the few fields of the deals pushes are needed, so no protobuf runtime is used.
+    """
+    position = 0
+    while position < len(data):
+        key, position = _read_varint(data, position)
+        number, wire_type = key >> 3, key & 0x7
+        if wire_type == 0:
+            value, position = _read_varint(data, position)
+        elif wire_type in (1, 5):
+            size = 8 if wire_type == 1 else 4
+            value, position = data[position:position + size], position + size
+        elif wire_type == 2:
+            size, position = _read_varint(data, position)
+            value, position = data[position:position + size], position + size
+        else:
+            raise ValueError(f"unsupported wire type {wire_type}")
+        if position > len(data):
+            raise ValueError("truncated message")
+        yield number, value
+
+
+class MexcPriceStream:
+    """
+    Streams the deal prices of the open trades' symbols from the MEXC WebSocket API, so
+    the daemon learns about a price move within a second instead of at its next poll.
+
+    - Subscriptions: the stream is a trade listener of the DatabaseManager. Trades opened
+      by Analyze subscribe their symbol's deals channel as soon as they are committed;
+      the channel is unsubscribed when the last open trade of the symbol is closed.
+      MEXC allows MAX_SUBSCRIPTIONS channels per connection; the symbols beyond that are
+      left to the REST fallback of get_prices().
+    - Reconnects: a lost connection is re-established with jittered exponential backoff
+      and all channels are subscribed again.
+    - Protocol: (un)subscriptions, PINGs and their acknowledgements are JSON text frames;
+      the deals are pushed as protobuf binary frames (PushDataV3ApiWrapper), decoded by
+      decode_deals().
+    - Prices: every deal updates the symbol's last price and calls `on_tick(symbol, price)`
+      on the stream's thread; pop_ticks() collects the price range of every symbol that
+      moved since the last call, so a brief spike between two calls is not missed.
+      get_prices() serves the streamed prices and fetches the others through the
+      MexcApiClient, so it can stand in for the client.
+
+    The connection runs in an asyncio loop on its own thread; the listener methods and
+    get_prices() may be called from any thread.
+    """
+    WS_URL = "wss://wbs-api.mexc.com/ws"
+    DEALS_CHANNEL = "spot@public.aggre.deals.v3.api.pb@100ms@{symbol}"
+    # Field numbers of MEXC's PushDataV3ApiWrapper and its deals messages
+    WRAPPER_CHANNEL, WRAPPER_SYMBOL = 1, 3
+    WRAPPER_DEALS = (301, 314)  # publicDeals, publicAggreDeals
+    DEALS_ITEMS = 1
+    DEAL_PRICE, DEAL_TIME = 1, 4
+    MAX_SUBSCRIPTIONS = 30
+    PING_INTERVAL_SECONDS = 20.0  # MEXC closes a connection without a ping for 60 seconds
+    BACKOFF_BASE_SECONDS = 0.5
+    BACKOFF_MAX_SECONDS = 30.0
+
+    def __init__(self, mexc_client: MexcApiClient, on_tick: Callable[[str, float], None] | None = None,
+                 url: str = WS_URL):
+        self.mexc_client = mexc_client
+        self.on_tick = on_tick
+        self.url = url
+
+        self.lock = threading.Lock()
+        self.trade_symbols: dict[int, str] = {}  # trade_id -> symbol of the open trades
+        self.symbol_trades: dict[str, int] = {}  # symbol -> number of open trades
+        self.prices: dict[str, float] = {}  # symbol -> last deal price
+        self.ticked: dict[str, tuple[float, float]] = {}  # symbol -> (low, high) since the last pop_ticks()
+        self.connected = False
+
+        self.connections = 0
+        self.reconnects = 0
+        self.ticks = 0
+
+        self._thread: threading.Thread | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._changed: asyncio.Event | None = None
+        self._stopped: asyncio.Event | None = None
+        self._ready = threading.Event()
+
+    @staticmethod
+    def symbol(crypto_pair: str) -> str:
+        return crypto_pair.upper() + "USDT"
+
+    # --- Trade listener ---
+
+    def load(self, open_trades: Iterable[dict]):
+        """Subscribes the symbols of the open trades (e.g. DatabaseManager.get_open_trades_details)."""
+        with self.lock:
+            self.trade_symbols.clear()
+            self.symbol_trades.clear()
+            for trade in open_trades:
+                self._add_trade(trade)
+        self._notify()
+
+    def trade_opened(self, trade: dict):
+        """Trade listener: subscribes the symbol of a new open trade."""
+        with self.lock:
+            if trade['id'] in self.trade_symbols:
+                return
+            self._add_trade(trade)
+        self._notify()
+
+    def trade_closed(self, trade_id: int):
+        """Trade listener: unsubscribes the symbol once its last open trade is closed."""
+        with self.lock:
+            symbol = self.trade_symbols.pop(trade_id, None)
+            if symbol is None:
+                return
+            self.symbol_trades[symbol] -= 1
+            if not self.symbol_trades[symbol]:
+                del self.symbol_trades[symbol]
+                self.prices.pop(symbol, None)
+                self.ticked.pop(symbol, None)
+        self._notify()
+
+    def _add_trade(self, trade: dict):
+        symbol = self.symbol(trade['crypto_pair'])
+        self.trade_symbols[trade['id']] = symbol
+        self.symbol_trades[symbol] = self.symbol_trades.get(symbol, 0) + 1
+
+    def wanted_symbols(self) -> set[str]:
+        """The symbols to subscribe: those of the open trades, up to MAX_SUBSCRIPTIONS."""
+        with self.lock:
+            return set(sorted(self.symbol_trades)[:self.MAX_SUBSCRIPTIONS])
+
+    # --- Prices ---
+
+    def get_prices(self, crypto_pairs: Iterable[str]) -> dict[str, float]:
+        """
+        Returns the price per pair like MexcApiClient.get_prices(): streamed prices while
+        connected, the rest fetched through the MexcApiClient.
+        """
+        pairs = set(crypto_pairs)
+        prices = {}
+        with self.lock:
+            if self.connected:
+                prices = {pair: self.prices[self.symbol(pair)] for pair in pairs if self.symbol(pair) in self.prices}
+        missing = pairs - prices.keys()
+        if missing:
+            prices.update(self.mexc_client.get_prices(missing))
+        return prices
+
+    def pop_ticks(self) -> dict[str, tuple[float, float]]:
+        """Returns the (low, high) deal price of every symbol that had a deal since the previous call."""
+        with self.lock:
+            ticked, self.ticked = self.ticked, {}
+        return ticked
+
+    def format_stats(self) -> str:
+        with self.lock:
+            subscribed = len(self.symbol_trades)
+        return (f"MEXC price stream: {self.connections} connection(s), {self.reconnects} reconnect(s), "
+                f"{self.ticks} tick(s), {subscribed} symbol(s) of open trades.")
+
+    # --- Connection ---
+
+    def start(self):
+        """Connects on a background thread; returns once its event loop is running."""
+        self._thread = threading.Thread(target=asyncio.run, args=(self._run(),), name="mexc-price-stream", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+
+    def stop(self, timeout: float = 5.0):
+        """Closes the connection and waits for the stream's thread to finish."""
+        if self._loop is not None and self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._stopped.set)
+            self._thread.join(timeout)
+
+    def _notify(self):
+        if self._loop is not None:
+            try:
+                self._loop.call_soon_threadsafe(self._changed.set)
+            except RuntimeError:
+                pass  # The loop has already stopped
+
+    def backoff_delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.BACKOFF_MAX_SECONDS, self.BACKOFF_BASE_SECONDS * 2 ** attempt))
+
+    async def _run(self):
+        # websockets is imported on first use: only the daemon with --stream needs it
+        from websockets.asyncio.client import connect
+        from websockets.exceptions import WebSocketException
+
+        self._loop = asyncio.get_running_loop()
+        self._changed = asyncio.Event()
+        self._stopped = asyncio.Event()
+        self._ready.set()
+
+        attempt = 0
+        while not self._stopped.is_set():
+            try:
+                async with connect(self.url, ping_interval=None, open_timeout=10) as websocket:
+                    self.connections += 1
+                    attempt = 0
+                    print(f"   -> MEXC price stream connected to {self.url}.")
+                    await self._serve(websocket)
+            except (OSError, asyncio.TimeoutError, WebSocketException) as error:
+                print(f"   -> MEXC price stream disconnected ({error!r}).")
+            finally:
+                with self.lock:
+                    self.connected = False
+                    # Prices from before the outage must not be served as current after reconnecting
+                    self.prices.clear()
+                    self.ticked.clear()
+            if self._stopped.is_set():
+                break
+            delay = self.backoff_delay(attempt)
+            attempt += 1
+            self.reconnects += 1
+            print(f"   -> Reconnecting to the MEXC price stream in {delay:.1f}s.")
+            try:
+                await asyncio.wait_for(self._stopped.wait(), delay)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _serve(self, websocket):
+        """Keeps the subscriptions in line with the open trades until the connection is lost or the stream stops."""
+        with self.lock:
+            self.connected = True
+        subscribed: set[str] = set()
+        receiver = asyncio.ensure_future(self._receive(websocket))
+        stopped = asyncio.ensure_future(self._stopped.wait())
+        try:
+            while not receiver.done() and not stopped.done():
+                # Cleared before syncing, so a change during the sync triggers another one
+                self._changed.clear()
+                subscribed = await self._sync_subscriptions(websocket, subscribed)
+                changed = asyncio.ensure_future(self._changed.wait())
+                done, _ = await asyncio.wait({receiver, stopped, changed}, timeout=self.PING_INTERVAL_SECONDS,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                changed.cancel()
+                if not done:
+                    await websocket.send(json.dumps({"method": "PING"}))
+        finally:
+            stopped.cancel()
+            if not receiver.done():
+                receiver.cancel()
+        if receiver.done() and not receiver.cancelled():
+            receiver.result()  # Raises the error that ended the connection
+
+    async def _sync_subscriptions(self, websocket, subscribed: set[str]) -> set[str]:
+        wanted = self.wanted_symbols()
+        if removed := subscribed - wanted:
+            await websocket.send(json.dumps({"method": "UNSUBSCRIPTION", "params": sorted(
+                self.DEALS_CHANNEL.format(symbol=symbol) for symbol in removed)}))
+            print(f"   -> Price stream unsubscribed {', '.join(sorted(removed))}.")
+        if added := wanted - subscribed:
+            await websocket.send(json.dumps({"method": "SUBSCRIPTION", "params": sorted(
+                self.DEALS_CHANNEL.format(symbol=symbol) for symbol in added)}))
+            print(f"   -> Price stream subscribed {', '.join(sorted(added))}.")
+        return wanted
+
+    async def _receive(self, websocket):
+        async for message in websocket:
+            self._handle(message)
+
+    @classmethod
+    def decode_deals(cls, message: bytes) -> tuple[str, list[tuple[float, int]]]:
+        """
+        Decodes a protobuf deals push into its symbol and its (price, time in ms) deals.
+        Raises ValueError for a malformed message or one without deals.
+        """
+        channel = symbol = ""
+        deals = []
+        for number, value in protobuf_fields(message):
+            if number == cls.WRAPPER_CHANNEL:
+                channel = value.decode()
+            elif number == cls.WRAPPER_SYMBOL:
+                symbol = value.decode()
+            elif number in cls.WRAPPER_DEALS:
+                for item_number, item in protobuf_fields(value):
+                    if item_number != cls.DEALS_ITEMS:
+                        continue
+                    fields = dict(protobuf_fields(item))
+                    deals.append((float(fields[cls.DEAL_PRICE].decode()), fields.get(cls.DEAL_TIME, 0)))
+        if not deals:
+            raise ValueError(f"no deals in a push of {channel or 'an unknown channel'}")
+        # The symbol is optional in the wrapper; the channel ends with it
+        return symbol or channel.rsplit("@", 1)[-1], deals
+
+    def _handle(self, message: str | bytes):
+        """Records the prices of a deals push; acknowledgements and PONGs are ignored."""
+        try:
+            if isinstance(message, str):
+                data = json.loads(message)
+                if 'msg' in data and data.get('code', 0) != 0:
+                    print(f"   -> MEXC price stream error: {data['msg']}")
+                return
+            # A push carries the deals since the last one; the newest has the highest time
+            symbol, deals = self.decode_deals(message)
+            price = max(deals, key=lambda deal: deal[1])[0]
+            low = min(deal[0] for deal in deals)
+            high = max(deal[0] for deal in deals)
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"   -> Error: Could not process a MEXC price stream message: {e}")
+            return
+        with self.lock:
+            if symbol not in self.symbol_trades:
+                return  # A late push for a channel that was just unsubscribed
+            self.prices[symbol] = price
+            if symbol in self.ticked:
+                low, high = min(low, self.ticked[symbol][0]), max(high, self.ticked[symbol][1])
+            self.ticked[symbol] = (low, high)
+            self.ticks += 1
+        if self.on_tick is not None:
+            self.on_tick(symbol, price)
@@ -0,0 +1,155 @@
+# src/parser_registry.py
+
+import re
+import threading
+
+OPEN_POSITION = 'open'
+CLOSE_POSITION = 'close'
+
+
+class EmailTemplate:
+    """
+    One precompiled regex for one version of a MEXC email format.
+
+    The pattern uses named groups for the fields it extracts, e.g.
+    (?P<crypto_pair>...), (?P<direction>...), (?P<entry_price>...) and (?P<trader>...).
+    """
+
+    def __init__(self, email_type: str, name: str, pattern: str, flags: int = 0):
+        self.email_type = email_type
+        self.name = name
+        self.regex = re.compile(pattern, flags)
+        self.hits = 0
+
+    def match(self, text: str) -> dict | None:
+        """Returns the named groups that matched, or None."""
+        match = self.regex.search(text)
+        if not match:
+            return None
+        return {key: value for key, value in match.groupdict().items() if value is not None}
+
+
+class ParserRegistry:
+    """
+    Dispatches email text to a list of versioned templates per email type.
+
+    The first matching template wins. Every REORDER_EVERY hits (and on reorder()) the
+    templates are sorted by their hit count, so the format MEXC currently sends is tried
+    first. Sorting on every hit would cost more than it saves with a handful of
+    templates. Emails that no template matches are counted as misses; those are the
+    ones that fall through to the LLM.
+    """
+    REORDER_EVERY = 1000
+
+    def __init__(self):
+        self.templates: dict[str, list[EmailTemplate]] = {}
+        self.misses: dict[str, int] = {}
+        self.hits_since_reorder = 0
+        # The TemplateInducer registers templates from the pipeline's LLM threads
+        self._lock = threading.Lock()
+
+    def register(self, email_type: str, name: str, pattern: str, flags: int = 0) -> EmailTemplate:
+        """Compiles a pattern and appends it as the last template of its email type."""
+        template = EmailTemplate(email_type, name, pattern, flags)
+        with self._lock:
+            self.templates.setdefault(email_type, []).append(template)
+            self.misses.setdefault(email_type, 0)
+        return template
+
+    def reorder(self):
+        """Sorts the templates of every email type by hit count; templates with equal counts keep their order."""
+        with self._lock:
+            self.hits_since_reorder = 0
+            for email_type, templates in self.templates.items():
+                self.templates[email_type] = sorted(templates, key=lambda template: template.hits, reverse=True)
+
+    def parse(self, email_type: str, text: str) -> dict | None:
+        """
+        Extracts the fields of an email with the first matching template.
+
+        Returns:
+            A dictionary with the normalized fields and the name of the matching
+            template under 'template', or None if no template matched.
+        """
+        for template in self.templates.get(email_type, ()):
+            fields = template.match(text)
+            if fields is None:
+                continue
+            try:
+                fields = self._normalize(fields)
+            except ValueError:
+                # E.g. a price that is not a number; let the next template try
+                continue
+            template.hits += 1
+            self.hits_since_reorder += 1
+            if self.hits_since_reorder >= self.REORDER_EVERY:
+                self.reorder()
+            fields['template'] = template.name
+            return fields
+
+        self.misses[email_type] = self.misses.get(email_type, 0) + 1
+        return None
+
+    @staticmethod
+    def _normalize(fields: dict) -> dict:
+        """Converts the raw regex groups to the values stored in the database."""
+        if 'direction' in fields:
+            fields['direction'] = fields['direction'].upper()
+        if 'entry_price' in fields:
+            # Convert the price (replace comma with dot) to a float.
+            fields['entry_price'] = float(fields['entry_price'].rstrip('.,').replace(',', '.'))
+        return fields
+
+    def get_stats(self) -> dict:
+        """Returns the hit count per template and the miss count per email type."""
+        return {
+            email_type: {
+                'templates': {template.name: template.hits for template in templates},
+                'misses': self.misses.get(email_type, 0),
+            }
+            for email_type, templates in self.templates.items()
+        }
+
+    def format_stats(self) -> str:
+        """Formats the hit rates as a short multi-line report."""
+        lines = ["Parser template hit rates:"]
+        for email_type, stats in self.get_stats().items():
+            total = sum(stats['templates'].values()) + stats['misses']
+            if total == 0:
+                continue
+            for name, hits in stats['templates'].items():
+                lines.append(f"   -> {email_type}/{name}: {hits}/{total} ({hits / total:.0%})")
+            lines.append(f"   -> {email_type}/no match (LLM fallback): {stats['misses']}/{total}")
+        return "\n".join(lines)
+
+
+def build_default_registry() -> ParserRegistry:
+    """Creates a registry with the known MEXC copy trade email formats."""
+    registry = ParserRegistry()
+
+    # The exact formats as MEXC sends them today
+    registry.register(
+        OPEN_POSITION, 'open_v1',
+        r"opened a (?P<crypto_pair>\w+) (?P<direction>LONG|SHORT) position\. "
+        r"Entry Price: (?P<entry_price>[0-9.,]+); Trader: (?P<trader>\w+)")
+    registry.register(
+        CLOSE_POSITION, 'close_v1',
+        r"Your (?P<crypto_pair>\w+) position has been closed successfully\. Trader: (?P<trader>\w+)")
+
+    # Tolerant variants for small drifts: letter case, spacing and punctuation,
+    # an optional USDT suffix on the pair and an optional direction in the close email
+    registry.register(
+        OPEN_POSITION, 'open_v2',
+        r"opened an? (?P<crypto_pair>\w+?)(?:_?USDT)?\s+(?P<direction>long|short)\s+position[.,;]?\s*"
+        r"Entry\s+Price:?\s*(?P<entry_price>[0-9][0-9.,]*)\s*(?:USDT)?[;,.]?\s*Trader:?\s*(?P<trader>\w+)",
+        re.IGNORECASE)
+    registry.register(
+        CLOSE_POSITION, 'close_v2',
+        r"Your (?P<crypto_pair>\w+?)(?:_?USDT)?\s+(?:(?P<direction>long|short)\s+)?position\s+has\s+been\s+"
+        r"closed(?:\s+successfully)?[.,;]?\s*Trader:?\s*(?P<trader>\w+)",
+        re.IGNORECASE)
+    return registry
+
+
+# Shared by all Analyze instances, so the hit counters cover a whole run
+DEFAULT_REGISTRY = build_default_registry()
@@ -17,15 +17,21 @@ class PositionMonitor:
         if self.notifier:
             print("Email alerts are activated.")
 
-    def check_position(self, trade_id: int, crypto_pair: str, direction: str, entry_price: float, current_price: float,
-                       alerts_sent: int, stop_loss_percentage: float):  # New parameter added
-        if entry_price == 0: return
-
-        percentage_change = 0.0
+    @staticmethod
+    def percentage_change(direction: str, entry_price: float, current_price: float) -> float:
+        """The P/L of a position in percent of its entry price (negative for a loss)."""
         if direction.upper() == 'LONG':
-            percentage_change = ((current_price - entry_price) / entry_price) * 100
+            return ((current_price - entry_price) / entry_price) * 100
         elif direction.upper() == 'SHORT':
-            percentage_change = ((entry_price - current_price) / entry_price) * 100
+            return ((entry_price - current_price) / entry_price) * 100
+        return 0.0
+
+    def check_position(self, trade_id: int, crypto_pair: str, direction: str, entry_price: float, current_price: float,
+                       alerts_sent: int, stop_loss_percentage: float) -> bool:  # New parameter added
+        """Returns True if an alert was sent and counted in the database."""
+        if entry_price == 0: return False
+
+        percentage_change = self.percentage_change(direction, entry_price, current_price)
 
         pnl_status = f"Profit: {percentage_change:+.2f}%" if percentage_change >= 0 else f"Loss: {percentage_change:.2f}%"
         print(f"   -> Status {crypto_pair}: Entry=${entry_price:.4f}, Current=${current_price:.4f} | {pnl_status}")
@@ -47,4 +53,5 @@ class PositionMonitor:
                 )
                 # Increment the alert count in the database
                 if self.db_manager:
-                    self.db_manager.increment_alert_count(trade_id)
\ No newline at end of file
+                    return self.db_manager.increment_alert_count(trade_id)
+        return False
\ No newline at end of file
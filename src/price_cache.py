@@ -0,0 +1,76 @@
+# src/price_cache.py
+
+import sqlite3
+import threading
+import time
+from typing import Iterable
+
+
+class PriceCache:
+    """
+    A short-lived SQLite cache of MEXC prices, shared through one database file by every
+    process on the machine (the monitor, the GUIs, ad-hoc scripts).
+
+    A price is fresh for `ttl_seconds`, so a burst of checks for the same symbol is
+    answered without a request. Older prices are kept up to `max_stale_seconds`, so a
+    caller can fall back to them, marked as stale, when a refresh fails.
+
+    Cache errors (e.g. a locked database) are reported and treated as misses; they never
+    stop a price from being fetched.
+    """
+    DEFAULT_TTL_SECONDS = 3.0
+    DEFAULT_MAX_STALE_SECONDS = 60.0
+    BUSY_TIMEOUT_SECONDS = 1.0
+
+    def __init__(self, db_file: str = "price_cache.db", ttl_seconds: float = DEFAULT_TTL_SECONDS,
+                 max_stale_seconds: float = DEFAULT_MAX_STALE_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self.max_stale_seconds = max(max_stale_seconds, ttl_seconds)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, timeout=self.BUSY_TIMEOUT_SECONDS, check_same_thread=False)
+        # WAL: the processes reading prices never wait for the one storing a snapshot
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS prices (
+                symbol TEXT PRIMARY KEY,
+                price REAL NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+    def get_many(self, symbols: Iterable[str]) -> dict[str, tuple[float, float]]:
+        """Returns (price, fetched_at) per symbol for the entries younger than max_stale_seconds."""
+        symbols = list(symbols)
+        if not symbols:
+            return {}
+        placeholders = ", ".join("?" * len(symbols))
+        oldest = time.time() - self.max_stale_seconds
+        try:
+            with self.lock:
+                rows = self.conn.execute(
+                    f"SELECT symbol, price, fetched_at FROM prices WHERE symbol IN ({placeholders}) AND fetched_at >= ?",
+                    (*symbols, oldest)).fetchall()
+        except sqlite3.Error as e:
+            print(f"   -> Price cache unavailable: {e}")
+            return {}
+        return {symbol: (price, fetched_at) for symbol, price, fetched_at in rows}
+
+    def set_many(self, prices: dict[str, float], fetched_at: float):
+        """Stores the prices of a snapshot and drops the entries that are too old to be served."""
+        try:
+            with self.lock:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO prices (symbol, price, fetched_at) VALUES (?, ?, ?)",
+                    [(symbol, price, fetched_at) for symbol, price in prices.items()])
+                self.conn.execute("DELETE FROM prices WHERE fetched_at < ?", (fetched_at - self.max_stale_seconds,))
+                self.conn.commit()
+        except sqlite3.Error as e:
+            self.conn.rollback()
+            print(f"   -> Price cache could not be updated: {e}")
+
+    def close(self):
+        """Closes the cache database connection."""
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,136 @@
+# src/stop_loss_engine.py
+
+from bisect import bisect_left, bisect_right, insort
+from .position_monitor import PositionMonitor
+
+
+class TriggerBook:
+    """The trigger prices of one side (longs or shorts) of a symbol, sorted ascending."""
+
+    def __init__(self):
+        self.triggers: list[tuple[float, int]] = []  # (trigger_price, trade_id)
+
+    def __len__(self) -> int:
+        return len(self.triggers)
+
+    def add(self, trigger_price: float, trade_id: int):
+        insort(self.triggers, (trigger_price, trade_id))
+
+    def remove(self, trigger_price: float, trade_id: int):
+        index = bisect_left(self.triggers, (trigger_price, trade_id))
+        if index < len(self.triggers) and self.triggers[index] == (trigger_price, trade_id):
+            del self.triggers[index]
+
+    def at_or_above(self, price: float) -> list[int]:
+        """The trades whose trigger price is at or above `price` (longs hit by a fall to it)."""
+        index = bisect_left(self.triggers, (price, float('-inf')))
+        return [trade_id for _, trade_id in self.triggers[index:]]
+
+    def at_or_below(self, price: float) -> list[int]:
+        """The trades whose trigger price is at or below `price` (shorts hit by a rise to it)."""
+        index = bisect_right(self.triggers, (price, float('inf')))
+        return [trade_id for _, trade_id in self.triggers[:index]]
+
+
+class StopLossEngine:
+    """
+    Finds the trades whose stop-loss a price tick breaches without computing the P/L of
+    every trade. When a trade is armed, its stop-loss is turned into an absolute trigger
+    price once (see trigger_price); the triggers are kept sorted per symbol, one book
+    for the longs and one for the shorts. A tick then finds all breached trades with one
+    bisect per side, in O(log n + k) for k breached trades. The trigger price and P/L
+    formulas can round differently right at the trigger, so the bisect takes a slightly
+    wider range and its candidates are confirmed with PositionMonitor.percentage_change(),
+    the comparison check_position() makes: both always agree on a breach.
+
+    Only armed trades are watched: the daemon arms the trades whose alert is due but whose
+    stop-loss was not hit yet, and disarms them once checked. As a trade listener, a
+    trade that is closed or updated by a new open email is disarmed.
+    Not thread-safe: the daemon only uses it from its main thread (except watches()).
+    """
+
+    # Relative margin of the bisect around a price, far above the rounding errors of the formulas
+    TRIGGER_TOLERANCE = 1e-9
+
+    def __init__(self):
+        self.books: dict[str, tuple[TriggerBook, TriggerBook]] = {}  # symbol -> (longs, shorts)
+        # trade_id -> (symbol, is_long, trigger_price, entry_price, stop_loss_percentage)
+        self.armed: dict[int, tuple[str, bool, float, float, float]] = {}
+
+    def __len__(self) -> int:
+        return len(self.armed)
+
+    @staticmethod
+    def trigger_price(direction: str, entry_price: float, stop_loss_percentage: float) -> float:
+        """
+        The price at which the P/L of a position reaches its (negative) stop-loss percentage,
+        as PositionMonitor calculates it: a long is hit at or below it, a short at or above.
+        """
+        if direction.upper() == 'LONG':
+            return entry_price * (1 + stop_loss_percentage / 100)
+        return entry_price * (1 - stop_loss_percentage / 100)
+
+    def arm(self, trade: dict, stop_loss_percentage: float):
+        """Watches a trade (id, crypto_pair, direction, entry_price), replacing an earlier trigger."""
+        self.disarm(trade['id'])
+        direction = trade['direction'].upper()
+        if not trade['entry_price'] or direction not in ('LONG', 'SHORT'):
+            return  # PositionMonitor never alerts these either
+        symbol = trade['crypto_pair'].upper() + "USDT"
+        is_long = direction == 'LONG'
+        trigger = self.trigger_price(direction, trade['entry_price'], stop_loss_percentage)
+        longs, shorts = self.books.setdefault(symbol, (TriggerBook(), TriggerBook()))
+        (longs if is_long else shorts).add(trigger, trade['id'])
+        self.armed[trade['id']] = (symbol, is_long, trigger, trade['entry_price'], stop_loss_percentage)
+
+    def disarm(self, trade_id: int):
+        """Stops watching a trade; unknown trades are ignored."""
+        entry = self.armed.pop(trade_id, None)
+        if entry is None:
+            return
+        symbol, is_long, trigger, _, _ = entry
+        longs, shorts = self.books[symbol]
+        (longs if is_long else shorts).remove(trigger, trade_id)
+        if not longs and not shorts:
+            del self.books[symbol]
+
+    def watches(self, symbol: str) -> bool:
+        """
+        Whether a trade of the symbol is armed. A single dict lookup, so the price stream's
+        thread may call it to decide whether a tick is worth waking the daemon for.
+        """
+        return symbol in self.books
+
+    def clear(self):
+        self.books.clear()
+        self.armed.clear()
+
+    def breached(self, symbol: str, low: float, high: float | None = None) -> list[int]:
+        """
+        Returns the armed trades of a symbol whose stop-loss is hit by a price range: the longs
+        whose trigger is at or above the `low`, the shorts whose trigger is at or below the
+        `high` (the same price as `low` for a single tick), confirmed with the P/L at that price.
+        """
+        books = self.books.get(symbol)
+        if books is None:
+            return []
+        longs, shorts = books
+        high = low if high is None else high
+        return ([trade_id for trade_id in longs.at_or_above(low * (1 - self.TRIGGER_TOLERANCE))
+                 if self._hit(trade_id, 'LONG', low)] +
+                [trade_id for trade_id in shorts.at_or_below(high * (1 + self.TRIGGER_TOLERANCE))
+                 if self._hit(trade_id, 'SHORT', high)])
+
+    def _hit(self, trade_id: int, direction: str, price: float) -> bool:
+        _, _, _, entry_price, stop_loss_percentage = self.armed[trade_id]
+        return PositionMonitor.percentage_change(direction, entry_price, price) <= stop_loss_percentage
+
+    # --- Trade listener ---
+
+    def trade_opened(self, trade: dict):
+        """Trade listener: an updated open trade has a new entry price and alert schedule."""
+        self.disarm(trade['id'])
+
+    def trade_closed(self, trade_id: int):
+        """Trade listener: a closed trade has no stop-loss to watch."""
+        self.disarm(trade_id)
@@ -0,0 +1,226 @@
+# src/template_inducer.py
+
+import hashlib
+import json
+import os
+import re
+import threading
+from .parser_registry import ParserRegistry, DEFAULT_REGISTRY
+
+
+class TemplateInducer:
+    """
+    Learns new regex templates from successful LLM extractions.
+
+    For every email the LLM extracted, the values it returned are located in the email
+    text and a candidate regex is derived: the literal text between the values is kept
+    (with numbers and whitespace generalized), the values become named groups. A candidate
+    that reproduces the LLM fields of all its stored examples is registered in the parser
+    registry once it has been confirmed by `min_confirmations` emails.
+
+    Candidates and learned templates are stored in a JSON file, so confirmations also
+    accumulate across one-shot runs.
+    """
+    DEFAULT_MIN_CONFIRMATIONS = 3
+    # Number of words of literal text kept in front of the first value as an anchor
+    LEADING_CONTEXT_WORDS = 3
+    # Literal text between two values longer than this is too specific to learn from
+    MAX_GAP_LENGTH = 120
+
+    VALUE_PATTERNS = {
+        'crypto_pair': r"\w+",
+        'direction': r"LONG|SHORT",
+        'entry_price': r"[0-9][0-9.,]*",
+        'trader': r"\w+",
+    }
+
+    _shared_instance = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, registry: ParserRegistry, store_file: str | None = None,
+                 min_confirmations: int = DEFAULT_MIN_CONFIRMATIONS):
+        self.registry = registry
+        self.store_file = store_file
+        self.min_confirmations = min_confirmations
+        self.learned: list[dict] = []
+        self.candidates: dict[str, dict] = {}
+        # LLM extractions can finish on worker threads (see IngestionPipeline)
+        self.lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def shared(cls) -> 'TemplateInducer':
+        """
+        Returns one inducer per process for the default parser registry. Creating it
+        registers the templates learned in earlier runs (LEARNED_TEMPLATES_FILE).
+        """
+        with cls._shared_lock:
+            if cls._shared_instance is None:
+                store_file = os.getenv("LEARNED_TEMPLATES_FILE", "learned_templates.json")
+                cls._shared_instance = cls(DEFAULT_REGISTRY, store_file)
+            return cls._shared_instance
+
+    def observe(self, email_type: str, text: str, fields: dict) -> str | None:
+        """
+        Learns from one successful LLM extraction.
+
+        Returns:
+            The name of the template registered by this observation, or None.
+        """
+        pattern = self.induce(text, fields)
+        if pattern is None:
+            return None
+
+        with self.lock:
+            return self._confirm(email_type, pattern, text, fields)
+
+    def _confirm(self, email_type: str, pattern: str, text: str, fields: dict) -> str | None:
+        """Adds an example to a candidate and registers the candidate once it is confirmed."""
+        candidate = self.candidates.setdefault(pattern, {'email_type': email_type, 'examples': []})
+        # The same email seen again (e.g. a replay) is not an extra confirmation
+        if all(example['text'] != text for example in candidate['examples']):
+            candidate['examples'].append({'text': text, 'fields': self._comparable(fields)})
+        # Only keep the examples the candidate still reproduces
+        regex = re.compile(pattern, re.IGNORECASE)
+        candidate['examples'] = [
+            example for example in candidate['examples']
+            if self._reproduces(regex, example['text'], example['fields'])
+        ][-self.min_confirmations:]
+
+        name = None
+        confirmations = len(candidate['examples'])
+        if confirmations >= self.min_confirmations:
+            name = f"{email_type}_learned_{hashlib.sha1(pattern.encode('utf-8')).hexdigest()[:8]}"
+            self.registry.register(email_type, name, pattern, re.IGNORECASE)
+            self.learned.append({'email_type': email_type, 'name': name, 'pattern': pattern})
+            del self.candidates[pattern]
+            print(f"   -> Template Learned: '{name}' is now used on the regex fast path.")
+        elif confirmations:
+            print(f"   -> Template Candidate: {confirmations}/{self.min_confirmations} confirmations.")
+        self._save()
+        return name
+
+    def induce(self, text: str, fields: dict) -> str | None:
+        """
+        Derives a candidate regex from an email text and the field values found in it.
+        Returns None if a value cannot be located unambiguously in the text.
+        """
+        spans = []
+        for key in self.VALUE_PATTERNS:
+            if fields.get(key) is None:
+                return None
+            span = self._locate(text, key, fields[key])
+            if span is None:
+                return None
+            spans.append((span[0], span[1], key))
+        spans.sort()
+        if any(spans[i][1] > spans[i + 1][0] for i in range(len(spans) - 1)):
+            return None
+
+        # Anchor the first value on the last few words in front of it
+        leading = text[:spans[0][0]]
+        words = re.findall(r"\S+\s*", leading)
+        parts = [self._literal("".join(words[-self.LEADING_CONTEXT_WORDS:]))]
+        for index, (start, end, key) in enumerate(spans):
+            parts.append(f"(?P<{key}>{self.VALUE_PATTERNS[key]})")
+            if index + 1 < len(spans):
+                gap = text[end:spans[index + 1][0]]
+                if len(gap) > self.MAX_GAP_LENGTH:
+                    return None
+                parts.append(self._literal(gap))
+        pattern = "".join(parts)
+
+        # The candidate must at least reproduce the email it was derived from
+        if not self._reproduces(re.compile(pattern, re.IGNORECASE), text, self._comparable(fields)):
+            return None
+        return pattern
+
+    @staticmethod
+    def _literal(text: str) -> str:
+        """Escapes literal text, generalizing numbers and runs of whitespace."""
+        parts = []
+        for token in re.findall(r"\s+|[0-9]+(?:[.,][0-9]+)*|[^\s0-9]+", text):
+            if token.isspace():
+                parts.append(r"\s+")
+            elif token[0].isdigit():
+                parts.append(r"[0-9][0-9.,]*")
+            else:
+                parts.append(re.escape(token))
+        return "".join(parts)
+
+    @staticmethod
+    def _locate(text: str, key: str, value) -> tuple[int, int] | None:
+        """Finds the span of a field value in the text; it must occur exactly once."""
+        if key == 'entry_price':
+            try:
+                price = float(value)
+            except (TypeError, ValueError):
+                return None
+            matches = [
+                match for match in re.finditer(r"[0-9][0-9.,]*", text)
+                if TemplateInducer._parse_price(match.group()) == price
+            ]
+        else:
+            value = re.escape(str(value))
+            if key == 'direction':
+                matches = list(re.finditer(rf"\b{value}\b", text, re.IGNORECASE))
+            else:
+                # The pair may be followed by its quote currency, e.g. 'BTCUSDT'
+                matches = list(re.finditer(rf"\b{value}(?=USDT\b|_USDT\b|\b)", text))
+        if len(matches) != 1:
+            return None
+        return matches[0].span()
+
+    @staticmethod
+    def _parse_price(price_str: str) -> float | None:
+        try:
+            return float(price_str.rstrip('.,').replace(',', '.'))
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _comparable(fields: dict) -> dict:
+        """Normalizes LLM fields the same way the registry normalizes regex groups."""
+        return {
+            'crypto_pair': str(fields['crypto_pair']),
+            'direction': str(fields['direction']).upper(),
+            'entry_price': float(fields['entry_price']),
+            'trader': str(fields['trader']),
+        }
+
+    def _reproduces(self, regex: re.Pattern, text: str, expected: dict) -> bool:
+        """Checks that a candidate extracts exactly the expected fields from a text."""
+        match = regex.search(text)
+        if not match:
+            return False
+        groups = match.groupdict()
+        return (groups['crypto_pair'] == expected['crypto_pair']
+                and groups['direction'].upper() == expected['direction']
+                and self._parse_price(groups['entry_price']) == expected['entry_price']
+                and groups['trader'] == expected['trader'])
+
+    def _load(self):
+        """Registers the learned templates and restores the candidates from the store file."""
+        if not self.store_file:
+            return
+        try:
+            with open(self.store_file, 'r') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except json.JSONDecodeError:
+            print(f"Error: Learned templates file '{self.store_file}' contains invalid JSON.")
+            return
+
+        self.candidates = data.get('candidates', {})
+        for template in data.get('templates', []):
+            self.registry.register(template['email_type'], template['name'], template['pattern'], re.IGNORECASE)
+            self.learned.append(template)
+        if self.learned:
+            print(f"{len(self.learned)} learned template(s) loaded.")
+
+    def _save(self):
+        if not self.store_file:
+            return
+        with open(self.store_file, 'w') as f:
+            json.dump({'templates': self.learned, 'candidates': self.candidates}, f, indent=2)
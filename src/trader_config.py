@@ -1,6 +1,8 @@
 # src/trader_config.py
 
+import hashlib
 import json
+import os
 import re
 
 
@@ -15,8 +17,29 @@ class TraderConfig:
 
     def __init__(self, config_file: str):
         self.config_file = config_file
+        self.loaded_mtime = self._mtime()
         self.trader_configs = self._load_config()
 
+    def _mtime(self) -> float | None:
+        try:
+            return os.stat(self.config_file).st_mtime
+        except OSError:
+            return None
+
+    def reload_if_changed(self) -> bool:
+        """Reloads the configuration if the file was modified since it was loaded (e.g. in daemon mode)."""
+        mtime = self._mtime()
+        if mtime == self.loaded_mtime:
+            return False
+        self.loaded_mtime = mtime
+        self.trader_configs = self._load_config()
+        return True
+
+    def fingerprint(self) -> str:
+        """A hash of the effective configuration, to detect that the alert schedules have changed."""
+        data = json.dumps([self.trader_configs, self.DEFAULT_SCHEDULE, self.DEFAULT_STOPLOSS], sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
     def _parse_duration(self, duration_str: str) -> int:
         """Converts a duration string (e.g., '20m', '1h') to seconds."""
         if not isinstance(duration_str, str): return 0
@@ -84,4 +107,15 @@ class TraderConfig:
         return {
             'schedule': schedule,
             'stoploss': stoploss
-        }
\ No newline at end of file
+        }
+
+    def next_alert_at(self, trader_name: str, opened_at: int, alerts_sent: int) -> int | None:
+        """
+        Calculates the Unix time at which a trade is due for its next alert: the initial wait,
+        plus all reminder intervals up to the previous alert. Returns None once all alerts are sent.
+        """
+        schedule = self.get_trader_config(trader_name)['schedule']
+        reminders = schedule['reminders']
+        if alerts_sent >= 1 + len(reminders):
+            return None
+        return opened_at + schedule['initial'] + sum(reminders[:alerts_sent])
\ No newline at end of file
@@ -0,0 +1,81 @@
+# tests/test_alert_scheduler.py
+"""
+Tests the AlertScheduler: the order of the due checks, the rechecks of trades whose alert
+is due, and sync(), which picks up the schedule changes of other processes.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.alert_scheduler import AlertScheduler  # noqa: E402
+from src.trader_config import TraderConfig  # noqa: E402
+
+NOW = 1792231200
+
+
+class AlertSchedulerTest(unittest.TestCase):
+
+    def setUp(self):
+        # Without a configuration file every trader gets the default schedule: one alert right at the open
+        with contextlib.redirect_stdout(io.StringIO()):
+            trader_config = TraderConfig(os.path.join(os.path.dirname(__file__), "no_such_config.json"))
+        self.scheduler = AlertScheduler(trader_config, recheck_interval=60)
+        self.scheduler.load([{'id': 1, 'next_alert_at': NOW + 300}, {'id': 2, 'next_alert_at': NOW + 100},
+                             {'id': 3, 'next_alert_at': NOW + 200}])
+
+    def test_pops_the_due_trades_most_overdue_first(self):
+        self.assertEqual(self.scheduler.next_due_at(), NOW + 100)
+        self.assertEqual(self.scheduler.pop_due(NOW + 250), [2, 3])
+        self.assertEqual(self.scheduler.next_due_at(), NOW + 300)
+        self.assertEqual(len(self.scheduler), 1)
+
+    def test_skips_the_stale_entries_of_a_rescheduled_trade(self):
+        self.scheduler.schedule(2, NOW + 400)
+        self.scheduler.schedule(3, None)
+        self.assertEqual(self.scheduler.next_due_at(), NOW + 300)
+        self.assertEqual(self.scheduler.pop_due(NOW + 1000), [1, 2])
+
+    def test_rearms_a_trade_whose_alert_is_still_due_for_a_recheck(self):
+        self.scheduler.pop_due(NOW + 100)
+        self.scheduler.rearm(2, NOW + 100, now=NOW + 100)
+        self.assertEqual(self.scheduler.rechecks, {2})
+        self.assertEqual(self.scheduler.next_due_at(), NOW + 160)
+
+        self.scheduler.pop_due(NOW + 160)
+        self.scheduler.rearm(2, NOW + 3600, now=NOW + 160)
+        self.assertEqual(self.scheduler.rechecks, set())
+        self.assertEqual(self.scheduler.due_at[2], NOW + 3600)
+
+    def test_sync_applies_the_changes_of_other_processes(self):
+        changed = self.scheduler.sync([
+            {'id': 1, 'next_alert_at': NOW + 300},  # unchanged
+            {'id': 2, 'next_alert_at': NOW + 900},  # alerted by another process
+            {'id': 4, 'next_alert_at': NOW + 50},  # opened by a backfill
+        ])  # 3 was closed in the GUI
+        self.assertEqual(sorted(changed), [2, 3, 4])
+        self.assertEqual(self.scheduler.pop_due(NOW + 1000), [4, 1, 2])
+        self.assertEqual(self.scheduler.sync([]), [1, 2, 4])
+        self.assertEqual(self.scheduler.sync([]), [])
+
+    def test_sync_ignores_the_changes_of_this_process(self):
+        self.assertEqual(self.scheduler.pop_due(NOW + 100), [2])
+        self.scheduler.rearm(2, None, now=NOW + 100)
+        self.scheduler.trade_opened({'id': 4, 'trader': "Alice", 'timestamp': NOW, 'alerts_sent': 0,
+                                     'next_alert_at': NOW})
+        self.scheduler.trade_closed(3)
+
+        self.assertEqual(self.scheduler.sync([{'id': 1, 'next_alert_at': NOW + 300},
+                                              {'id': 4, 'next_alert_at': NOW}]), [])
+        self.assertEqual(self.scheduler.due_at, {1: NOW + 300, 4: NOW})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,176 @@
+# tests/test_analyzer.py
+"""
+Tests how Analyze applies emails: the processed-message ledger with its Message-ID
+deduplication, and the emails that are kept out of it for a retry, because their body
+or the LLM could not be reached.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import Analyze  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+from src.gmail_checker import LazyBodyEmail  # noqa: E402
+from src.llm_extractor import LLMDataExtractor, LLMUnavailableError  # noqa: E402
+from src.parser_registry import ParserRegistry  # noqa: E402
+
+LLM_DATA = {'crypto_pair': "BTC", 'direction': "LONG", 'trader': "Alice", 'entry_price': 100.0}
+
+
+def open_email(msg_id: str, snippet: str = "", body: str | None = "An unusual open email",
+               message_id: str | None = None) -> dict:
+    return {'id': msg_id, 'subject': Analyze.OPEN_SUBJECT, 'snippet': snippet, 'body': body,
+            'date': "Tue, 17 Oct 2026 10:00:00 +0000", 'timestamp': 1792231200, 'message_id': message_id}
+
+
+class StubExtractor:
+    """Stands in for the shared LLMDataExtractor: returns `result`, or raises it if it is an exception."""
+
+    def __init__(self, result):
+        self.result = result
+        self.calls = 0
+
+    def _answer(self):
+        self.calls += 1
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+    def extract_trade_data(self, email_body: str) -> dict | None:
+        return self._answer()
+
+    def extract_trade_data_batch(self, email_bodies: dict[str, str]) -> dict[str, dict | None]:
+        result = self._answer()
+        return {message_id: result for message_id in email_bodies}
+
+
+class AnalyzeTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Analyze and the migrations report on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.db_manager = DatabaseManager(os.path.join(self.directory.name, "trades.db"))
+        # No templates: every open email needs the LLM fallback
+        self.registry = ParserRegistry()
+        self.shared_extractor = LLMDataExtractor._shared_instance
+
+    def tearDown(self):
+        LLMDataExtractor._shared_instance = self.shared_extractor
+        self.db_manager.close_connection()
+        self.output.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def use_llm(self, result) -> StubExtractor:
+        extractor = LLMDataExtractor._shared_instance = StubExtractor(result)
+        return extractor
+
+    def process(self, email: dict) -> bool:
+        with self.db_manager.unit_of_work() as unit_of_work:
+            return Analyze(email, unit_of_work, self.registry).process()
+
+    def process_batch(self, emails: list[dict]) -> list[bool]:
+        with self.db_manager.unit_of_work() as unit_of_work:
+            return Analyze.process_batch(emails, unit_of_work, self.registry)
+
+
+class LedgerTest(AnalyzeTestCase):
+
+    def test_records_the_gmail_id_and_the_message_id(self):
+        self.use_llm(dict(LLM_DATA))
+        self.assertTrue(self.process(open_email("a", message_id="<a@mexc>")))
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+        self.assertTrue(self.db_manager.is_message_processed("<a@mexc>"))
+
+    def test_skips_an_email_applied_under_its_message_id(self):
+        # The same email, first imported from a mail archive (keyed by its Message-ID), then seen in Gmail
+        self.use_llm(dict(LLM_DATA))
+        self.assertTrue(self.process(open_email("<a@mexc>", message_id="<a@mexc>")))
+        self.use_llm(dict(LLM_DATA, entry_price=200.0))
+        self.assertTrue(self.process(open_email("a", message_id="<a@mexc>")))
+
+        trades = self.db_manager.get_open_trades_details()
+        self.assertEqual([trade['entry_price'] for trade in trades], [100.0])
+        # The Gmail ID is recorded as well, so the monitor does not fetch the email again
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+
+    def test_a_rolled_back_email_stays_out_of_the_ledger(self):
+        self.use_llm(dict(LLM_DATA))
+        with self.assertRaises(RuntimeError):
+            with self.db_manager.unit_of_work() as unit_of_work:
+                self.assertTrue(Analyze(open_email("a"), unit_of_work, self.registry).process())
+                raise RuntimeError("crash before the commit")
+        self.assertFalse(self.db_manager.is_message_processed("a"))
+        self.assertEqual(self.db_manager.get_open_trades_details(), [])
+
+
+class RetryTest(AnalyzeTestCase):
+
+    def test_applies_and_records_an_llm_extraction(self):
+        self.use_llm(dict(LLM_DATA))
+        self.assertTrue(self.process(open_email("a")))
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+        self.assertEqual([trade['crypto_pair'] for trade in self.db_manager.get_open_trades_details()], ["BTC"])
+
+    def test_records_an_email_without_usable_data(self):
+        self.use_llm(None)
+        self.assertTrue(self.process(open_email("a")))
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+        self.assertEqual(self.db_manager.get_open_trades_details(), [])
+
+    def test_keeps_an_email_out_of_the_ledger_while_the_llm_is_unavailable(self):
+        self.use_llm(LLMUnavailableError("connection refused"))
+        self.assertFalse(self.process(open_email("a", message_id="<a@mexc>")))
+        self.assertFalse(self.db_manager.is_message_processed("a"))
+        self.assertFalse(self.db_manager.is_message_processed("<a@mexc>"))
+
+        # The retry applies it
+        self.use_llm(dict(LLM_DATA))
+        self.assertTrue(self.process(open_email("a", message_id="<a@mexc>")))
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+
+    def test_keeps_an_email_out_of_the_ledger_when_its_body_could_not_be_downloaded(self):
+        extractor = self.use_llm(dict(LLM_DATA))
+        email = LazyBodyEmail({key: value for key, value in open_email("a").items() if key != 'body'},
+                              lambda: None)
+        self.assertFalse(self.process(email))
+        self.assertFalse(self.db_manager.is_message_processed("a"))
+        self.assertEqual(extractor.calls, 0)
+
+    def test_batch_keeps_the_unextracted_emails_out_of_the_ledger(self):
+        self.use_llm(LLMUnavailableError("rate limited", results={"a": dict(LLM_DATA)}))
+        self.assertEqual(self.process_batch([open_email("a"), open_email("b")]), [True, False])
+        self.assertTrue(self.db_manager.is_message_processed("a"))
+        self.assertFalse(self.db_manager.is_message_processed("b"))
+
+
+class TransientErrorTest(unittest.TestCase):
+
+    def test_tells_unreachable_api_from_unusable_answers(self):
+        from openai import APIConnectionError, APIStatusError
+
+        # Built without their HTTP request and response, which _is_transient does not read
+        def status_error(status_code: int) -> APIStatusError:
+            error = APIStatusError.__new__(APIStatusError)
+            error.status_code = status_code
+            return error
+
+        self.assertTrue(LLMDataExtractor._is_transient(APIConnectionError.__new__(APIConnectionError)))
+        self.assertTrue(LLMDataExtractor._is_transient(status_error(429)))
+        self.assertTrue(LLMDataExtractor._is_transient(status_error(503)))
+        self.assertFalse(LLMDataExtractor._is_transient(status_error(400)))
+        self.assertFalse(LLMDataExtractor._is_transient(ValueError("not JSON")))
+
+
+if __name__ == "__main__":
+    unittest.main()
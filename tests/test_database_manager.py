@@ -0,0 +1,236 @@
+# tests/test_database_manager.py
+"""
+Tests the DatabaseManager: the PRAGMA user_version migrations of new and existing
+databases, the per-thread WAL connections that let readers work next to a writer, and
+the unit of work with its rollback and the trade events it delivers after the commit.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database_manager import DatabaseManager  # noqa: E402
+
+# The trades table as the monitor created it before the schema was versioned
+BASELINE_SCHEMA = """
+    CREATE TABLE trades (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, crypto_pair TEXT NOT NULL,
+        trader TEXT NOT NULL, entry_price REAL NOT NULL, open_time TEXT NOT NULL,
+        direction TEXT NOT NULL CHECK(direction IN ('LONG', 'SHORT')),
+        status TEXT NOT NULL CHECK(status IN ('OPEN', 'CLOSED')),
+        timestamp INTEGER NOT NULL,
+        mail_send INTEGER NOT NULL DEFAULT 0
+    )
+"""
+
+
+class DatabaseTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_file = os.path.join(self.directory.name, "trades.db")
+        self.managers = []
+        # The migrations report on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+
+    def tearDown(self):
+        for db_manager in self.managers:
+            db_manager.close_connection()
+        self.output.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def open(self, manager_class=DatabaseManager) -> DatabaseManager:
+        db_manager = manager_class(self.db_file)
+        self.managers.append(db_manager)
+        return db_manager
+
+    def query(self, sql: str) -> list[tuple]:
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return conn.execute(sql).fetchall()
+        finally:
+            conn.close()
+
+    def user_version(self) -> int:
+        return self.query("PRAGMA user_version")[0][0]
+
+    def columns(self) -> list[str]:
+        return [info[1] for info in self.query("PRAGMA table_info(trades)")]
+
+    def indexes(self) -> set[str]:
+        return {name for (name,) in self.query("SELECT name FROM sqlite_master WHERE type = 'index'")
+                if name.startswith("idx_")}
+
+
+class MigrationTest(DatabaseTestCase):
+
+    def test_creates_the_latest_schema(self):
+        db_manager = self.open()
+        self.assertEqual(self.user_version(), len(db_manager._migrations()))
+        self.assertIn('next_alert_at', self.columns())
+        self.assertEqual(self.indexes(), {"idx_trades_open_lookup", "idx_trades_open_timestamp",
+                                          "idx_trades_timestamp", "idx_trades_trader", "idx_trades_next_alert"})
+
+    def test_runs_every_migration_only_once(self):
+        self.open().close_connection()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            self.open()
+        self.assertNotIn("migrated", output.getvalue())
+        self.assertEqual(self.user_version(), 3)
+
+    def test_upgrades_a_database_from_before_the_versioning(self):
+        conn = sqlite3.connect(self.db_file)
+        conn.execute(BASELINE_SCHEMA)
+        conn.execute("""INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction, status, timestamp)
+                        VALUES ('BTC', 'Alice', 100.0, 'Tue, 17 Oct 2026 10:00:00 +0000', 'LONG', 'OPEN', 1792231200),
+                               ('ETH', 'Bob', 2500.0, 'Tue, 17 Oct 2026 11:00:00 +0000', 'SHORT', 'CLOSED', 1792234800)""")
+        conn.commit()
+        conn.close()
+
+        db_manager = self.open()
+        self.assertEqual(self.user_version(), 3)
+        self.assertIn('alerts_sent', self.columns())
+        # The open trade keeps its data and is scheduled from its open time; the closed one is not scheduled
+        self.assertEqual([(trade['crypto_pair'], trade['alerts_sent']) for trade in db_manager.get_open_trades_details()],
+                         [("BTC", 0)])
+        self.assertEqual(db_manager.get_scheduled_trades(), [{'id': 1, 'next_alert_at': 1792231200}])
+        self.assertFalse(db_manager.is_message_processed("a"))
+
+    def test_rolls_back_a_failed_migration(self):
+        class FailingDatabaseManager(DatabaseManager):
+            def _migrations(self) -> list:
+                return super()._migrations() + [("a broken migration", self._migration_broken)]
+
+            def _migration_broken(self):
+                self.cursor.execute("ALTER TABLE trades ADD COLUMN half_done INTEGER")
+                self.cursor.execute("SELECT * FROM no_such_table")
+
+        self.open().close_connection()
+        with self.assertRaises(sqlite3.OperationalError):
+            FailingDatabaseManager(self.db_file)
+        self.assertEqual(self.user_version(), 3)
+        self.assertNotIn('half_done', self.columns())
+
+
+def in_thread(function):
+    """Runs a function on a new thread and returns its result."""
+    result = []
+    thread = threading.Thread(target=lambda: result.append(function()))
+    thread.start()
+    thread.join(10)
+    return result[0]
+
+
+class ConcurrentAccessTest(DatabaseTestCase):
+
+    def test_uses_wal(self):
+        self.open()
+        self.assertEqual(self.query("PRAGMA journal_mode"), [("wal",)])
+
+    def test_gives_every_thread_its_own_connection(self):
+        db_manager = self.open()
+        self.assertIs(db_manager.get_connection(), db_manager.conn)
+        other = in_thread(db_manager.get_connection)
+        self.assertIsNot(other, db_manager.conn)
+        self.assertEqual(len(db_manager.connections), 2)
+
+        db_manager.close_connection()
+        self.assertEqual(db_manager.connections, [])
+        with self.assertRaises(sqlite3.ProgrammingError):
+            other.execute("SELECT 1")
+
+    def test_readers_are_not_blocked_by_an_open_write_transaction(self):
+        db_manager = self.open()
+        with db_manager.unit_of_work() as unit_of_work:
+            unit_of_work.execute("""INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction,
+                                                        status, timestamp)
+                                    VALUES ('BTC', 'Alice', 100.0, 'Tue, 17 Oct 2026', 'LONG', 'OPEN', 1792231200)""")
+            start = time.monotonic()
+            # A reader sees the last commit at once instead of waiting for the busy timeout
+            self.assertEqual(in_thread(db_manager.get_open_trades_details), [])
+            self.assertLess(time.monotonic() - start, 1.0)
+        self.assertEqual(len(in_thread(db_manager.get_open_trades_details)), 1)
+
+
+class RecordingListener:
+    """A trade listener that records its calls, and whether the trades were committed at the time."""
+
+    def __init__(self, db_file: str):
+        self.db_file = db_file
+        self.calls: list[tuple[str, object, int]] = []  # (method, argument, committed trades)
+
+    def committed_trades(self) -> int:
+        conn = sqlite3.connect(self.db_file)
+        try:
+            return conn.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+        finally:
+            conn.close()
+
+    def trade_opened(self, trade: dict):
+        self.calls.append(('trade_opened', trade['id'], self.committed_trades()))
+
+    def trade_closed(self, trade_id: int):
+        self.calls.append(('trade_closed', trade_id, self.committed_trades()))
+
+
+class UnitOfWorkTest(DatabaseTestCase):
+
+    INSERT_SQL = """INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction, status, timestamp)
+                    VALUES (?, 'Alice', 100.0, 'Tue, 17 Oct 2026', 'LONG', 'OPEN', 1792231200)"""
+
+    def setUp(self):
+        super().setUp()
+        self.db_manager = self.open()
+        self.listener = RecordingListener(self.db_file)
+        self.db_manager.add_trade_listener(self.listener)
+
+    def open_trade(self, unit_of_work, crypto_pair: str):
+        trade_id = unit_of_work.execute(self.INSERT_SQL, (crypto_pair,)).lastrowid
+        unit_of_work.trade_opened({'id': trade_id})
+        unit_of_work.email_done()
+
+    def test_delivers_the_events_after_the_commit(self):
+        with self.db_manager.unit_of_work() as unit_of_work:
+            self.open_trade(unit_of_work, "BTC")
+            unit_of_work.trade_closed(1)
+            self.assertEqual(self.listener.calls, [])
+        self.assertEqual(self.listener.calls, [('trade_opened', 1, 1), ('trade_closed', 1, 1)])
+        self.assertEqual(unit_of_work.commits, 1)
+
+    def test_commits_every_commit_every_emails(self):
+        with self.db_manager.unit_of_work(2) as unit_of_work:
+            for crypto_pair in ("BTC", "ETH", "SOL"):
+                self.open_trade(unit_of_work, crypto_pair)
+            # The first two emails are committed and reported, the third is pending
+            self.assertEqual(self.listener.calls, [('trade_opened', 1, 2), ('trade_opened', 2, 2)])
+            self.assertEqual(unit_of_work.pending, 1)
+        self.assertEqual(unit_of_work.commits, 2)
+
+    def test_rolls_back_and_drops_the_events_on_an_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db_manager.unit_of_work(2) as unit_of_work:
+                for crypto_pair in ("BTC", "ETH", "SOL"):
+                    self.open_trade(unit_of_work, crypto_pair)
+                raise RuntimeError("crash in the middle of a batch")
+        # Only the committed batch stays, and only its trades were reported
+        self.assertEqual(sorted(trade['crypto_pair'] for trade in self.db_manager.get_open_trades_details()),
+                         ["BTC", "ETH"])
+        self.assertEqual([trade_id for _, trade_id, _ in self.listener.calls], [1, 2])
+        self.assertEqual(unit_of_work.events, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
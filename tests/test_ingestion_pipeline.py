@@ -0,0 +1,130 @@
+# tests/test_ingestion_pipeline.py
+"""
+Tests the IngestionPipeline: how its regex failures share batched LLM requests, and when
+its writer commits (every `commit_every` emails, at the end of the run and, for a slow
+stream, once the last commit is `commit_interval` old).
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.analyzer import Analyze  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+from src.ingestion_pipeline import IngestionPipeline  # noqa: E402
+from src.llm_extractor import LLMDataExtractor  # noqa: E402
+from src.parser_registry import ParserRegistry  # noqa: E402
+
+
+def regex_email(index: int) -> dict:
+    """An open email that the default templates parse, so it never needs the LLM."""
+    return {'id': f"m{index}", 'subject': Analyze.OPEN_SUBJECT, 'body': None,
+            'snippet': f"You have opened a PAIR{index} LONG position. Entry Price: 2.5; Trader: Alice",
+            'date': "Tue, 17 Oct 2026 10:00:00 +0000", 'timestamp': 1792231200 + index}
+
+
+def llm_email(index: int) -> dict:
+    """An open email that needs the LLM fallback."""
+    return {'id': f"m{index}", 'subject': Analyze.OPEN_SUBJECT, 'snippet': "An unusual open email",
+            'body': f"PAIR{index} was opened", 'date': "Tue, 17 Oct 2026 10:00:00 +0000",
+            'timestamp': 1792231200 + index}
+
+
+class BatchExtractor:
+    """Stands in for the shared LLMDataExtractor and records the emails of every batched request."""
+
+    def __init__(self):
+        self.batches: list[list[str]] = []
+
+    def extract_trade_data_batch(self, email_bodies: dict[str, str]) -> dict[str, dict | None]:
+        self.batches.append(list(email_bodies))
+        return {message_id: {'crypto_pair': body.split()[0], 'direction': "LONG", 'trader': "Alice",
+                             'entry_price': 2.5}
+                for message_id, body in email_bodies.items()}
+
+
+class IngestionPipelineTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        # Analyze reports every email on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.db_manager = DatabaseManager(os.path.join(self.directory.name, "trades.db"))
+
+    def tearDown(self):
+        self.db_manager.close_connection()
+        self.output.__exit__(None, None, None)
+        self.directory.cleanup()
+
+
+class IngestionPipelineLLMTest(IngestionPipelineTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.shared_extractor = LLMDataExtractor._shared_instance
+        self.extractor = LLMDataExtractor._shared_instance = BatchExtractor()
+
+    def tearDown(self):
+        LLMDataExtractor._shared_instance = self.shared_extractor
+        super().tearDown()
+
+    def test_sends_the_regex_failures_of_a_fetch_batch_in_one_request(self):
+        # The regex emails between the failures are held back, so the emails stay in order
+        emails = [llm_email(index) if index % 2 else regex_email(index) for index in range(10)]
+        with self.db_manager.unit_of_work() as unit_of_work:
+            pipeline = IngestionPipeline(unit_of_work, batch_size=50)
+            self.assertEqual(pipeline.run(iter(emails)), (10, None))
+        self.assertEqual(self.extractor.batches, [["m1", "m3", "m5", "m7", "m9"]])
+        self.assertEqual(len(self.db_manager.get_open_trades_details()), 10)
+        self.assertEqual(pipeline.stats['llm'].items, 5)
+
+    def test_sends_one_request_per_fetch_batch(self):
+        with self.db_manager.unit_of_work() as unit_of_work:
+            IngestionPipeline(unit_of_work, registry=ParserRegistry(), batch_size=4).run(
+                iter([llm_email(index) for index in range(10)]))
+        self.assertEqual([len(batch) for batch in self.extractor.batches], [4, 4, 2])
+        self.assertEqual(len(self.db_manager.get_open_trades_details()), 10)
+
+
+class IngestionPipelineCommitTest(IngestionPipelineTestCase):
+
+    def test_commits_every_commit_every_emails_and_at_the_end(self):
+        with self.db_manager.unit_of_work(50) as unit_of_work:
+            pipeline = IngestionPipeline(unit_of_work, commit_interval=60.0)
+            self.assertEqual(pipeline.run(regex_email(index) for index in range(120)), (120, None))
+            # Not once per email, however often the writer catches up with the parser
+            self.assertEqual(unit_of_work.commits, 3)
+        self.assertEqual(len(self.db_manager.get_open_trades_details()), 120)
+
+    def test_commits_a_slow_stream_once_the_interval_has_passed(self):
+        committed = []
+
+        def slow_emails():
+            for index in range(8):
+                if index == 6:
+                    reader = DatabaseManager(self.db_manager.db_file)
+                    committed.append(len(reader.get_open_trades_details()))
+                    reader.close_connection()
+                yield regex_email(index)
+                time.sleep(0.05)
+
+        with self.db_manager.unit_of_work(50) as unit_of_work:
+            IngestionPipeline(unit_of_work, commit_interval=0.12, batch_size=2).run(slow_emails())
+            commits = unit_of_work.commits
+        # The first emails were visible to other connections before the stream ended
+        self.assertGreater(committed[0], 0)
+        self.assertLess(commits, 8)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# tests/test_main.py
+"""
+Tests the alert scheduling of the monitor in main.py: the stored next_alert_at of the
+open trades, and its recalculation when the trader configuration changes.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from src.database_manager import DatabaseManager  # noqa: E402
+from src.trader_config import TraderConfig  # noqa: E402
+
+OPENED_AT = 1792231200
+
+
+class ScheduleOpenTradesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.config_file = os.path.join(self.directory.name, "trader_config.json")
+        # The migrations and the configuration report on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.db_manager = DatabaseManager(os.path.join(self.directory.name, "trades.db"))
+        self.write_config(initial_wait_time="20m", reminder_intervals=["1h"])
+        self.trader_config = TraderConfig(self.config_file)
+        # Alice's trade has sent its first alert; Bob's has sent both and Carol's is closed
+        for trader, status, alerts_sent in (("Alice", "OPEN", 1), ("Bob", "OPEN", 2), ("Carol", "CLOSED", 0)):
+            self.db_manager.conn.execute(
+                """INSERT INTO trades (crypto_pair, trader, entry_price, open_time, direction, status, timestamp,
+                                       alerts_sent, next_alert_at)
+                   VALUES ('BTC', ?, 100.0, 'Tue, 17 Oct 2026', 'LONG', ?, ?, ?, ?)""",
+                (trader, status, OPENED_AT, alerts_sent, OPENED_AT))
+        self.db_manager.conn.commit()
+
+    def tearDown(self):
+        self.db_manager.close_connection()
+        self.output.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def write_config(self, **settings):
+        with open(self.config_file, 'w') as f:
+            json.dump([dict(trader=trader, **settings) for trader in ("Alice", "Bob", "Carol")], f)
+
+    def next_alerts(self) -> dict[int, int | None]:
+        rows = self.db_manager.conn.execute("SELECT id, next_alert_at FROM trades").fetchall()
+        return {row['id']: row['next_alert_at'] for row in rows}
+
+    def test_calculates_the_schedule_once_per_configuration(self):
+        self.assertTrue(main.schedule_open_trades(self.db_manager, self.trader_config))
+        # Alice: 20m initial wait plus 1h after the first alert; Bob: nothing left; Carol is closed
+        self.assertEqual(self.next_alerts(), {1: OPENED_AT + 4800, 2: None, 3: OPENED_AT})
+        self.assertEqual(self.db_manager.get_scheduled_trades(), [{'id': 1, 'next_alert_at': OPENED_AT + 4800}])
+
+        self.assertFalse(main.schedule_open_trades(self.db_manager, self.trader_config))
+
+    def test_recalculates_the_schedule_when_the_configuration_changes(self):
+        main.schedule_open_trades(self.db_manager, self.trader_config)
+        self.write_config(initial_wait_time="5m", reminder_intervals=["30m", "2h"])
+        # A different mtime, however fast the file was rewritten
+        os.utime(self.config_file, (0, 0))
+
+        self.assertTrue(main.schedule_open_trades(self.db_manager, self.trader_config))
+        self.assertEqual(self.next_alerts(), {1: OPENED_AT + 2100, 2: OPENED_AT + 9300, 3: OPENED_AT})
+        self.assertEqual([trade['id'] for trade in self.db_manager.get_due_trades(OPENED_AT + 2100)], [1])
+        self.assertEqual([trade['id'] for trade in self.db_manager.get_due_trades(OPENED_AT + 9300)], [1, 2])
+
+    def test_recalculates_a_database_scheduled_by_another_configuration(self):
+        main.schedule_open_trades(self.db_manager, self.trader_config)
+        # E.g. the GUI or another daemon changed the configuration and rescheduled the trades
+        self.db_manager.reschedule_trades({1: OPENED_AT}, config_fingerprint="another configuration")
+
+        self.assertTrue(main.schedule_open_trades(self.db_manager, self.trader_config))
+        self.assertEqual(self.next_alerts()[1], OPENED_AT + 4800)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,242 @@
+# tests/test_mexc_price_stream.py
+"""
+Tests the MexcPriceStream against a local stand-in of the MEXC WebSocket API: the
+(un)subscriptions driven by the trade listener, the resubscription after a reconnect
+and the decoding of the protobuf deals pushes.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import threading
+import time
+import unittest
+
+from websockets.asyncio.server import serve
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.mexc_api_client import MexcApiClient  # noqa: E402
+from src.mexc_price_stream import MexcPriceStream  # noqa: E402
+
+CHANNEL = MexcPriceStream.DEALS_CHANNEL
+
+
+def encode_varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte, value = value & 0x7F, value >> 7
+        encoded.append(byte | (0x80 if value else 0))
+        if not value:
+            return bytes(encoded)
+
+
+def encode_field(number: int, value: int | str | bytes) -> bytes:
+    if isinstance(value, int):
+        return encode_varint(number << 3) + encode_varint(value)
+    if isinstance(value, str):
+        value = value.encode()
+    return encode_varint(number << 3 | 2) + encode_varint(len(value)) + value
+
+
+def deals_push(symbol: str, deals: list[tuple[str, int]], with_symbol: bool = True) -> bytes:
+    """A PushDataV3ApiWrapper with publicAggreDeals, like MEXC sends for the deals channel."""
+    channel = CHANNEL.format(symbol=symbol)
+    items = b"".join(encode_field(1, encode_field(1, price) + encode_field(2, "0.5") + encode_field(3, 1)
+                                  + encode_field(4, deal_time))
+                     for price, deal_time in deals)
+    body = items + encode_field(2, channel.rsplit("@", 1)[0])
+    return (encode_field(1, channel) + (encode_field(3, symbol) if with_symbol else b"")
+            + encode_field(314, body) + encode_field(6, int(time.time() * 1000)))
+
+
+class StandInExchange:
+    """A MEXC WebSocket stand-in that records the requests of every connection."""
+
+    def __init__(self):
+        self.connections: list = []
+        self.requests: list[tuple[int, dict]] = []  # (connection number, JSON request)
+        self.loop = None
+        self.port = None
+        self.ready = threading.Event()
+        self.stopped = None
+
+    async def handler(self, websocket):
+        self.connections.append(websocket)
+        number = len(self.connections)
+        with contextlib.suppress(Exception):
+            async for message in websocket:
+                request = json.loads(message)
+                self.requests.append((number, request))
+                if request['method'] == "PING":
+                    await websocket.send(json.dumps({"id": 0, "code": 0, "msg": "PONG"}))
+                else:
+                    await websocket.send(json.dumps({"id": 0, "code": 0, "msg": ",".join(request['params'])}))
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        self.stopped = asyncio.Event()
+        async with serve(self.handler, "127.0.0.1", 0) as server:
+            self.port = server.sockets[0].getsockname()[1]
+            self.ready.set()
+            await self.stopped.wait()
+
+    def start(self):
+        self.thread = threading.Thread(target=asyncio.run, args=(self.main(),), daemon=True)
+        self.thread.start()
+        self.ready.wait()
+
+    def stop(self):
+        self.loop.call_soon_threadsafe(self.stopped.set)
+        self.thread.join(5)
+
+    def run(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(5)
+
+    def send(self, message: bytes | str):
+        """Sends a message on the latest connection."""
+        self.run(self.connections[-1].send(message))
+
+    def drop(self):
+        """Closes the latest connection, like a network failure would."""
+        self.run(self.connections[-1].close())
+
+    def channels(self, method: str, connection: int | None = None) -> list[list[str]]:
+        """The channels of every request with the method, on one connection or on all."""
+        return [request['params'] for number, request in self.requests
+                if request['method'] == method and connection in (None, number)]
+
+
+class StubMexcClient:
+    """Stands in for the REST fallback of the stream's get_prices()."""
+
+    def __init__(self, prices: dict[str, float]):
+        self.prices = prices
+
+    def get_prices(self, crypto_pairs) -> dict[str, float]:
+        return {pair: self.prices[pair] for pair in crypto_pairs if pair in self.prices}
+
+
+def wait_until(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class MexcPriceStreamTest(unittest.TestCase):
+
+    def setUp(self):
+        self.exchange = StandInExchange()
+        self.exchange.start()
+        self.ticks = []
+        self.stream = MexcPriceStream(MexcApiClient(), on_tick=lambda symbol, price: self.ticks.append((symbol, price)),
+                                      url=f"ws://127.0.0.1:{self.exchange.port}")
+        self.stream.BACKOFF_BASE_SECONDS = 0.01
+        # The stream reports every (un)subscription and reconnect on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.stream.start()
+        self.assertTrue(wait_until(lambda: self.stream.connected))
+
+    def tearDown(self):
+        self.stream.stop()
+        self.exchange.stop()
+        self.output.__exit__(None, None, None)
+
+    def test_subscribes_the_symbol_of_an_opened_trade(self):
+        self.stream.trade_opened({'id': 1, 'crypto_pair': "btc"})
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION")))
+        self.assertEqual(self.exchange.channels("SUBSCRIPTION"), [[CHANNEL.format(symbol="BTCUSDT")]])
+
+        # A second trade of the symbol needs no subscription of its own
+        self.stream.trade_opened({'id': 2, 'crypto_pair': "BTC"})
+        self.stream.trade_opened({'id': 3, 'crypto_pair': "ETH"})
+        self.assertTrue(wait_until(lambda: len(self.exchange.channels("SUBSCRIPTION")) == 2))
+        self.assertEqual(self.exchange.channels("SUBSCRIPTION")[1], [CHANNEL.format(symbol="ETHUSDT")])
+
+    def test_unsubscribes_once_the_last_trade_of_a_symbol_is_closed(self):
+        self.stream.load([{'id': 1, 'crypto_pair': "BTC"}, {'id': 2, 'crypto_pair': "BTC"}])
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION")))
+
+        self.stream.trade_closed(1)
+        self.assertFalse(wait_until(lambda: self.exchange.channels("UNSUBSCRIPTION"), timeout=0.2))
+        self.stream.trade_closed(2)
+        self.assertTrue(wait_until(lambda: self.exchange.channels("UNSUBSCRIPTION")))
+        self.assertEqual(self.exchange.channels("UNSUBSCRIPTION"), [[CHANNEL.format(symbol="BTCUSDT")]])
+        self.assertEqual(self.stream.wanted_symbols(), set())
+
+    def test_resubscribes_after_a_reconnect(self):
+        self.stream.load([{'id': 1, 'crypto_pair': "BTC"}, {'id': 2, 'crypto_pair': "ETH"}])
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION", connection=1)))
+
+        self.exchange.drop()
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION", connection=2)))
+        self.assertEqual(sorted(self.exchange.channels("SUBSCRIPTION", connection=2)[0]),
+                         [CHANNEL.format(symbol="BTCUSDT"), CHANNEL.format(symbol="ETHUSDT")])
+        self.assertEqual(self.stream.connections, 2)
+        self.assertGreaterEqual(self.stream.reconnects, 1)
+
+    def test_forgets_the_prices_of_a_lost_connection(self):
+        self.stream.trade_opened({'id': 1, 'crypto_pair': "BTC"})
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION", connection=1)))
+        self.exchange.send(deals_push("BTCUSDT", [("101.5", 1000)]))
+        self.assertTrue(wait_until(lambda: self.ticks))
+        self.assertEqual(self.stream.get_prices(["BTC"]), {"BTC": 101.5})
+
+        self.exchange.drop()
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION", connection=2)))
+        self.assertTrue(self.stream.connected)
+        # Without a deal since the reconnect, the price comes from the REST client again
+        self.stream.mexc_client = StubMexcClient({"BTC": 99.0})
+        self.assertEqual(self.stream.get_prices(["BTC"]), {"BTC": 99.0})
+        self.assertEqual(self.stream.pop_ticks(), {})
+
+    def test_records_the_prices_of_a_deals_push(self):
+        self.stream.trade_opened({'id': 1, 'crypto_pair': "BTC"})
+        self.assertTrue(wait_until(lambda: self.exchange.channels("SUBSCRIPTION")))
+
+        self.exchange.send(deals_push("BTCUSDT", [("101.5", 1002), ("99.25", 1001), ("103", 1000)]))
+        self.assertTrue(wait_until(lambda: self.ticks))
+        # The newest deal is the price; the range covers all deals of the push
+        self.assertEqual(self.ticks, [("BTCUSDT", 101.5)])
+        self.assertEqual(self.stream.get_prices(["BTC"]), {"BTC": 101.5})
+        self.assertEqual(self.stream.pop_ticks(), {"BTCUSDT": (99.25, 103.0)})
+        self.assertEqual(self.stream.pop_ticks(), {})
+
+        # Pushes of another symbol and malformed ones are skipped
+        self.exchange.send(deals_push("ETHUSDT", [("5", 1003)]))
+        self.exchange.send(b"\x0a\xff")
+        self.exchange.send(deals_push("BTCUSDT", [("100", 1004)], with_symbol=False))
+        self.assertTrue(wait_until(lambda: len(self.ticks) == 2))
+        self.assertEqual(self.ticks[1], ("BTCUSDT", 100.0))
+        self.assertEqual(self.stream.pop_ticks(), {"BTCUSDT": (100.0, 100.0)})
+
+
+class DecodeDealsTest(unittest.TestCase):
+
+    def test_decodes_symbol_and_deals(self):
+        symbol, deals = MexcPriceStream.decode_deals(deals_push("SOLUSDT", [("1.5", 7), ("1.25", 8)]))
+        self.assertEqual(symbol, "SOLUSDT")
+        self.assertEqual(deals, [(1.5, 7), (1.25, 8)])
+
+    def test_takes_the_symbol_from_the_channel_without_one(self):
+        symbol, _ = MexcPriceStream.decode_deals(deals_push("SOLUSDT", [("1.5", 7)], with_symbol=False))
+        self.assertEqual(symbol, "SOLUSDT")
+
+    def test_rejects_malformed_messages(self):
+        for message in (b"", b"\x0a\xff", deals_push("SOLUSDT", [("1.5", 7)])[:-12], encode_field(1, "channel")):
+            with self.assertRaises(ValueError):
+                MexcPriceStream.decode_deals(message)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+# tests/test_parser_registry.py
+"""
+Tests the ParserRegistry: the first matching template wins, and the templates are
+re-sorted by hit count only every REORDER_EVERY hits or on reorder().
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser_registry import ParserRegistry, OPEN_POSITION  # noqa: E402
+
+
+def template_names(registry: ParserRegistry) -> list[str]:
+    return [template.name for template in registry.templates[OPEN_POSITION]]
+
+
+class ParserRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = ParserRegistry()
+        self.registry.register(OPEN_POSITION, 'old', r"old (?P<crypto_pair>\w+)")
+        self.registry.register(OPEN_POSITION, 'new', r"new (?P<crypto_pair>\w+)")
+
+    def test_first_matching_template_wins(self):
+        self.assertEqual(self.registry.parse(OPEN_POSITION, "new BTC"), {'crypto_pair': "BTC", 'template': 'new'})
+        self.assertIsNone(self.registry.parse(OPEN_POSITION, "unknown BTC"))
+        self.assertEqual(self.registry.get_stats()[OPEN_POSITION], {'templates': {'old': 0, 'new': 1}, 'misses': 1})
+
+    def test_reorders_every_reorder_every_hits(self):
+        self.registry.REORDER_EVERY = 5
+        for _ in range(4):
+            self.registry.parse(OPEN_POSITION, "new BTC")
+        # No swap on every hit
+        self.assertEqual(template_names(self.registry), ['old', 'new'])
+        self.registry.parse(OPEN_POSITION, "new BTC")
+        self.assertEqual(template_names(self.registry), ['new', 'old'])
+        self.assertEqual(self.registry.hits_since_reorder, 0)
+
+    def test_reorder_keeps_the_order_of_equal_hit_counts(self):
+        self.registry.register(OPEN_POSITION, 'newest', r"newest (?P<crypto_pair>\w+)")
+        self.registry.parse(OPEN_POSITION, "newest BTC")
+        self.registry.reorder()
+        self.assertEqual(template_names(self.registry), ['newest', 'old', 'new'])
+
+
+if __name__ == "__main__":
+    unittest.main()
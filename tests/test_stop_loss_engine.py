@@ -0,0 +1,80 @@
+# tests/test_stop_loss_engine.py
+"""
+Tests the StopLossEngine: which armed longs and shorts a tick breaches right at their
+trigger price, and that it always agrees with the P/L comparison of check_position().
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import math
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.position_monitor import PositionMonitor  # noqa: E402
+from src.stop_loss_engine import StopLossEngine  # noqa: E402
+
+
+def trade(trade_id: int, direction: str, entry_price: float, crypto_pair: str = "BTC") -> dict:
+    return {'id': trade_id, 'crypto_pair': crypto_pair, 'direction': direction, 'entry_price': entry_price}
+
+
+class StopLossEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        self.engine = StopLossEngine()
+        # Triggers: the long at 90, the short at 110
+        self.engine.arm(trade(1, "LONG", 100.0), -10.0)
+        self.engine.arm(trade(2, "short", 100.0), -10.0)
+
+    def test_breaches_a_long_at_or_below_its_trigger(self):
+        self.assertEqual(self.engine.breached("BTCUSDT", 90.0), [1])
+        self.assertEqual(self.engine.breached("BTCUSDT", 89.0), [1])
+        self.assertEqual(self.engine.breached("BTCUSDT", math.nextafter(90.0, math.inf)), [])
+
+    def test_breaches_a_short_at_or_above_its_trigger(self):
+        self.assertEqual(self.engine.breached("BTCUSDT", 110.0), [2])
+        self.assertEqual(self.engine.breached("BTCUSDT", 111.0), [2])
+        self.assertEqual(self.engine.breached("BTCUSDT", math.nextafter(110.0, -math.inf)), [])
+
+    def test_checks_the_longs_against_the_low_and_the_shorts_against_the_high(self):
+        self.assertEqual(self.engine.breached("BTCUSDT", 95.0, 105.0), [])
+        self.assertEqual(self.engine.breached("BTCUSDT", 89.5, 110.5), [1, 2])
+        self.assertEqual(self.engine.breached("ETHUSDT", 1.0, 1000.0), [])
+
+    def test_agrees_with_check_position_around_every_trigger(self):
+        for entry_price in (0.1, 1 / 3, 0.000123, 7.77, 64123.45):
+            for stop_loss in (-0.5, -3.3, -7.0, -10.0, -33.3):
+                for direction in ("LONG", "SHORT"):
+                    engine = StopLossEngine()
+                    engine.arm(trade(1, direction, entry_price), stop_loss)
+                    trigger = StopLossEngine.trigger_price(direction, entry_price, stop_loss)
+                    for price in (math.nextafter(trigger, -math.inf), trigger, math.nextafter(trigger, math.inf)):
+                        expected = PositionMonitor.percentage_change(direction, entry_price, price) <= stop_loss
+                        with self.subTest(entry_price=entry_price, stop_loss=stop_loss, direction=direction,
+                                          price=price):
+                            self.assertEqual(engine.breached("BTCUSDT", price) == [1], expected)
+
+    def test_watches_only_the_symbols_of_armed_trades(self):
+        self.assertTrue(self.engine.watches("BTCUSDT"))
+        self.assertFalse(self.engine.watches("ETHUSDT"))
+        self.engine.disarm(1)
+        self.assertTrue(self.engine.watches("BTCUSDT"))
+        self.engine.trade_closed(2)
+        self.assertFalse(self.engine.watches("BTCUSDT"))
+        self.assertEqual(len(self.engine), 0)
+
+    def test_arming_again_replaces_the_trigger(self):
+        self.engine.arm(trade(1, "LONG", 100.0), -5.0)
+        self.assertEqual(self.engine.breached("BTCUSDT", 94.0), [1])
+        self.assertEqual(len(self.engine), 2)
+        # Without an entry price PositionMonitor never alerts, so the trade is not watched
+        self.engine.arm(trade(1, "LONG", 0.0), -5.0)
+        self.assertEqual(self.engine.breached("BTCUSDT", 1.0), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
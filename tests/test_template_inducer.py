@@ -0,0 +1,82 @@
+# tests/test_template_inducer.py
+"""
+Tests the TemplateInducer: a template derived from LLM extractions is registered once
+`min_confirmations` different emails confirm it, and it survives a restart through the
+store file.
+
+Usage:
+    python -m unittest discover tests
+"""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.parser_registry import ParserRegistry, OPEN_POSITION  # noqa: E402
+from src.template_inducer import TemplateInducer  # noqa: E402
+
+
+def drifted_email(pair: str, price: str, trader: str) -> tuple[str, dict]:
+    """A new open email format and the fields the LLM extracted from it."""
+    text = f"Copy trade started: {trader} went LONG on {pair}USDT at {price} USDT."
+    return text, {'crypto_pair': pair, 'direction': "LONG", 'trader': trader, 'entry_price': float(price)}
+
+
+class TemplateInducerTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store_file = os.path.join(self.directory.name, "learned_templates.json")
+        # The inducer reports candidates and learned templates on the console
+        self.output = contextlib.redirect_stdout(io.StringIO())
+        self.output.__enter__()
+        self.registry = ParserRegistry()
+        self.inducer = TemplateInducer(self.registry, self.store_file, min_confirmations=3)
+
+    def tearDown(self):
+        self.output.__exit__(None, None, None)
+        self.directory.cleanup()
+
+    def test_registers_a_template_after_enough_confirmations(self):
+        emails = [drifted_email("BTC", "101.5", "Alice"), drifted_email("ETH", "2500", "Bob"),
+                  drifted_email("SOL", "150.25", "Carol")]
+        self.assertIsNone(self.inducer.observe(OPEN_POSITION, *emails[0]))
+        # The same email again is no extra confirmation
+        self.assertIsNone(self.inducer.observe(OPEN_POSITION, *emails[0]))
+        self.assertIsNone(self.inducer.observe(OPEN_POSITION, *emails[1]))
+        self.assertIsNone(self.registry.parse(OPEN_POSITION, drifted_email("PEPE", "0.5", "Dave")[0]))
+
+        name = self.inducer.observe(OPEN_POSITION, *emails[2])
+        self.assertIsNotNone(name)
+        fields = self.registry.parse(OPEN_POSITION, drifted_email("PEPE", "0.5", "Dave")[0])
+        self.assertEqual(fields, {'crypto_pair': "PEPE", 'direction': "LONG", 'trader': "Dave", 'entry_price': 0.5,
+                                  'template': name})
+
+    def test_restores_learned_templates_and_candidates_from_the_store_file(self):
+        for email in (drifted_email("BTC", "101.5", "Alice"), drifted_email("ETH", "2500", "Bob"),
+                      drifted_email("SOL", "150.25", "Carol")):
+            self.inducer.observe(OPEN_POSITION, *email)
+        self.inducer.observe(OPEN_POSITION, "Position opened for Alice: LONG BTC @ 101.5",
+                             {'crypto_pair': "BTC", 'direction': "LONG", 'trader': "Alice", 'entry_price': 101.5})
+
+        registry = ParserRegistry()
+        restarted = TemplateInducer(registry, self.store_file, min_confirmations=3)
+        self.assertEqual(len(restarted.learned), 1)
+        self.assertEqual([candidate['examples'][0]['fields']['trader'] for candidate in restarted.candidates.values()],
+                         ["Alice"])
+        self.assertIsNotNone(registry.parse(OPEN_POSITION, drifted_email("PEPE", "0.5", "Dave")[0]))
+
+    def test_does_not_learn_from_ambiguous_values(self):
+        # The price occurs twice, so the inducer cannot tell which one the LLM meant
+        text = "Copy trade started: Alice went LONG on BTCUSDT at 100 USDT, margin 100 USDT."
+        fields = {'crypto_pair': "BTC", 'direction': "LONG", 'trader': "Alice", 'entry_price': 100.0}
+        self.assertIsNone(self.inducer.induce(text, fields))
+
+
+if __name__ == "__main__":
+    unittest.main()